@@ -0,0 +1,315 @@
+"""
+Approximate nearest-neighbour search for Voice2Note.
+
+Implements an IVF-flat index in NumPy: note embeddings are clustered with
+spherical k-means, every note_vectors row records the list (cluster) it
+belongs to, and a query only scores the rows of the ``nprobe`` lists whose
+centroids are closest to it.
+
+Persistence:
+- {schema}.note_vector_index holds the centroids as one packed float32 blob
+- {schema}.note_vectors.cluster_id holds each row's list assignment
+
+The summarize Lambda assigns new rows to the latest centroids when it inserts
+them, so the index stays current without retraining. Rows without an
+assignment are always scored, so they are never missed.
+
+Usage:
+    python -m backend.ann               # train every schema above the threshold
+    python -m backend.ann user_12       # train one schema
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from backend.config import logger
+from backend.vectors import EMBEDDING_DTYPE, STORAGE_DTYPE, EmbeddingMatrix
+
+
+# Unassigned rows (inserted before the index existed) carry this cluster id
+UNASSIGNED = -1
+
+
+class IVFIndex:
+    """
+    Inverted-file index over note embeddings.
+
+    Attributes:
+        index_id (int): note_vector_index row the centroids were loaded from
+        centroids (np.ndarray): (nlist, dim) unit-length float32 centroids
+    """
+
+    def __init__(self, centroids: np.ndarray, index_id: int = 0):
+        self.index_id = index_id
+        self.centroids = np.ascontiguousarray(centroids, dtype=EMBEDDING_DTYPE)
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.centroids.shape[1]
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        nlist: Optional[int] = None,
+        iterations: int = 20,
+        sample_size: int = 50000,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """
+        Train centroids with spherical k-means.
+
+        Args:
+            vectors (np.ndarray): (n, dim) embeddings to cluster
+            nlist (int, optional): Number of lists. Defaults to sqrt(n)
+            iterations (int, optional): k-means iterations. Defaults to 20
+            sample_size (int, optional): Max vectors used for training
+            seed (int, optional): Random seed
+
+        Returns:
+            IVFIndex: Trained index
+        """
+        rng = np.random.default_rng(seed)
+        data = _normalize(np.asarray(vectors, dtype=EMBEDDING_DTYPE))
+        if len(data) > sample_size:
+            data = data[rng.choice(len(data), sample_size, replace=False)]
+
+        nlist = nlist or default_nlist(len(data))
+        nlist = max(1, min(nlist, len(data)))
+        centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = _nearest(data, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, data)
+            counts = np.bincount(assignments, minlength=nlist)
+            empty = counts == 0
+            # Reseed empty lists with random points so no centroid is wasted
+            if empty.any():
+                sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        return cls(centroids)
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Assign vectors to their nearest list.
+
+        Args:
+            vectors (np.ndarray): (n, dim) embeddings
+
+        Returns:
+            np.ndarray: (n,) list ids
+        """
+        if not len(vectors):
+            return np.empty(0, dtype=np.int32)
+        return _nearest(np.asarray(vectors, dtype=EMBEDDING_DTYPE), self.centroids)
+
+    def candidates(
+        self, query_embedding: Sequence[float], cluster_ids: np.ndarray, nprobe: int
+    ) -> np.ndarray:
+        """
+        Rows to score for a query: members of the nprobe closest lists plus
+        every unassigned row.
+
+        Args:
+            query_embedding (Sequence[float]): Query vector
+            cluster_ids (np.ndarray): (n,) list id of each matrix row
+            nprobe (int): Number of lists to visit
+
+        Returns:
+            np.ndarray: Sorted row indices
+        """
+        query = np.asarray(query_embedding, dtype=EMBEDDING_DTYPE)
+        nprobe = max(1, min(nprobe, self.nlist))
+        closeness = self.centroids @ query
+        probed = np.argpartition(-closeness, nprobe - 1)[:nprobe]
+        mask = np.isin(cluster_ids, probed) | (cluster_ids == UNASSIGNED)
+        return np.flatnonzero(mask)
+
+    def search(
+        self,
+        matrix: EmbeddingMatrix,
+        query_embedding: Sequence[float],
+        limit: int = 3,
+        nprobe: int = 8,
+    ):
+        """
+        Approximate top-k search over a matrix whose rows carry list ids.
+
+        Args:
+            matrix (EmbeddingMatrix): Matrix with ``cluster_ids`` set
+            query_embedding (Sequence[float]): Query vector
+            limit (int, optional): Maximum number of results. Defaults to 3
+            nprobe (int, optional): Number of lists to visit. Defaults to 8
+
+        Returns:
+            List[Tuple[str, str, float]]: (content, audio_key, similarity_score)
+        """
+        rows = self.candidates(query_embedding, matrix.cluster_ids, nprobe)
+        return matrix.search(query_embedding, limit, rows=rows)
+
+    def to_bytes(self) -> bytes:
+        """Centroids packed as little-endian float32, row-major."""
+        return self.centroids.astype(STORAGE_DTYPE).tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob, nlist: int, dim: int, index_id: int = 0) -> "IVFIndex":
+        """
+        Load centroids persisted with ``to_bytes``.
+
+        Args:
+            blob: bytea buffer from note_vector_index.centroids
+            nlist (int): Number of lists
+            dim (int): Embedding dimension
+            index_id (int, optional): Source note_vector_index row
+
+        Returns:
+            IVFIndex: Loaded index
+        """
+        centroids = np.frombuffer(blob, dtype=STORAGE_DTYPE).reshape(nlist, dim)
+        return cls(centroids, index_id)
+
+
+def default_nlist(count: int) -> int:
+    """Rule-of-thumb list count: about sqrt(n), capped at 1024."""
+    return int(max(1, min(1024, round(np.sqrt(count)))))
+
+
+def load_index(cursor, schema: str) -> Optional[IVFIndex]:
+    """
+    Load the latest persisted index for a schema.
+
+    Args:
+        cursor: Database cursor for executing queries
+        schema (str): User's database schema
+
+    Returns:
+        Optional[IVFIndex]: Latest index, or None if the schema has none
+    """
+    cursor.execute(
+        f"""
+        SELECT index_id, nlist, dim, centroids
+        FROM {schema}.note_vector_index
+        ORDER BY index_id DESC
+        LIMIT 1
+        """
+    )
+    result = cursor.fetchone()
+    if not result:
+        return None
+    index_id, nlist, dim, centroids = result
+    return IVFIndex.from_bytes(centroids, nlist, dim, index_id)
+
+
+def train_schema_index(cursor, schema: str, nlist: Optional[int] = None) -> IVFIndex:
+    """
+    Train and persist a new index for a schema and reassign every row.
+
+    The index table is locked first so a summarize Lambda can't assign rows
+    against the previous centroids while the new ones are being written.
+    Earlier indexes are deleted in the same transaction, since every row is
+    reassigned to the new centroids.
+
+    Args:
+        cursor: Database cursor (the caller commits)
+        schema (str): User's database schema
+        nlist (int, optional): Number of lists. Defaults to sqrt(n)
+
+    Returns:
+        IVFIndex: The persisted index
+    """
+    cursor.execute(f"LOCK TABLE {schema}.note_vector_index IN EXCLUSIVE MODE")
+    cursor.execute(
+        f"""
+        SELECT vector_id, content_chunk, audio_key, embedding
+        FROM {schema}.note_vectors
+        WHERE deleted_at IS NULL
+        ORDER BY vector_id
+        """
+    )
+    matrix = EmbeddingMatrix.from_rows(cursor.fetchall())
+    if not len(matrix):
+        raise ValueError(f"No vectors to index in {schema}")
+
+    index = IVFIndex.train(matrix.matrix, nlist)
+    assignments = index.assign(matrix.matrix)
+
+    cursor.execute(f"DELETE FROM {schema}.note_vector_index")
+    cursor.execute(
+        f"""
+        INSERT INTO {schema}.note_vector_index (nlist, dim, centroids, trained_vectors)
+        VALUES (%s, %s, %s, %s)
+        RETURNING index_id
+        """,
+        (index.nlist, index.dim, index.to_bytes(), len(matrix)),
+    )
+    index.index_id = cursor.fetchone()[0]
+
+    cursor.execute(
+        f"""
+        UPDATE {schema}.note_vectors AS nv
+        SET cluster_id = a.cluster_id
+        FROM unnest(%s::int[], %s::int[]) AS a(vector_id, cluster_id)
+        WHERE nv.vector_id = a.vector_id
+        """,
+        (matrix.vector_ids.tolist(), assignments.tolist()),
+    )
+    logger.info(
+        f"Trained IVF index {index.index_id} for {schema}: "
+        f"{index.nlist} lists over {len(matrix)} vectors"
+    )
+    return index
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length, leaving zero rows untouched."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _nearest(
+    vectors: np.ndarray, centroids: np.ndarray, batch: int = 8192
+) -> np.ndarray:
+    """Index of the most similar centroid for every vector, in batches."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch):
+        block = vectors[start : start + batch]
+        assignments[start : start + batch] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+if __name__ == "__main__":
+    import sys
+
+    from backend.config import IVF_MIN_VECTORS, db_config
+    from backend.database import DatabaseManager
+    from backend.migrations import user_schemas
+
+    db = DatabaseManager(db_config)
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            if len(sys.argv) > 1:
+                schemas = [DatabaseManager.validate_schema(sys.argv[1])]
+            else:
+                schemas = user_schemas(cur)
+
+            for schema in filter(None, schemas):
+                try:
+                    cur.execute(
+                        f"SELECT COUNT(*) FROM {schema}.note_vectors WHERE deleted_at IS NULL"
+                    )
+                    if cur.fetchone()[0] < IVF_MIN_VECTORS and len(sys.argv) == 1:
+                        conn.rollback()
+                        continue
+                    train_schema_index(cur, schema)
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"Error training index for {schema}: {str(e)}")
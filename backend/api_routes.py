@@ -7,26 +7,35 @@ This module handles all API endpoints including:
 - Note management (editing, deletion)
 - Audio file handling
 - Session management
+- Admin metrics (cache and pool counters in the Prometheus text format)
 
 Each route handler includes proper error handling and database transaction management.
 """
 
 from fasthtml.common import *
 from datetime import datetime, timedelta
-from starlette.responses import JSONResponse, RedirectResponse, StreamingResponse
+from starlette.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 from starlette.exceptions import HTTPException
+import asyncio
 import bcrypt
 import uuid
 from frontend.styles import Styles
-from backend.config import logger, s3, AWS_S3_BUCKET
+from backend.async_database import AsyncDatabase
+from backend.config import logger, s3, AWS_S3_BUCKET, METRICS_TOKEN
 from backend.llm import LLM, RateLimiter
+from backend.metrics import bearer_authorized
 import json
 import io
-from backend.queries import invalidate_note_cache
+from backend.queries import cache, invalidate_note_cache, lexical_cache
 
 # Initialize LLM
 rate_limiter = RateLimiter(max_requests=5, window=60)
-llm = LLM()
+llm = LLM(cache=cache, lexical_cache=lexical_cache)
 
 # Initialize styles
 styles = Styles()
@@ -43,6 +52,8 @@ def setup_api_routes(app, db):
     Returns:
         app: The configured application with all routes added
     """
+    # Async pools for the chat and note editing routes
+    adb = AsyncDatabase(db)
 
     # Authentication Routes
     @app.route("/api/login", methods=["POST"])
@@ -344,6 +355,8 @@ def setup_api_routes(app, db):
 
         # Handle DB user password update
         db.handle_password_reset(user[0])
+        # The async pool still logs in with the old password
+        await adb.forget_user(user[0])
 
         return Html(
             Head(
@@ -382,64 +395,67 @@ def setup_api_routes(app, db):
             if not message:
                 raise HTTPException(status_code=400, detail="Message is required")
 
-            with db.get_schema_connection(schema) as conn:
-                with conn.cursor() as cur:
+            def find_context():
+                # Deliberately on the sync pool, in a worker thread: retrieval
+                # takes a psycopg2 cursor through the vector, lexical and ANN
+                # layers and their sync caches, and its numpy scoring would
+                # block the event loop anyway. The connection is returned
+                # before the async writes below check one out, so a request
+                # never holds both pools' connections at once.
+                with db.get_schema_connection(schema) as conn:
+                    with conn.cursor() as cur:
+                        return llm.find_relevant_context(
+                            schema, cur, message, min_similarity=0.7
+                        )
+
+            # Find relevant context from user's notes
+            relevant_chunks = await asyncio.to_thread(find_context)
+            context_chunks = []
+            source_keys = []
+
+            for chunk in relevant_chunks:
+                context_chunks.append(chunk[0])
+                source_keys.append(chunk[1])
+
+            # Construct messages for GPT
+            messages = [
+                {
+                    "role": "system",
+                    "content": """You are Voice2Note's AI assistant, helping users understand their transcribed voice notes.
+                    Provide clear, concise responses and when referencing information, mention only once and at the end of the message which note it comes from in this format: (Note 1). 
+                    Only do the latter if asked something about a note.
+                    Use titles, split paragraphs and bullet points to make the response more readable.
+                    Avoid verbosity and output the responses in a reading friendly format. Treat the user as 'You', since all 
+                    the questions will be about their notes.
+                    Answer in the same language as the user's notes.""",
+                }
+            ]
+
+            if context_chunks:
+                context_message = "Here are relevant parts of your notes:\n\n"
+                for idx, chunk in enumerate(context_chunks):
+                    context_message += f"Note {idx + 1}:\n{chunk}\n\n"
+                messages.append({"role": "system", "content": context_message})
+
+            messages.append({"role": "user", "content": message})
+
+            # Get response from OpenAI
+            response = await asyncio.to_thread(llm.get_chat_completion, messages)
+
+            async with adb.schema_connection(schema) as conn:
+                async with conn.cursor() as cur:
                     # Create chat if doesn't exist
-                    cur.execute(
+                    await cur.execute(
                         f"""
                         INSERT INTO {schema}.chats (chat_id, title)
                         VALUES (%s, %s)
                         ON CONFLICT (chat_id) DO NOTHING
-                        RETURNING chat_id
                         """,
                         (chat_id, "New Chat"),
                     )
 
-                    # If a new chat was created (not conflict)
-                    if cur.fetchone():
-                        # Invalidate notes cache for new chat
-                        invalidate_note_cache(schema)
-                        logger.info(
-                            f"Notes cache invalidated for {schema} after new chat creation"
-                        )
-
-                    # Find relevant context from user's notes
-                    relevant_chunks = llm.find_relevant_context(schema, cur, message)
-                    context_chunks = []
-                    source_keys = []
-
-                    for chunk in relevant_chunks:
-                        if chunk[2] > 0.7:
-                            context_chunks.append(chunk[0])
-                            source_keys.append(chunk[1])
-
-                    # Construct messages for GPT
-                    messages = [
-                        {
-                            "role": "system",
-                            "content": """You are Voice2Note's AI assistant, helping users understand their transcribed voice notes.
-                            Provide clear, concise responses and when referencing information, mention only once and at the end of the message which note it comes from in this format: (Note 1). 
-                            Only do the latter if asked something about a note.
-                            Use titles, split paragraphs and bullet points to make the response more readable.
-                            Avoid verbosity and output the responses in a reading friendly format. Treat the user as 'You', since all 
-                            the questions will be about their notes.
-                            Answer in the same language as the user's notes.""",
-                        }
-                    ]
-
-                    if context_chunks:
-                        context_message = "Here are relevant parts of your notes:\n\n"
-                        for idx, chunk in enumerate(context_chunks):
-                            context_message += f"Note {idx + 1}:\n{chunk}\n\n"
-                        messages.append({"role": "system", "content": context_message})
-
-                    messages.append({"role": "user", "content": message})
-
-                    # Get response from OpenAI
-                    response = llm.get_chat_completion(messages)
-
                     # Store user message
-                    cur.execute(
+                    await cur.execute(
                         f"""
                         INSERT INTO {schema}.chat_messages (chat_id, role, content)
                         VALUES (%s, 'user', %s)
@@ -448,7 +464,7 @@ def setup_api_routes(app, db):
                     )
 
                     # Store assistant response
-                    cur.execute(
+                    await cur.execute(
                         f"""
                         INSERT INTO {schema}.chat_messages (chat_id, role, content, source_refs)
                         VALUES (%s, 'assistant', %s, %s)
@@ -464,21 +480,24 @@ def setup_api_routes(app, db):
                         ),
                     )
 
-                    # Check if we should generate a title (at least 3 messages required)
-                    cur.execute(
+                    # Keep the notes list metadata on the chat row current and
+                    # check if we should generate a title (at least 3 messages required)
+                    await cur.execute(
                         f"""
-                        SELECT COUNT(*), title FROM {schema}.chat_messages 
-                        JOIN {schema}.chats ON chat_messages.chat_id = chats.chat_id
-                        WHERE chat_messages.chat_id = %s
-                        GROUP BY title
+                        UPDATE {schema}.chats
+                        SET preview = COALESCE(preview, %s),
+                            message_count = message_count + 2,
+                            last_message_at = CURRENT_TIMESTAMP
+                        WHERE chat_id = %s
+                        RETURNING message_count, title
                         """,
-                        (chat_id,),
+                        (message, chat_id),
                     )
-                    result = cur.fetchone()
+                    result = await cur.fetchone()
 
                     if result and result[0] >= 3 and result[1] == "New Chat":
                         # Get recent messages for title generation
-                        cur.execute(
+                        await cur.execute(
                             f"""
                             SELECT role, content 
                             FROM {schema}.chat_messages 
@@ -489,12 +508,15 @@ def setup_api_routes(app, db):
                             (chat_id,),
                         )
                         title_messages = [
-                            {"role": m[0], "content": m[1]} for m in cur.fetchall()
+                            {"role": m[0], "content": m[1]}
+                            for m in await cur.fetchall()
                         ]
 
-                        new_title = llm.generate_chat_title(title_messages)
+                        new_title = await asyncio.to_thread(
+                            llm.generate_chat_title, title_messages
+                        )
 
-                        cur.execute(
+                        await cur.execute(
                             f"""
                             UPDATE {schema}.chats 
                             SET title = %s 
@@ -503,7 +525,8 @@ def setup_api_routes(app, db):
                             (new_title, chat_id),
                         )
 
-                    conn.commit()
+            # The chat's preview and message count in the notes list changed
+            await invalidate_note_cache(schema)
 
             return {
                 "response": response,
@@ -551,7 +574,7 @@ def setup_api_routes(app, db):
                     conn.commit()
 
                     # Invalidate notes cache after successful deletion
-                    invalidate_note_cache(schema)
+                    await invalidate_note_cache(schema)
                     logger.info(
                         f"Notes cache invalidated for {schema} after chat deletion"
                     )
@@ -571,9 +594,9 @@ def setup_api_routes(app, db):
             raise HTTPException(status_code=401, detail="Not authenticated")
 
         try:
-            with db.get_schema_connection(schema) as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
+            async with adb.schema_connection(schema) as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
                         f"""
                         SELECT role, content, source_refs, 
                                 TO_CHAR(created_at, 'HH24:MI') as time
@@ -584,7 +607,7 @@ def setup_api_routes(app, db):
                         """,
                         (chat_id, offset),
                     )
-                    messages = cur.fetchall()
+                    messages = await cur.fetchall()
 
                     return [
                         {
@@ -706,7 +729,7 @@ def setup_api_routes(app, db):
             logger.info(f"Audio file uploaded to S3: {s3_key}")
 
             # Invalidate notes cache after successful save
-            invalidate_note_cache(schema)
+            await invalidate_note_cache(schema)
             logger.info(f"Notes cache invalidated for {schema} after new audio save")
 
             return {"audio_key": audio_key}
@@ -733,10 +756,10 @@ def setup_api_routes(app, db):
                     status_code=400, detail="Title and transcript cannot be empty"
                 )
 
-            with db.get_schema_connection(schema) as conn:
-                with conn.cursor() as cur:
+            async with adb.schema_connection(schema) as conn:
+                async with conn.cursor() as cur:
                     # Verify note exists
-                    cur.execute(
+                    await cur.execute(
                         f"""
                         SELECT transcription 
                         FROM {schema}.transcripts 
@@ -744,7 +767,7 @@ def setup_api_routes(app, db):
                         """,
                         (audio_key,),
                     )
-                    result = cur.fetchone()
+                    result = await cur.fetchone()
                     if not result:
                         raise HTTPException(status_code=404, detail="Note not found")
 
@@ -757,7 +780,7 @@ def setup_api_routes(app, db):
                         "edited_at": datetime.now().isoformat(),
                     }
 
-                    cur.execute(
+                    await cur.execute(
                         f"""
                         UPDATE {schema}.transcripts 
                         SET transcription = %s::jsonb
@@ -766,18 +789,17 @@ def setup_api_routes(app, db):
                         (json.dumps(updated_transcription), audio_key),
                     )
 
-                    conn.commit()
-                    logger.info(f"Updated note content for audio_key {audio_key}")
+            logger.info(f"Updated note content for audio_key {audio_key}")
 
-                    # Invalidate cache after successful edit
-                    invalidate_note_cache(schema, audio_key)
-                    return JSONResponse(
-                        {
-                            "success": True,
-                            "audio_key": audio_key,
-                            "edited_at": updated_transcription["edited_at"],
-                        }
-                    )
+            # Invalidate cache after successful edit
+            await invalidate_note_cache(schema, audio_key)
+            return JSONResponse(
+                {
+                    "success": True,
+                    "audio_key": audio_key,
+                    "edited_at": updated_transcription["edited_at"],
+                }
+            )
 
         except HTTPException:
             raise
@@ -794,20 +816,20 @@ def setup_api_routes(app, db):
             raise HTTPException(status_code=401, detail="Not authenticated")
 
         try:
-            # Use schema connection from pool
-            with db.get_schema_connection(schema) as conn:
-                with conn.cursor() as cur:
+            # Use schema connection from the async pool
+            async with adb.schema_connection(schema) as conn:
+                async with conn.cursor() as cur:
                     # Check if note exists
-                    cur.execute(
+                    await cur.execute(
                         f"SELECT 1 FROM {schema}.audios WHERE audio_key = %s AND deleted_at IS NULL",
                         (audio_key,),
                     )
 
-                    if not cur.fetchone():
+                    if not await cur.fetchone():
                         raise HTTPException(status_code=404, detail="Note not found")
 
                     # Soft delete audio and transcript
-                    cur.execute(
+                    await cur.execute(
                         f"""
                         WITH audio_update AS (
                             UPDATE {schema}.audios 
@@ -822,7 +844,7 @@ def setup_api_routes(app, db):
                     )
 
                     # Delete vector embedding
-                    cur.execute(
+                    await cur.execute(
                         f"""
                         UPDATE {schema}.note_vectors 
                         SET deleted_at = CURRENT_TIMESTAMP
@@ -831,19 +853,43 @@ def setup_api_routes(app, db):
                         (audio_key,),
                     )
 
-                    conn.commit()
-
-                    # Invalidate cache after successful deletion
-                    invalidate_note_cache(schema, audio_key)
+            # Invalidate cache after successful deletion
+            await invalidate_note_cache(schema, audio_key)
 
-                    logger.info(
-                        f"Removed audio, transcript and vector embedding for audio_key {audio_key}."
-                    )
+            logger.info(
+                f"Removed audio, transcript and vector embedding for audio_key {audio_key}."
+            )
 
-                    return {"success": True}
+            return {"success": True}
 
         except Exception as e:
             logger.error(f"Error deleting note: {str(e)}")
             raise HTTPException(status_code=500, detail="Error deleting note")
 
+    # Admin Routes
+    @app.route("/api/admin/metrics", methods=["GET"])
+    async def admin_metrics(request: Request):
+        """
+        Cache and connection pool metrics of this worker in the Prometheus
+        text format.
+
+        Requires ``Authorization: Bearer <METRICS_TOKEN>``; without a
+        configured token the endpoint does not exist.
+        """
+        if not METRICS_TOKEN:
+            raise HTTPException(status_code=404, detail="Not found")
+        authorization = request.headers.get("authorization", "")
+        if not bearer_authorized(authorization, METRICS_TOKEN):
+            raise HTTPException(status_code=401, detail="Not authorized")
+
+        body = (
+            cache.metrics.render()
+            + llm.embedding_cache.metrics.render()
+            + db.db_config.metrics.render()
+            + adb.metrics.render()
+        )
+        return PlainTextResponse(
+            body, media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
     return app
@@ -0,0 +1,379 @@
+"""
+Asyncio data access for the Voice2Note API routes.
+
+Route handlers are async, so a blocking psycopg2 query stalls every request
+on the worker. AsyncDatabase serves them from psycopg 3 async connection
+pools instead, with the same %s placeholders and the same per-schema role
+model as DatabaseManager:
+
+- DB_POOL_MODE=shared: one pool logged in as DB_TENANT_USER. Each checkout
+  switches to the user's role and search_path, and the pool's reset
+  callback switches back before the connection is reused, discarding it if
+  that fails.
+- per_user: a lazy pool per user_{id} role, authenticated with the
+  password from DatabaseConfig's credential cache. Idle connections close
+  after DB_USER_POOL_IDLE_TIMEOUT and the registry keeps at most
+  DB_USER_POOLS_MAX pools, evicting the least recently used. A pool whose
+  credentials the server rejects is dropped at once, and bootstrapped again
+  on the next request.
+
+The sync pools keep serving the other routes, so both share one connection
+budget per role: these pools are sized DB_ASYNC_USER_POOL_MAX and
+DB_ASYNC_TENANT_POOL_MAX, and the sync pools get the rest of
+DB_USER_POOL_MAX and DB_TENANT_POOL_MAX.
+
+Pools are opened on first use, inside the worker's event loop.
+
+Usage:
+    adb = AsyncDatabase(db)
+    async with adb.schema_connection(schema) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(f"SELECT ... FROM {schema}.chats WHERE chat_id = %s", (chat_id,))
+    # Committed when the block exits, rolled back if it raises
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+from psycopg import AsyncConnection, OperationalError, sql
+from psycopg_pool import AsyncConnectionPool, PoolClosed
+
+from backend.config import logger
+from backend.database import POOL_BOOTSTRAP_ATTEMPTS, DatabaseManager
+from backend.metrics import LATENCY_BUCKETS, Registry
+
+# invalid_password, invalid_authorization_specification
+AUTHENTICATION_SQLSTATES = ("28P01", "28000")
+
+
+def authentication_failed(exc: OperationalError) -> bool:
+    """
+    Whether a connection attempt failed because the server rejected the
+    credentials, rather than because it could not be reached.
+
+    libpq reports connection failures without a SQLSTATE, so the message is
+    checked too.
+    """
+    return exc.sqlstate in AUTHENTICATION_SQLSTATES or (
+        "authentication failed" in str(exc)
+    )
+
+
+class AsyncDatabase:
+    """
+    Async connection pools for user schemas.
+
+    Attributes:
+        db (DatabaseManager): Sync manager whose configuration and credential
+            cache are shared
+        metrics (Registry): Pool gauges and checkout wait times
+    """
+
+    def __init__(self, db: DatabaseManager):
+        """
+        Pool sizes are the async share of the connection budget set on the
+        DatabaseConfig (DB_ASYNC_USER_POOL_MAX, DB_ASYNC_TENANT_POOL_MAX).
+
+        Args:
+            db (DatabaseManager): Sync database manager
+        """
+        self.db = db
+        self._config = db.db_config
+        self._tenant_pool = None
+        self._tenant_lock = asyncio.Lock()
+        # user_id -> pool, least recently used first
+        self._user_pools: Dict[int, AsyncConnectionPool] = OrderedDict()
+        self._bootstrap_locks: Dict[int, asyncio.Lock] = {}
+        # user_id -> schema_connection blocks using that user's pool. A pool
+        # handed out is not checked out from yet, so eviction checks these too.
+        self._pending: Dict[int, int] = {}
+        # Pool drops scheduled by rejected connection attempts
+        self._drops: Set[asyncio.Task] = set()
+        self._setup_metrics()
+
+    def _setup_metrics(self):
+        """Register pool gauges and the checkout wait histogram."""
+        self.metrics = Registry()
+        self.metrics.callback(
+            "db_async_user_pools",
+            "Per-user async connection pools currently open",
+            lambda: {(): len(self._user_pools)},
+        )
+        self.metrics.callback(
+            "db_async_pool_connections",
+            "Async pool connections, and checkouts waiting, by pool and state",
+            self._connection_counts,
+            ("pool", "state"),
+        )
+        self._pool_wait = self.metrics.histogram(
+            "db_async_pool_wait_seconds",
+            "Time async checkouts waited for a connection",
+            ("pool",),
+            buckets=(*LATENCY_BUCKETS, 5.0, 10.0, 30.0),
+        )
+
+    def _connection_counts(self) -> Dict[Tuple, int]:
+        pools = {"user": list(self._user_pools.values())}
+        if self._tenant_pool:
+            pools["tenant"] = [self._tenant_pool]
+        counts = {}
+        for name, members in pools.items():
+            idle = in_use = waiting = 0
+            for connection_pool in members:
+                stats = connection_pool.get_stats()
+                idle += stats.get("pool_available", 0)
+                in_use += stats.get("pool_size", 0) - stats.get("pool_available", 0)
+                waiting += stats.get("requests_waiting", 0)
+            counts[(name, "idle")] = idle
+            counts[(name, "in_use")] = in_use
+            counts[(name, "waiting")] = waiting
+        return counts
+
+    @staticmethod
+    def _connect_kwargs(user: str, password: str) -> dict:
+        return {
+            "dbname": os.getenv("DB_NAME"),
+            "user": user,
+            "password": password,
+            "host": os.getenv("DB_HOST"),
+            "port": os.getenv("DB_PORT"),
+        }
+
+    @asynccontextmanager
+    async def schema_connection(self, schema: str) -> AsyncIterator[AsyncConnection]:
+        """
+        Check out a connection acting as the schema's user.
+
+        The transaction is committed when the block exits and rolled back if
+        it raises.
+
+        Args:
+            schema (str): Validated user schema, "user_{id}"
+
+        Raises:
+            ValueError: If the schema name is invalid
+            OperationalError: If the server rejected the user's credentials
+            PoolTimeout: If no connection became available in time
+        """
+        user_id = DatabaseManager.get_schema_id(schema)
+        if user_id is None:
+            raise ValueError(f"Invalid schema: {schema}")
+
+        if self._config.tenant_pool:
+            kind = "tenant"
+        else:
+            kind = "user"
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+
+        try:
+            connection_pool, conn = await self._checkout(kind, user_id)
+            try:
+                async with conn:
+                    if kind == "tenant":
+                        await self._assume_role(conn, user_id)
+                    yield conn
+            finally:
+                await connection_pool.putconn(conn)
+        finally:
+            if kind == "user":
+                self._pending[user_id] -= 1
+                if not self._pending[user_id]:
+                    del self._pending[user_id]
+
+    async def _checkout(
+        self, kind: str, user_id: int
+    ) -> Tuple[AsyncConnectionPool, AsyncConnection]:
+        """
+        A connection from the shared pool or the user's pool, with its pool.
+
+        The user's pool can be evicted or dropped between the bootstrap and
+        the checkout: bootstrap it again, unless it was dropped because the
+        server rejected its credentials.
+        """
+        attempts = POOL_BOOTSTRAP_ATTEMPTS if kind == "user" else 1
+        for _ in range(attempts):
+            if kind == "tenant":
+                connection_pool = await self._get_tenant_pool()
+            else:
+                connection_pool = await self._get_user_pool(user_id)
+            start = time.monotonic()
+            try:
+                conn = await connection_pool.getconn()
+            except PoolClosed:
+                rejected = getattr(connection_pool.connection_class, "rejected", None)
+                if rejected is not None:
+                    raise OperationalError(
+                        f"Credentials for user_{user_id} were rejected"
+                    ) from rejected
+                continue
+            self._pool_wait.observe(time.monotonic() - start, pool=kind)
+            return connection_pool, conn
+        raise PoolClosed(f"No async pool stayed open for user_{user_id}")
+
+    async def _get_tenant_pool(self) -> AsyncConnectionPool:
+        """The shared pool, opened on first use."""
+        if self._tenant_pool is None:
+            async with self._tenant_lock:
+                if self._tenant_pool is None:
+                    connection_pool = AsyncConnectionPool(
+                        kwargs=self._connect_kwargs(
+                            self._config.tenant_user, os.getenv("DB_TENANT_PASSWORD")
+                        ),
+                        min_size=1,
+                        max_size=self._config.async_tenant_pool_size,
+                        timeout=self._config.pool_timeout,
+                        reset=self._release_role,
+                        name="tenant",
+                        open=False,
+                    )
+                    await connection_pool.open()
+                    self._tenant_pool = connection_pool
+        return self._tenant_pool
+
+    @staticmethod
+    async def _assume_role(conn: AsyncConnection, user_id: int):
+        """
+        Switch a shared connection to the user's role and schema.
+
+        Committed so that a rollback in the caller's block cannot drop the
+        session back to the login role.
+        """
+        role = sql.Identifier(f"user_{user_id}")
+        await conn.execute(
+            sql.SQL("SET ROLE {role}; SET search_path TO {role}").format(role=role)
+        )
+        await conn.commit()
+
+    @staticmethod
+    async def _release_role(conn: AsyncConnection):
+        """Pool reset callback: drop back to the login role before reuse."""
+        await conn.execute("RESET ROLE; RESET search_path")
+        await conn.commit()
+
+    async def _get_user_pool(self, user_id: int) -> AsyncConnectionPool:
+        """The user's pool, created on first use by a single bootstrap."""
+        connection_pool = self._user_pools.get(user_id)
+        if connection_pool is None:
+            lock = self._bootstrap_locks.setdefault(user_id, asyncio.Lock())
+            try:
+                async with lock:
+                    connection_pool = self._user_pools.get(user_id)
+                    if connection_pool is None:
+                        connection_pool = await self._create_user_pool(user_id)
+            finally:
+                if self._bootstrap_locks.get(user_id) is lock:
+                    del self._bootstrap_locks[user_id]
+        # Dropped meanwhile if its connections failed; the caller's checkout
+        # then fails too
+        if user_id in self._user_pools:
+            self._user_pools.move_to_end(user_id)
+        return connection_pool
+
+    async def _create_user_pool(self, user_id: int) -> AsyncConnectionPool:
+        """Open a lazy pool for user_{id} and register it."""
+        password = await asyncio.to_thread(self.db.user_db_password, user_id)
+        connection_class = self._user_connection_class(user_id)
+        connection_pool = AsyncConnectionPool(
+            kwargs=self._connect_kwargs(f"user_{user_id}", password),
+            connection_class=connection_class,
+            min_size=0,
+            max_size=self._config.async_user_pool_size,
+            timeout=self._config.pool_timeout,
+            max_idle=max(self._config.user_pool_idle_timeout, 1),
+            name=f"user_{user_id}",
+            open=False,
+        )
+        connection_class.pool = connection_pool
+        await connection_pool.open()
+        self._user_pools[user_id] = connection_pool
+        await self._evict_user_pools()
+        return connection_pool
+
+    def _user_connection_class(self, user_id: int) -> type:
+        """
+        Connection class for one pool of user_{id}, which drops the pool as
+        soon as the server rejects its credentials.
+
+        The pool connects in a worker task and keeps retrying failed attempts
+        until the checkout times out. Stale credentials never recover, so the
+        pool is closed instead, failing its waiting checkouts at once.
+        """
+        adb = self
+
+        class UserConnection(AsyncConnection):
+            # The pool using this class, and the error that closed it
+            pool: Optional[AsyncConnectionPool] = None
+            rejected: Optional[OperationalError] = None
+
+            @classmethod
+            async def connect(cls, *args, **kwargs):
+                try:
+                    return await super().connect(*args, **kwargs)
+                except OperationalError as exc:
+                    if cls.rejected is None and authentication_failed(exc):
+                        cls.rejected = exc
+                        # Closing the pool waits for its workers, this one
+                        # included, so it runs in a task of its own
+                        task = asyncio.create_task(
+                            adb._drop_user_pool(user_id, cls.pool)
+                        )
+                        adb._drops.add(task)
+                        task.add_done_callback(adb._drops.discard)
+                    raise
+
+        return UserConnection
+
+    async def _evict_user_pools(self):
+        """Close least recently used pools nobody is using or about to use."""
+        for user_id in list(self._user_pools):
+            if len(self._user_pools) <= self._config.max_user_pools:
+                return
+            if self._pending.get(user_id):
+                continue
+            stats = self._user_pools[user_id].get_stats()
+            if stats.get("pool_size", 0) > stats.get("pool_available", 0):
+                continue
+            await self._user_pools.pop(user_id).close()
+
+    async def forget_user(self, user_id: int):
+        """
+        Close a user's pool, so that the next request bootstraps a new one
+        with the credential currently cached.
+
+        Call after DatabaseManager.handle_password_reset: connections opened
+        with the old password would be rejected.
+
+        Args:
+            user_id (int): User whose pool to close
+        """
+        connection_pool = self._user_pools.pop(user_id, None)
+        if connection_pool is not None:
+            await connection_pool.close()
+
+    async def _drop_user_pool(
+        self, user_id: int, connection_pool: Optional[AsyncConnectionPool] = None
+    ):
+        """
+        Forget a user's pool and cached password after the server rejected
+        them. Given a pool, only that pool is dropped, not one bootstrapped
+        since.
+        """
+        current = self._user_pools.get(user_id)
+        if connection_pool is not None and current is not connection_pool:
+            await connection_pool.close()
+            return
+        self.db.cache_db_password(user_id, None)
+        logger.warning(f"Closing async pool for user_{user_id}: credentials rejected")
+        await self.forget_user(user_id)
+
+    async def close(self):
+        """Close every pool."""
+        if self._tenant_pool:
+            await self._tenant_pool.close()
+            self._tenant_pool = None
+        while self._user_pools:
+            await self._user_pools.popitem()[1].close()
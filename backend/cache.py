@@ -5,6 +5,37 @@ Implements a two-level caching strategy:
 1. In-memory LRU cache for frequently accessed queries
 2. Redis cache for distributed caching across workers
 
+Values are encoded for Redis by a pluggable Codec (see backend.codecs). The
+memory tier holds them already decoded, so memory hits cost no
+deserialization; treat returned values as read-only. It is bounded by
+total bytes rather than entry count, each entry weighing its key plus its
+encoded payload, and evicts the least recently used entries once full.
+
+Hits, misses, sets, deletes, evictions, codec time, Redis latency and
+errors are counted in ``QueryCache.metrics``, labelled by key prefix
+("notes", "note", ...), and rendered in the Prometheus text format by the
+admin metrics endpoint.
+
+Keys can live in versioned namespaces (one per user schema): every key
+embeds the namespace's current generation, kept in Redis and mirrored in
+memory, so invalidating a whole namespace is a single INCR and the old
+entries age out through their TTL.
+
+Invalidations (deletes, generation bumps, clears) are broadcast on a Redis
+pub/sub channel. Every worker runs a background listener that applies them
+to its own memory tier, so one worker's edit is not served stale from
+another worker's memory.
+
+get_or_compute coalesces concurrent misses: one caller per process (and,
+through a Redis lock, per deployment) computes the value while the others
+wait for it. With stale_ttl, expired values keep being served while a
+single background refresh runs.
+
+Redis calls go through a circuit breaker: after repeated connection
+failures the cache is memory-only until a background thread manages to
+reconnect, so an outage costs microseconds per call instead of a socket
+timeout.
+
 Usage:
     cache = QueryCache()
     
@@ -19,41 +50,442 @@ Usage:
     if result is None:
         result = execute_query()
         cache.set(cache_key, result)
+
+    # Single-flight, serving stale values for up to a minute while refreshing
+    result = cache.get_or_compute(cache_key, execute_query, stale_ttl=60)
+
+    # Namespaced
+    cache_key = cache.namespaced_key("user_1", "notes", page)
+    ...
+    cache.bump_generation("user_1")  # retires every user_1 key
 """
 
+import asyncio
 import hashlib
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import wraps
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 import redis
+import redis.asyncio
 from cachetools import TTLCache
-import logging
-import datetime
 
-logger = logging.getLogger(__name__)
+from backend import cache_generations
+from backend.cache_generations import INVALIDATION_CHANNEL
+from backend.codecs import Codec
+from backend.config import logger
+from backend.metrics import Registry
+
+
+# Deletes a lock only if it still holds our token, so a lock that expired and
+# was taken by another process is left alone
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Keys per UNLINK command when clearing
+UNLINK_BATCH = 500
+
+# Threads recomputing stale get_or_compute entries, and the most refreshes
+# queued or running at once. Beyond that, stale values are served as they
+# are and refreshed by a later caller.
+REFRESH_WORKERS = 4
+MAX_PENDING_REFRESHES = 64
+
+
+class _MemoryTier(TTLCache):
+    """
+    TTLCache of (value, nbytes) entries bounded by total bytes.
+
+    Expired entries are dropped first, then the least recently used ones
+    until the new entry fits. Both are counted for capacity planning.
+
+    TTLCache is not thread-safe, and even reads reorder it, so request
+    threads, the invalidation listener and metrics scrapes must all hold
+    ``lock`` while they touch the tier.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        super().__init__(maxsize=max_bytes, ttl=ttl, getsizeof=lambda entry: entry[1])
+        self.lock = threading.RLock()
+        self.evictions = 0
+        self.expirations = 0
+        self.oversized = 0
+
+    # Reentrant: these run inside __setitem__ and get, under the caller's lock
+
+    def popitem(self):
+        with self.lock:
+            item = super().popitem()
+            self.evictions += 1
+            return item
+
+    def expire(self, time=None):
+        with self.lock:
+            expired = super().expire(time)
+            self.expirations += len(expired)
+            return expired
+
+
+def key_prefix(key: str) -> str:
+    """
+    Metrics label for a key: the first part after a namespace's generation
+    ("user_1:g3:notes:..." -> "notes"), else the part before the first colon.
+    Hashed keys without a prefix are grouped as "other".
+    """
+    parts = key.split(":", 3)
+    if len(parts) > 2 and parts[1][:1] == "g" and parts[1][1:].isdigit():
+        return parts[2]
+    return parts[0] if len(parts) > 1 else "other"
+
+
+# Redis commands whose first argument is the one key they act on
+SINGLE_KEY_OPS = frozenset({"get", "set", "setex", "delete"})
+
+
+def command_prefix(op: str, args: tuple) -> str:
+    """Metrics prefix of a single-key Redis command, "" for any other call."""
+    if op in SINGLE_KEY_OPS and args and isinstance(args[0], str):
+        return key_prefix(args[0])
+    return ""
+
+
+def entry_size(key: str, payload: bytes) -> int:
+    """Default memory-tier accounting: key plus encoded payload bytes."""
+    return len(key) + len(payload)
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive Redis connectivity failures.
+
+    While open, the cache skips Redis entirely; a reconnect thread probes it
+    every ``cooldown`` seconds, doubling up to ``max_cooldown``, and resets
+    the breaker once Redis answers.
+
+    Attributes:
+        failure_threshold (int): Consecutive failures that open the circuit
+        cooldown (float): Seconds before the first probe
+        max_cooldown (float): Longest wait between probes
+        failures (int): Current run of consecutive failures
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        cooldown: float = 1.0,
+        max_cooldown: float = 30.0,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self._open = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    def record_success(self):
+        # Reads without the lock: a racing failure is recounted next time
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+
+    def record_failure(self) -> bool:
+        """Count a failure; True if it opened the circuit."""
+        with self._lock:
+            self.failures += 1
+            if not self._open and self.failures >= self.failure_threshold:
+                self._open = True
+                return True
+            return False
+
+    def trip(self):
+        with self._lock:
+            self._open = True
+
+    def reset(self):
+        with self._lock:
+            self._open = False
+            self.failures = 0
+
+
+class _Flight:
+    """One in-process computation of a key, shared by everyone waiting on it."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
 
 
 class QueryCache:
     def __init__(
         self,
         redis_url: str = "redis://localhost:6379/0",
-        memory_maxsize: int = 1000,
+        memory_max_bytes: int = 64 * 1024 * 1024,
         memory_ttl: int = 300,
+        generation_ttl: float = 1.0,
+        invalidation_channel: Optional[str] = INVALIDATION_CHANNEL,
+        codec: Optional[Codec] = None,
+        sizeof: Callable[[str, bytes], int] = entry_size,
+        breaker: Optional[CircuitBreaker] = None,
     ):
-        """Initialize cache with fallback to memory-only if Redis is unavailable."""
+        """
+        Initialize cache with fallback to memory-only if Redis is unavailable.
+
+        Args:
+            redis_url: Redis connection URL
+            memory_max_bytes: Byte budget of the in-memory tier
+            memory_ttl: Seconds entries live in the in-memory tier
+            generation_ttl: Seconds a namespace generation read from Redis is
+                reused before it is read again. Bumps made by this process
+                are visible immediately; bumps from other processes as
+                soon as their broadcast arrives, and after at most this
+                delay if it is lost
+            invalidation_channel: Redis pub/sub channel invalidations are
+                broadcast on, None to keep them local
+            codec: Codec values are stored in Redis with, JSON by default
+            sizeof: Bytes charged to the memory tier for a key and its
+                encoded payload
+            breaker: Circuit breaker guarding Redis calls
+        """
         # Setup Redis connection
         self.redis = None
         self.redis_url = redis_url
+        self.breaker = breaker or CircuitBreaker()
+        self._reconnector_pid = None
+        # Namespaces bumped while Redis was skipped, replayed on reconnect
+        self._pending_bumps = set()
 
         # Increased memory cache size since we might be memory-only
-        self.memory_cache = TTLCache(maxsize=memory_maxsize, ttl=memory_ttl)
+        self.memory_cache = _MemoryTier(memory_max_bytes, memory_ttl)
+        self.sizeof = sizeof
         self.default_timeout = 300
+        self.codec = codec or Codec()
+
+        # Namespace generations mirrored from Redis: namespace -> (generation, read_at)
+        self.generation_ttl = generation_ttl
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        self._generations_lock = threading.Lock()
+
+        # Cross-worker invalidation. The listener thread is started lazily in
+        # the process that uses the cache, so it survives a pre-fork server.
+        self.invalidation_channel = invalidation_channel
+        self._origin = f"{os.getpid()}:{id(self)}"
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+        # In-flight get_or_compute computations: key -> _Flight
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        # Stale-while-revalidate refreshes, on an executor made per process
+        self._refresher = None
+        self._refresher_pid = None
+        self._pending_refreshes = 0
+
+        self._setup_metrics()
 
         # Try to connect to Redis
         self._connect_redis()
 
+    def _setup_metrics(self):
+        """Register the cache's metrics in its own registry."""
+        self.metrics = Registry()
+        self._hits = self.metrics.counter(
+            "querycache_hits_total", "Cache hits by tier", ("tier", "prefix")
+        )
+        self._misses = self.metrics.counter(
+            "querycache_misses_total", "Lookups not found in any tier", ("prefix",)
+        )
+        self._sets = self.metrics.counter(
+            "querycache_sets_total", "Values stored", ("prefix",)
+        )
+        self._deletes = self.metrics.counter(
+            "querycache_deletes_total", "Keys deleted", ("prefix",)
+        )
+        self._coalesced = self.metrics.counter(
+            "querycache_coalesced_total",
+            "get_or_compute callers served without computing: waited on another "
+            "caller's computation, or served a stale value while it refreshed",
+            ("outcome", "prefix"),
+        )
+        self._trips = self.metrics.counter(
+            "querycache_circuit_trips_total", "Times the Redis circuit opened"
+        )
+        self.metrics.callback(
+            "querycache_circuit_open",
+            "1 while Redis is skipped after repeated failures",
+            lambda: {(): int(self.breaker.is_open)},
+        )
+        self._errors = self.metrics.counter(
+            "querycache_errors_total",
+            "Failed cache operations",
+            ("op", "prefix"),
+        )
+        self._codec_seconds = self.metrics.histogram(
+            "querycache_codec_seconds", "Time spent encoding and decoding", ("op",)
+        )
+        self._redis_seconds = self.metrics.histogram(
+            "querycache_redis_seconds",
+            "Redis command latency",
+            ("op", "prefix"),
+        )
+        self.metrics.callback(
+            "querycache_memory_evictions_total",
+            "Entries dropped from the memory tier",
+            self._eviction_counts,
+            ("reason",),
+            kind="counter",
+        )
+        self.metrics.callback(
+            "querycache_memory_entries",
+            "Entries in the memory tier",
+            lambda: {(): self.memory_stats()["entries"]},
+        )
+        self.metrics.callback(
+            "querycache_memory_bytes",
+            "Bytes charged to the memory tier",
+            lambda: {(): self.memory_stats()["bytes"]},
+        )
+
+    def _eviction_counts(self) -> Dict[Tuple, int]:
+        stats = self.memory_stats()
+        return {
+            ("lru",): stats["evictions"],
+            ("expired",): stats["expirations"],
+            ("oversized",): stats["oversized"],
+        }
+
+    def _call_redis(self, op: str, *args, **kwargs):
+        """Run one Redis command, recording its latency and any error."""
+        with self.redis_call(op, args):
+            return getattr(self.redis, op)(*args, **kwargs)
+
+    @contextmanager
+    def redis_call(self, op: str, args: tuple = ()):
+        """
+        Wrap one Redis call, sync or awaited, recording its latency and any
+        error and feeding the circuit breaker.
+
+        Args:
+            op: Redis command name
+            args: Command arguments, for the key prefix label
+        """
+        prefix = command_prefix(op, args)
+        start = time.perf_counter()
+        try:
+            yield
+            self.breaker.record_success()
+        except Exception as e:
+            self._errors.inc(op=f"redis_{op}", prefix=prefix)
+            self._redis_failed(e)
+            raise
+        finally:
+            self._redis_seconds.observe(
+                time.perf_counter() - start, op=op, prefix=prefix
+            )
+
+    @property
+    def redis_available(self) -> bool:
+        """Whether Redis is configured and its circuit is closed."""
+        return self._redis_ready()
+
+    def _redis_ready(self) -> bool:
+        """
+        Whether to call Redis at all.
+
+        False without Redis, and while the circuit is open: callers skip
+        Redis in microseconds instead of waiting for socket timeouts, and a
+        background thread probes it until it recovers.
+        """
+        if self.redis is None:
+            return False
+        if self.breaker.is_open:
+            self._ensure_reconnector()
+            return False
+        return True
+
+    def _redis_failed(self, error: Exception):
+        """Count a connectivity failure, opening the circuit at the threshold."""
+        if isinstance(error, (redis.ConnectionError, redis.TimeoutError)):
+            if self.breaker.record_failure():
+                logger.warning(
+                    f"Redis failing ({error}), using memory-only cache until it recovers"
+                )
+                self._trips.inc()
+                self._ensure_reconnector()
+
+    def _ensure_reconnector(self):
+        """Start the reconnect thread in this process if it is missing."""
+        if self._reconnector_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._reconnector_pid == os.getpid():
+                return
+            self._reconnector_pid = os.getpid()
+            threading.Thread(
+                target=self._reconnect, name="cache-reconnect", daemon=True
+            ).start()
+
+    def _reconnect(self):
+        """Probe Redis with exponential backoff until it answers, then close."""
+        delay = self.breaker.cooldown
+        while self.breaker.is_open:
+            time.sleep(delay)
+            try:
+                self.redis.ping()
+            except Exception as e:
+                logger.debug(f"Redis still unavailable: {e}")
+                delay = min(delay * 2, self.breaker.max_cooldown)
+                continue
+
+            # Entries written while Redis was skipped may predate bumps that
+            # never reached it: replay those, and start the local tier over
+            with self._generations_lock:
+                pending, self._pending_bumps = self._pending_bumps, set()
+            self._drop_local()
+            # Cleared before the reset, so a new trip starts a new thread
+            self._reconnector_pid = None
+            self.breaker.reset()
+            for namespace in pending:
+                self.bump_generation(namespace)
+            logger.info("Redis cache reconnected")
+            return
+        self._reconnector_pid = None
+
+    def _encode(self, value: Any) -> bytes:
+        start = time.perf_counter()
+        try:
+            return self.codec.dumps(value)
+        finally:
+            self._codec_seconds.observe(time.perf_counter() - start, op="encode")
+
+    def _decode(self, payload: bytes) -> Any:
+        start = time.perf_counter()
+        try:
+            return self.codec.loads(payload)
+        finally:
+            self._codec_seconds.observe(time.perf_counter() - start, op="decode")
+
     def _connect_redis(self):
-        """Attempt to connect to Redis with timeout"""
+        """
+        Connect to Redis with timeout.
+
+        If Redis is down at boot the circuit starts open and the cache is
+        memory-only until the background reconnect succeeds.
+        """
         try:
             self.redis = redis.from_url(
                 self.redis_url,
@@ -61,13 +493,111 @@ class QueryCache:
                 socket_timeout=2,
                 retry_on_timeout=True,
             )
-            self.redis.ping()
-            logger.info("Redis cache initialized")
         except Exception as e:
             logger.warning(
                 f"Redis unavailable at {self.redis_url}, using memory-only cache: {e}"
             )
             self.redis = None
+            return
+
+        try:
+            self.redis.ping()
+            logger.info("Redis cache initialized")
+        except Exception as e:
+            logger.warning(
+                f"Redis unavailable at {self.redis_url}, using memory-only cache "
+                f"until it recovers: {e}"
+            )
+            self.breaker.trip()
+            self._trips.inc()
+            self._ensure_reconnector()
+
+    def _ensure_listener(self):
+        """Start the invalidation listener in this process if it is missing."""
+        if (
+            not self.redis
+            or not self.invalidation_channel
+            or self._listener_pid == os.getpid()
+        ):
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            # A forked child inherits the parent's origin; give it its own
+            self._origin = f"{os.getpid()}:{id(self)}"
+            threading.Thread(
+                target=self._listen, name="cache-invalidation", daemon=True
+            ).start()
+            self._listener_pid = os.getpid()
+
+    def _listen(self):
+        """Apply invalidations broadcast by other workers, reconnecting on errors."""
+        backoff = 1
+        while True:
+            if self.breaker.is_open:
+                # The reconnect thread probes Redis meanwhile
+                time.sleep(self.breaker.cooldown)
+                continue
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.invalidation_channel)
+                # Anything broadcast while unsubscribed was missed
+                self._drop_local()
+                backoff = 1
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_invalidation(message["data"])
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener error: {e}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _drop_local(self):
+        """Forget every local entry and mirrored generation."""
+        with self.memory_cache.lock:
+            self.memory_cache.clear()
+        with self._generations_lock:
+            self._generations.clear()
+
+    def _apply_invalidation(self, data):
+        """Apply one broadcast invalidation to the local tier."""
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Ignoring malformed cache invalidation: {e}")
+            return
+        if message.get("origin") == self._origin:
+            return
+
+        if message.get("clear"):
+            self._drop_local()
+        with self.memory_cache.lock:
+            for key in message.get("keys", ()):
+                self.memory_cache.pop(key, None)
+        namespace = message.get("namespace")
+        if namespace is not None:
+            generation = int(message["generation"])
+            with self._generations_lock:
+                mirrored = self._generations.get(namespace)
+                if not mirrored or mirrored[0] < generation:
+                    self._generations[namespace] = (generation, time.monotonic())
+        logger.debug(f"Applied cache invalidation: {message}")
+
+    def _invalidation_message(self, **message) -> str:
+        return json.dumps({"origin": self._origin, **message})
+
+    def _publish_invalidation(self, **message):
+        """Broadcast an invalidation to the other workers."""
+        if not self._redis_ready() or not self.invalidation_channel:
+            return
+        try:
+            self._call_redis(
+                "publish",
+                self.invalidation_channel,
+                self._invalidation_message(**message),
+            )
+        except Exception as e:
+            logger.warning(f"Error publishing cache invalidation: {e}")
 
     def make_key(self, *args, **kwargs) -> str:
         """Generate a unique cache key from arguments"""
@@ -76,63 +606,458 @@ class QueryCache:
         key_string = "|".join(key_parts)
         return hashlib.sha256(key_string.encode()).hexdigest()
 
+    @staticmethod
+    def generation_key(namespace: str) -> str:
+        """Redis key holding a namespace's generation counter."""
+        return cache_generations.generation_key(namespace)
+
+    def generation(self, namespace: str) -> int:
+        """
+        Current generation of a namespace.
+
+        Read from Redis at most once per ``generation_ttl`` and mirrored in
+        memory in between. Memory-only caches keep the counter in-process.
+
+        Args:
+            namespace: Namespace name, e.g. a user schema
+
+        Returns:
+            Generation number, 0 for a namespace never bumped
+        """
+        self._ensure_listener()
+        fresh, generation = self._mirrored_generation(namespace)
+        if fresh:
+            return generation
+
+        if self._redis_ready():
+            try:
+                generation = int(
+                    self._call_redis("get", self.generation_key(namespace)) or 0
+                )
+            except Exception as e:
+                logger.warning(f"Error reading generation of {namespace}: {e}")
+
+        self._mirror_generation(namespace, generation)
+        return generation
+
+    def _mirrored_generation(self, namespace: str) -> Tuple[bool, int]:
+        """Whether the mirrored generation can be used as is, and its value."""
+        with self._generations_lock:
+            mirrored = self._generations.get(namespace)
+        if mirrored is None:
+            return False, 0
+        fresh = (
+            not self._redis_ready()
+            or time.monotonic() - mirrored[1] < self.generation_ttl
+        )
+        return fresh, mirrored[0]
+
+    def _mirror_generation(self, namespace: str, generation: int):
+        with self._generations_lock:
+            self._generations[namespace] = (generation, time.monotonic())
+
+    def bump_generation(self, namespace: str) -> int:
+        """
+        Invalidate every key of a namespace with a single INCR.
+
+        Keys built with the previous generation are never read again and
+        expire through their TTL. If Redis can't be reached the bump is
+        applied locally and replayed once Redis is back.
+
+        Args:
+            namespace: Namespace name, e.g. a user schema
+
+        Returns:
+            The new generation number
+        """
+        generation = None
+        if self._redis_ready():
+            try:
+                generation = self._call_redis("eval", *self.bump_command(namespace))
+            except Exception as e:
+                logger.warning(f"Error bumping generation of {namespace}: {e}")
+        return self.record_bump(namespace, generation)
+
+    def record_bump(self, namespace: str, generation: Optional[int]) -> int:
+        """
+        Mirror the outcome of a generation bump.
+
+        Args:
+            namespace: Namespace name, e.g. a user schema
+            generation: Result of the bump_command EVAL, None if Redis was
+                skipped or failed: the bump is then applied locally and
+                replayed once Redis is back
+
+        Returns:
+            The new generation number
+        """
+        if generation is None:
+            generation = self._mirrored_generation(namespace)[1] + 1
+            if self.redis is not None:
+                with self._generations_lock:
+                    self._pending_bumps.add(namespace)
+        generation = int(generation)
+
+        self._mirror_generation(namespace, generation)
+        logger.debug(f"Bumped generation of {namespace} to {generation}")
+        return generation
+
+    def bump_command(self, namespace: str) -> tuple:
+        """EVAL arguments bumping a namespace and broadcasting it in one trip."""
+        return cache_generations.bump_command(
+            namespace,
+            self.invalidation_channel,
+            self._invalidation_message(namespace=namespace),
+        )
+
+    def namespaced_key(self, namespace: str, *parts) -> str:
+        """
+        Build a key inside a namespace's current generation.
+
+        Args:
+            namespace: Namespace name, e.g. a user schema
+            *parts: Key components, joined with ":"
+
+        Returns:
+            Key of the form "{namespace}:g{generation}:{parts}"
+        """
+        return self._join_key(namespace, self.generation(namespace), parts)
+
+    @staticmethod
+    def _join_key(namespace: str, generation: int, parts) -> str:
+        return ":".join([namespace, f"g{generation}", *(str(part) for part in parts)])
+
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache, using memory-only if Redis is unavailable."""
+        self._ensure_listener()
         # Try memory cache first
-        try:
-            value = self.memory_cache.get(key)
-            if value is not None:
-                logger.debug(f"Cache hit (memory): {key}")
-                return json.loads(value)
-        except Exception as e:
-            logger.warning(f"Error accessing memory cache: {e}")
+        value = self._memory_get(key)
+        if value is not None:
+            return value
 
         # Try Redis only if available
-        if self.redis:
+        if self._redis_ready():
             try:
-                value = self.redis.get(key)
-                if value is not None:
-                    self.memory_cache[key] = value
-                    logger.debug(f"Cache hit (redis): {key}")
-                    return json.loads(value)
+                payload = self._call_redis("get", key)
+                if payload is not None:
+                    return self._redis_hit(key, payload)
             except Exception as e:
                 logger.warning(f"Error accessing Redis cache: {e}")
 
+        self._misses.inc(prefix=key_prefix(key))
         return None
 
-    def _serialize(self, obj):
-        """Custom JSON serializer that handles datetime objects."""
-        if isinstance(obj, (datetime.date, datetime.datetime)):
-            return obj.isoformat()
-        raise TypeError(f"Type {type(obj)} not serializable")
+    def _memory_get(self, key: str) -> Optional[Any]:
+        try:
+            with self.memory_cache.lock:
+                entry = self.memory_cache.get(key)
+            if entry is not None:
+                self._hits.inc(tier="memory", prefix=key_prefix(key))
+                logger.debug(f"Cache hit (memory): {key}")
+                return entry[0]
+        except Exception as e:
+            self._errors.inc(op="memory_get", prefix=key_prefix(key))
+            logger.warning(f"Error accessing memory cache: {e}")
+        return None
+
+    def _redis_hit(self, key: str, payload: bytes) -> Any:
+        """Decode a value read from Redis and keep it in the memory tier."""
+        value = self._decode(payload)
+        self._remember(key, value, payload)
+        self._hits.inc(tier="redis", prefix=key_prefix(key))
+        logger.debug(f"Cache hit (redis): {key}")
+        return value
 
     def set(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
         """Set value in cache(s)."""
         timeout = timeout or self.default_timeout
+        serialized, success = self._set_local(key, value)
+        if serialized is None:
+            return False
+
+        # Try Redis only if available
+        if self._redis_ready():
+            try:
+                self._call_redis("setex", key, timeout, serialized)
+            except Exception as e:
+                logger.warning(f"Error setting Redis cache: {e}")
+                success = False
+
+        return success
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        timeout: Optional[int] = None,
+        stale_ttl: int = 0,
+        lock_timeout: float = 10.0,
+        distributed_lock: bool = True,
+    ) -> Any:
+        """
+        Get a value, computing it at most once across concurrent callers.
+
+        Values are stored with the time they stop being fresh, so keys used
+        here must not be read with get(). None results are not cached.
+
+        Args:
+            key: Cache key
+            compute: Zero-argument function producing the value
+            timeout: Seconds the value is fresh, or a function of the
+                computed value returning them
+            stale_ttl: Seconds an expired value is still served while one
+                background refresh recomputes it
+            lock_timeout: Seconds to wait for another caller's computation
+                before computing anyway
+            distributed_lock: Also coordinate with other processes through
+                a Redis lock
+
+        Returns:
+            The cached or computed value
+
+        Raises:
+            Exception: Whatever compute raises, for the computing caller and
+                everyone waiting on it
+        """
+        if not callable(timeout):
+            timeout = timeout or self.default_timeout
+        entry = self.get(key)
+        if isinstance(entry, dict) and "fresh_until" in entry:
+            now = time.time()
+            if now < entry["fresh_until"]:
+                return entry["value"]
+            if now < entry["fresh_until"] + stale_ttl:
+                self._refresh_in_background(
+                    key, compute, timeout, stale_ttl, lock_timeout, distributed_lock
+                )
+                self._coalesced.inc(outcome="stale", prefix=key_prefix(key))
+                return entry["value"]
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if not flight.done.wait(lock_timeout):
+                logger.warning(f"Timed out waiting for {key}, computing it")
+                return compute()
+            if flight.error is not None:
+                raise flight.error
+            if flight.value is not None:
+                self._coalesced.inc(outcome="waited", prefix=key_prefix(key))
+                logger.debug(f"Cache coalesced: {key}")
+                return flight.value
+            return compute()
+
         try:
-            serialized = json.dumps(value, default=self._serialize)
+            flight.value = self._compute_once(
+                key, compute, timeout, stale_ttl, lock_timeout, distributed_lock
+            )
+            return flight.value
         except Exception as e:
-            logger.error(f"Error serializing cache value: {e}")
-            return False
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
 
-        success = True
+    def _refresh_in_background(
+        self, key, compute, timeout, stale_ttl, lock_timeout, distributed_lock
+    ):
+        """
+        Queue a recompute of a stale key on the refresh executor, unless one
+        is already underway or too many refreshes are pending.
+        """
+        with self._flights_lock:
+            if key in self._flights:
+                return
+            if self._pending_refreshes >= MAX_PENDING_REFRESHES:
+                logger.debug(f"Refresh queue full, serving stale {key} as is")
+                return
+            flight = self._flights[key] = _Flight()
+            self._pending_refreshes += 1
+            if self._refresher is None or self._refresher_pid != os.getpid():
+                self._refresher = ThreadPoolExecutor(
+                    REFRESH_WORKERS, thread_name_prefix="cache-refresh"
+                )
+                self._refresher_pid = os.getpid()
+            refresher = self._refresher
 
-        # Always try memory cache
+        def refresh():
+            try:
+                flight.value = self._compute_once(
+                    key,
+                    compute,
+                    timeout,
+                    stale_ttl,
+                    lock_timeout,
+                    distributed_lock,
+                    wait=False,
+                )
+            except Exception as e:
+                flight.error = e
+                logger.warning(f"Background refresh of {key} failed: {e}")
+            finally:
+                with self._flights_lock:
+                    self._flights.pop(key, None)
+                    self._pending_refreshes -= 1
+                flight.done.set()
+
+        logger.debug(f"Serving stale {key} while refreshing it")
         try:
-            self.memory_cache[key] = serialized
+            refresher.submit(refresh)
+        except RuntimeError as e:
+            # Executor shut down at interpreter exit: skip the refresh
+            flight.error = e
+            with self._flights_lock:
+                self._flights.pop(key, None)
+                self._pending_refreshes -= 1
+            flight.done.set()
+
+    def _compute_once(
+        self,
+        key,
+        compute,
+        timeout,
+        stale_ttl,
+        lock_timeout,
+        distributed_lock,
+        wait: bool = True,
+    ):
+        """
+        Compute and store a value under the Redis lock for the key.
+
+        When another process holds the lock, waits for the value it stores
+        (or returns None without computing if wait is False), and computes
+        anyway once lock_timeout passes.
+        """
+        lock_key = f"lock:{key}"
+        token = None
+        if distributed_lock and self._redis_ready():
+            token = f"{self._origin}:{threading.get_ident()}:{time.time()}"
+            try:
+                if not self._call_redis(
+                    "set", lock_key, token, nx=True, px=int(lock_timeout * 1000)
+                ):
+                    if not wait:
+                        return None
+                    value = self._wait_for_value(key, lock_timeout)
+                    if value is not None:
+                        return value
+                    logger.warning(f"Timed out waiting for lock on {key}")
+                    token = None
+            except Exception as e:
+                logger.warning(f"Error acquiring cache lock for {key}: {e}")
+                token = None
+
+        try:
+            value = compute()
+            if value is not None:
+                fresh_for = timeout(value) if callable(timeout) else timeout
+                self.set(
+                    key,
+                    {"value": value, "fresh_until": time.time() + fresh_for},
+                    fresh_for + stale_ttl,
+                )
+            return value
+        finally:
+            if token:
+                try:
+                    self._call_redis("eval", _RELEASE_LOCK, 1, lock_key, token)
+                except Exception as e:
+                    logger.warning(f"Error releasing cache lock for {key}: {e}")
+
+    def _wait_for_value(self, key: str, lock_timeout: float):
+        """Poll Redis for a fresh value stored by the lock holder."""
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            payload = self._call_redis("get", key)
+            if payload is None:
+                continue
+            entry = self._decode(payload)
+            if isinstance(entry, dict) and entry.get("fresh_until", 0) > time.time():
+                self._remember(key, entry, payload)
+                return entry["value"]
+        return None
+
+    def _set_local(self, key: str, value: Any) -> Tuple[Optional[bytes], bool]:
+        """
+        Encode a value and keep it in the memory tier.
+
+        Returns:
+            The payload for Redis (None if the value can't be serialized),
+            and whether the memory tier was updated
+        """
+        try:
+            serialized = self._encode(value)
+            # Keep what a Redis hit would return, so both tiers agree
+            decoded = self._decode(serialized)
         except Exception as e:
+            self._errors.inc(op="serialize", prefix=key_prefix(key))
+            logger.error(f"Error serializing cache value: {e}")
+            return None, False
+
+        self._sets.inc(prefix=key_prefix(key))
+        try:
+            self._remember(key, decoded, serialized)
+            return serialized, True
+        except Exception as e:
+            self._errors.inc(op="memory_set", prefix=key_prefix(key))
             logger.warning(f"Error setting memory cache: {e}")
-            success = False
+            return serialized, False
 
-        # Try Redis only if available
-        if self.redis:
+    def _remember(self, key: str, value: Any, payload: bytes):
+        """Keep a decoded value in the memory tier if it fits the budget."""
+        nbytes = self.sizeof(key, payload)
+        tier = self.memory_cache
+        with tier.lock:
+            if nbytes > tier.maxsize:
+                tier.oversized += 1
+                tier.pop(key, None)
+                return
+            tier[key] = (value, nbytes)
+
+    def memory_stats(self) -> dict:
+        """Usage and eviction counters of the memory tier."""
+        tier = self.memory_cache
+        with tier.lock:
+            return {
+                "entries": len(tier),
+                "bytes": int(tier.currsize),
+                "max_bytes": int(tier.maxsize),
+                "evictions": tier.evictions,
+                "expirations": tier.expirations,
+                "oversized": tier.oversized,
+            }
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """
+        Get a raw binary value from Redis, skipping JSON and the memory tier.
+
+        Callers that store compact binary payloads keep their own in-process
+        copy, so only the shared tier is consulted here.
+        """
+        if self._redis_ready():
             try:
-                self.redis.setex(key, timeout, serialized)
+                return self._call_redis("get", key)
             except Exception as e:
-                logger.warning(f"Error setting Redis cache: {e}")
-                success = False
+                logger.warning(f"Error accessing Redis cache: {e}")
+        return None
 
-        return success
+    def set_bytes(self, key: str, value: bytes, timeout: Optional[int] = None) -> bool:
+        """Set a raw binary value in Redis, skipping JSON and the memory tier."""
+        if not self._redis_ready():
+            return False
+        try:
+            self._call_redis("setex", key, timeout or self.default_timeout, value)
+            return True
+        except Exception as e:
+            logger.warning(f"Error setting Redis cache: {e}")
+            return False
 
     def delete(self, key: str) -> bool:
         """
@@ -144,34 +1069,41 @@ class QueryCache:
         Returns:
             True if deletion was successful
         """
-        success = True
-
-        # Delete from memory
-        try:
-            if key in self.memory_cache:
-                del self.memory_cache[key]
-                logger.debug(f"Deleted {key} from memory cache")
-        except Exception as e:
-            logger.debug(f"Key {key} not found in memory cache")
-            success = False
+        success = self._delete_local(key)
 
         # Delete from Redis
-        if self.redis:
+        if self._redis_ready():
             try:
-                self.redis.delete(key)
+                self._call_redis("delete", key)
                 logger.debug(f"Deleted {key} from Redis cache")
             except Exception as e:
                 logger.debug(f"Key {key} not found in Redis cache")
                 success = False
 
+        self._publish_invalidation(keys=[key])
         return success
 
-    def cached(self, timeout: Optional[int] = None):
+    def _delete_local(self, key: str) -> bool:
+        self._deletes.inc(prefix=key_prefix(key))
+        try:
+            with self.memory_cache.lock:
+                if self.memory_cache.pop(key, None) is not None:
+                    logger.debug(f"Deleted {key} from memory cache")
+            return True
+        except Exception as e:
+            logger.debug(f"Key {key} not found in memory cache")
+            return False
+
+    def cached(self, timeout: Optional[int] = None, stale_ttl: int = 0):
         """
         Decorator for caching function results.
 
+        Concurrent calls with the same arguments are coalesced through
+        get_or_compute.
+
         Args:
             timeout: Cache timeout in seconds
+            stale_ttl: Seconds an expired result is served while refreshing
 
         Returns:
             Decorated function
@@ -183,15 +1115,9 @@ class QueryCache:
                 # Generate cache key from function name and arguments
                 key = self.make_key(func.__name__, *args, **kwargs)
 
-                # Try to get from cache
-                result = self.get(key)
-                if result is not None:
-                    return result
-
-                # Execute function and cache result
-                result = func(*args, **kwargs)
-                self.set(key, result, timeout)
-                return result
+                return self.get_or_compute(
+                    key, lambda: func(*args, **kwargs), timeout, stale_ttl
+                )
 
             return wrapper
 
@@ -211,17 +1137,105 @@ class QueryCache:
 
         # Clear memory cache
         try:
-            self.memory_cache.clear()
+            with self.memory_cache.lock:
+                self.memory_cache.clear()
         except Exception as e:
             logger.warning(f"Error clearing memory cache: {e}")
             success = False
 
-        # Clear Redis cache
-        try:
-            for key in self.redis.scan_iter(pattern):
-                self.redis.delete(key)
-        except Exception as e:
-            logger.warning(f"Error clearing Redis cache: {e}")
-            success = False
+        with self._generations_lock:
+            self._generations.clear()
 
+        # Clear Redis cache, unlinking each scanned batch in one command
+        if self._redis_ready():
+            try:
+                batch = []
+                for key in self.redis.scan_iter(pattern, count=UNLINK_BATCH):
+                    batch.append(key)
+                    if len(batch) == UNLINK_BATCH:
+                        self._call_redis("unlink", *batch)
+                        batch = []
+                if batch:
+                    self._call_redis("unlink", *batch)
+            except Exception as e:
+                self._redis_failed(e)
+                logger.warning(f"Error clearing Redis cache: {e}")
+                success = False
+
+        self._publish_invalidation(clear=True)
         return success
+
+
+class AsyncQueryCache:
+    """
+    asyncio front end to a QueryCache, for the calls route handlers make.
+
+    Shares the wrapped cache's namespace generations, invalidation channel,
+    circuit breaker and metrics, but talks to Redis through a redis.asyncio
+    connection pool: a slow Redis suspends the calling coroutine instead of
+    blocking the event loop.
+
+    The pool is created on first use in each event loop. Without Redis,
+    bumps are applied locally, like the wrapped cache's.
+
+    Usage:
+        async_cache = AsyncQueryCache(cache)
+        await async_cache.bump_generation(schema)
+    """
+
+    def __init__(self, cache: QueryCache, max_connections: int = 20):
+        """
+        Args:
+            cache: Synchronous cache whose state is shared
+            max_connections: Size of the asyncio Redis connection pool
+        """
+        self.cache = cache
+        self.max_connections = max_connections
+        self._client = None
+        self._client_loop = None
+
+    def _redis(self):
+        """The asyncio client for the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = redis.asyncio.from_url(
+                self.cache.redis_url,
+                max_connections=self.max_connections,
+                socket_connect_timeout=2,
+                socket_timeout=2,
+                retry_on_timeout=True,
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def _call_redis(self, op: str, *args):
+        """Await one Redis command, recording its latency and any error."""
+        with self.cache.redis_call(op, args):
+            return await getattr(self._redis(), op)(*args)
+
+    async def close(self):
+        """Release the connection pool of the current loop."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def bump_generation(self, namespace: str) -> int:
+        """
+        Async QueryCache.bump_generation.
+
+        Args:
+            namespace: Namespace name, e.g. a user schema
+
+        Returns:
+            The new generation number
+        """
+        cache = self.cache
+        generation = None
+        if cache.redis_available:
+            try:
+                generation = await self._call_redis(
+                    "eval", *cache.bump_command(namespace)
+                )
+            except Exception as e:
+                logger.warning(f"Error bumping generation of {namespace}: {e}")
+        return cache.record_bump(namespace, generation)
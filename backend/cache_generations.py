@@ -0,0 +1,59 @@
+"""
+Cache namespace generations, shared by the web tier and the Lambdas.
+
+Every notes cache key embeds its namespace's generation (see
+QueryCache.namespaced_key), so bumping the "gen:{namespace}" counter
+retires a user's cached notes data at once. The bump and its broadcast on
+the invalidation channel run as one Lua script, defined only here.
+
+This module has no dependencies so the Lambda cache layer can ship it as
+is (lambdas/layers/cache/build.sh copies it in as a top-level module).
+
+Usage:
+    client.eval(*bump_command("user_12"))
+"""
+
+import json
+from typing import Optional
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Bumps a generation and broadcasts it in the same round trip. ARGV[1] is the
+# invalidation channel ("" for none), ARGV[2] the JSON message, to which the
+# new generation is added. Returns the new generation.
+BUMP_GENERATION = """
+local generation = redis.call("incr", KEYS[1])
+if ARGV[1] ~= "" then
+    local message = cjson.decode(ARGV[2])
+    message["generation"] = generation
+    redis.call("publish", ARGV[1], cjson.encode(message))
+end
+return generation
+"""
+
+
+def generation_key(namespace: str) -> str:
+    """Redis key holding a namespace's generation counter."""
+    return f"gen:{namespace}"
+
+
+def bump_command(
+    namespace: str,
+    channel: Optional[str] = INVALIDATION_CHANNEL,
+    message: Optional[str] = None,
+) -> tuple:
+    """
+    EVAL arguments bumping a namespace's generation and broadcasting it.
+
+    Args:
+        namespace (str): Namespace name, e.g. a user schema
+        channel (str, optional): Invalidation channel, None to not broadcast
+        message (str, optional): JSON message broadcast, carrying at least
+            the namespace. Defaults to {"namespace": namespace}
+
+    Returns:
+        tuple: Arguments for the Redis client's eval
+    """
+    if message is None:
+        message = json.dumps({"namespace": namespace})
+    return (BUMP_GENERATION, 1, generation_key(namespace), channel or "", message)
@@ -0,0 +1,175 @@
+"""
+Serialization codecs for the Voice2Note query cache.
+
+A codec turns a cached value into the bytes stored in Redis and back. The
+format is pluggable (JSON, orjson, msgpack, or pickle for trusted private
+deployments), and payloads above a size threshold can be compressed with
+zlib, zstd or lz4. Every payload starts with a one-byte header naming its
+compression, so the threshold or the compressor can change without
+invalidating entries already stored.
+
+Datetimes are stored as ISO 8601 strings by every text format, matching
+what the cache has always returned after a round trip through Redis.
+
+msgpack, zstandard, lz4 and orjson are optional dependencies, only needed
+when selected.
+
+Usage:
+    codec = Codec("msgpack", compression="zstd", threshold=1024)
+    payload = codec.dumps(rows)
+    rows = codec.loads(payload)
+"""
+
+import datetime
+import json
+import pickle
+import zlib
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+def _default(obj):
+    """Encode values the text formats don't support natively."""
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=_default)
+
+
+def _msgpack_loads(payload: bytes) -> Any:
+    return msgpack.unpackb(payload, raw=False)
+
+
+def _pickle_dumps(value: Any) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+# name -> (dumps, loads, required module)
+FORMATS: Dict[str, Tuple[Callable, Callable, Any]] = {
+    "json": (_json_dumps, json.loads, json),
+    "orjson": (_orjson_dumps, lambda payload: orjson.loads(payload), orjson),
+    "msgpack": (_msgpack_dumps, _msgpack_loads, msgpack),
+    # Only for tiers no one else can write to: unpickling runs arbitrary code
+    "pickle": (_pickle_dumps, pickle.loads, pickle),
+}
+
+# name -> (header byte, compress, decompress, required module)
+COMPRESSORS: Dict[str, Tuple[bytes, Callable, Callable, Any]] = {
+    "zlib": (b"z", lambda data: zlib.compress(data, 1), zlib.decompress, zlib),
+    "zstd": (
+        b"s",
+        lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+        zstandard,
+    ),
+    "lz4": (
+        b"l",
+        lambda data: lz4_frame.compress(data),
+        lambda data: lz4_frame.decompress(data),
+        lz4_frame,
+    ),
+}
+
+_UNCOMPRESSED = b"\x00"
+
+
+class Codec:
+    """
+    Value <-> bytes codec with optional compression.
+
+    Attributes:
+        name (str): Serialization format
+        compression (str): Compressor used above the threshold, or "none"
+        threshold (int): Smallest encoded size, in bytes, that is compressed
+    """
+
+    def __init__(
+        self, name: str = "json", compression: str = "none", threshold: int = 1024
+    ):
+        """
+        Args:
+            name (str, optional): One of FORMATS. Defaults to "json"
+            compression (str, optional): One of COMPRESSORS or "none"
+            threshold (int, optional): Bytes below which payloads are stored
+                uncompressed. Defaults to 1024
+
+        Raises:
+            ValueError: If the format or compressor is unknown or its module
+                is not installed
+        """
+        if name not in FORMATS:
+            raise ValueError(f"Unknown cache codec: {name}")
+        if compression != "none" and compression not in COMPRESSORS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+        self._dumps, self._loads, module = FORMATS[name]
+        if module is None:
+            raise ValueError(f"Cache codec {name} needs the {name} package")
+
+        self._compressor = None
+        self._decompressors = {
+            header: decompress
+            for header, _, decompress, available in COMPRESSORS.values()
+            if available is not None
+        }
+        if compression != "none":
+            header, compress, _, available = COMPRESSORS[compression]
+            if available is None:
+                raise ValueError(f"Cache compression {compression} is not installed")
+            self._compressor = (header, compress)
+
+        self.name = name
+        self.compression = compression
+        self.threshold = threshold
+
+    def dumps(self, value: Any) -> bytes:
+        """Encode a value, compressing it if it is large enough."""
+        data = self._dumps(value)
+        if self._compressor and len(data) >= self.threshold:
+            header, compress = self._compressor
+            return header + compress(data)
+        return _UNCOMPRESSED + data
+
+    def loads(self, payload: bytes) -> Any:
+        """
+        Decode a payload written by dumps.
+
+        Raises:
+            ValueError: If the payload has an unknown header
+        """
+        header, data = payload[:1], payload[1:]
+        if header != _UNCOMPRESSED:
+            decompress = self._decompressors.get(header)
+            if decompress is None:
+                raise ValueError(f"Unknown cache payload header: {header!r}")
+            data = decompress(data)
+        return self._loads(data)
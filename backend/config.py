@@ -1,9 +1,16 @@
-from psycopg2 import pool
+from psycopg2 import sql
 import boto3
 import os
+import threading
+import time
+from cachetools import TTLCache
+from collections import OrderedDict
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import logging
-from typing import Dict
+from typing import Dict, Optional, Tuple
+from backend.metrics import LATENCY_BUCKETS, Registry
+from backend.pools import BlockingConnectionPool, PoolError, PoolTimeout
 
 # Load environment variables
 load_dotenv()
@@ -18,57 +25,387 @@ logger = logging.getLogger("voice2note")
 
 class DatabaseConfig:
     def __init__(self):
+        self._setup_metrics()
+        # Seconds a checkout waits in line before failing
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", 10))
+        # Connections a worker may hold per user role (DB_USER_POOL_MAX) and
+        # as the tenant login (DB_TENANT_POOL_MAX). The async pools used by
+        # the API routes take DB_ASYNC_*_POOL_MAX of each budget and the sync
+        # pools the rest, so running both never exceeds it.
+        self.async_user_pool_size = int(os.getenv("DB_ASYNC_USER_POOL_MAX", 2))
+        self.user_pool_size = max(
+            int(os.getenv("DB_USER_POOL_MAX", 5)) - self.async_user_pool_size, 1
+        )
+        self.async_tenant_pool_size = int(os.getenv("DB_ASYNC_TENANT_POOL_MAX", 8))
+        self.tenant_pool_size = max(
+            int(os.getenv("DB_TENANT_POOL_MAX", 20)) - self.async_tenant_pool_size, 1
+        )
         # App role connection pool (static credentials)
         self.app_pool = self._create_app_pool()
-        # User schema pools (dynamic, created on demand)
-        self.user_pools: Dict[str, pool.SimpleConnectionPool] = {}
+        # User schema pools (dynamic, created on demand), least recently used
+        # first. Bounded in number, and pools idle for longer than the timeout
+        # are closed by a background reaper.
+        self.user_pools: Dict[str, BlockingConnectionPool] = OrderedDict()
+        self.max_user_pools = int(os.getenv("DB_USER_POOLS_MAX", 200))
+        self.user_pool_idle_timeout = float(os.getenv("DB_USER_POOL_IDLE_TIMEOUT", 300))
+        self._pool_last_used: Dict[str, float] = {}
+        self._user_pools_lock = threading.RLock()
+        self._reaper_pid = None
+        # "per_user" opens a pool per user_{id} login role. "shared" multiplexes
+        # every tenant over one pool logged in as DB_TENANT_USER, which must be
+        # a NOINHERIT role granted every user_* role, and switches role per
+        # checkout.
+        self.pool_mode = os.getenv("DB_POOL_MODE", "per_user")
+        self.tenant_user = os.getenv("DB_TENANT_USER")
+        self.tenant_pool = (
+            self._create_tenant_pool() if self.pool_mode == "shared" else None
+        )
+        # user_id -> database role password. Reused for DB_CREDENTIAL_TTL
+        # seconds, so pools evicted from the registry come back without a
+        # query. Kept here, with the bootstrap locks, so every DatabaseManager
+        # sharing this config shares them too.
+        self._credentials = TTLCache(
+            maxsize=int(os.getenv("DB_CREDENTIAL_CACHE_SIZE", 4096)),
+            ttl=int(os.getenv("DB_CREDENTIAL_TTL", 60)),
+        )
+        self._credentials_lock = threading.Lock()
+        # user_id -> lock held by the one thread bootstrapping that user's pool
+        self._bootstrap_locks: Dict[int, threading.Lock] = {}
+        self._bootstrap_guard = threading.Lock()
 
-    def _create_app_pool(self) -> pool.SimpleConnectionPool:
-        """Create the main application connection pool"""
-        return pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=10,
+    def _setup_metrics(self):
+        """Register pool gauges and eviction counters on self.metrics."""
+        self.metrics = Registry()
+        self.metrics.callback(
+            "db_user_pools",
+            "Per-user connection pools currently open",
+            lambda: {(): len(self.user_pools)},
+        )
+        self.metrics.callback(
+            "db_pool_connections",
+            "Open connections, and checkouts waiting, by pool and state",
+            self._connection_counts,
+            ("pool", "state"),
+        )
+        self._pool_evictions = self.metrics.counter(
+            "db_user_pool_evictions_total",
+            "Per-user pools closed, by reason (lru, idle, error)",
+            ("reason",),
+        )
+        self._pool_wait = self.metrics.histogram(
+            "db_pool_wait_seconds",
+            "Time checkouts waited for a connection",
+            ("pool",),
+            buckets=(*LATENCY_BUCKETS, 5.0, 10.0, 30.0),
+        )
+        self._pool_timeouts = self.metrics.counter(
+            "db_pool_timeouts_total",
+            "Checkouts that gave up waiting for a connection",
+            ("pool",),
+        )
+
+    def _new_pool(
+        self, kind: str, minconn: int, maxconn: int, max_idle=None, **connect_kwargs
+    ) -> BlockingConnectionPool:
+        """Create a blocking pool whose waits are recorded under pool=kind."""
+        return BlockingConnectionPool(
+            minconn,
+            maxconn,
+            timeout=self.pool_timeout,
+            max_idle=max_idle,
+            on_wait=lambda seconds: self._pool_wait.observe(seconds, pool=kind),
             dbname=os.getenv("DB_NAME"),
-            user=os.getenv("DB_APP_USER"),
-            password=os.getenv("DB_APP_PASSWORD"),
             host=os.getenv("DB_HOST"),
             port=os.getenv("DB_PORT"),
+            **connect_kwargs,
+        )
+
+    def _checkout(self, connection_pool: BlockingConnectionPool, kind: str):
+        """Check out a connection, counting checkouts that time out."""
+        try:
+            return connection_pool.getconn()
+        except PoolTimeout as e:
+            self._pool_timeouts.inc(pool=kind)
+            logger.warning(f"Timed out waiting for a {kind} connection: {e}")
+            raise
+
+    @staticmethod
+    def _pool_counts(connection_pool) -> Tuple[int, int, int]:
+        """Idle, checked-out and waiting counts of a pool."""
+        if connection_pool is None or connection_pool.closed:
+            return 0, 0, 0
+        return (
+            connection_pool.idle_count,
+            connection_pool.in_use_count,
+            connection_pool.waiting_count,
+        )
+
+    def _connection_counts(self) -> Dict[Tuple, int]:
+        with self._user_pools_lock:
+            user_pools = list(self.user_pools.values())
+        pools = {"app": [self.app_pool], "user": user_pools}
+        if self.tenant_pool:
+            pools["tenant"] = [self.tenant_pool]
+        counts = {}
+        for name, members in pools.items():
+            totals = [0, 0, 0]
+            for connection_pool in members:
+                for i, count in enumerate(self._pool_counts(connection_pool)):
+                    totals[i] += count
+            for state, count in zip(("idle", "in_use", "waiting"), totals):
+                counts[(name, state)] = count
+        return counts
+
+    def _create_app_pool(self) -> BlockingConnectionPool:
+        """
+        Create the main application connection pool
+
+        Opens its first connection on checkout, so importing the config (and
+        the modules logging through it) never connects to the database.
+        """
+        return self._new_pool(
+            "app",
+            minconn=0,
+            maxconn=10,
+            max_idle=1,
+            user=os.getenv("DB_APP_USER"),
+            password=os.getenv("DB_APP_PASSWORD"),
         )
 
     def _create_user_pool(
         self, user_id: int, db_password: str
-    ) -> pool.SimpleConnectionPool:
+    ) -> BlockingConnectionPool:
         """
         Create a user-specific connection pool using their database user password
         Note: This is different from their login password hash
+
+        Opens no connection until the first checkout, which needs one anyway,
+        and keeps one idle afterwards.
         """
-        return pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=5,
-            dbname=os.getenv("DB_NAME"),
+        return self._new_pool(
+            "user",
+            minconn=0,
+            maxconn=self.user_pool_size,
+            max_idle=1,
             user=f"user_{user_id}",
             password=db_password,
-            host=os.getenv("DB_HOST"),
-            port=os.getenv("DB_PORT"),
         )
 
+    def _create_tenant_pool(self) -> BlockingConnectionPool:
+        """
+        Create the shared pool that serves every user schema.
+
+        Raises:
+            ValueError: If DB_TENANT_USER is not set
+        """
+        if not self.tenant_user:
+            raise ValueError("DB_POOL_MODE=shared requires DB_TENANT_USER")
+        return self._new_pool(
+            "tenant",
+            minconn=0,
+            max_idle=1,
+            maxconn=self.tenant_pool_size,
+            user=self.tenant_user,
+            password=os.getenv("DB_TENANT_PASSWORD"),
+        )
+
+    @staticmethod
+    def _assume_role(conn, user_id: int):
+        """
+        Switch a shared connection to the user's role and schema.
+
+        The settings are committed so they hold for the whole session: a
+        rollback by the caller must not fall back to the login role.
+        """
+        role = sql.Identifier(f"user_{user_id}")
+        with conn.cursor() as cur:
+            cur.execute(
+                sql.SQL("SET ROLE {role}; SET search_path TO {role}").format(role=role)
+            )
+        conn.commit()
+
+    @staticmethod
+    def _release_role(conn):
+        """Discard the caller's transaction and drop back to the login role."""
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute("RESET ROLE; RESET search_path")
+        conn.commit()
+
     def get_app_connection(self):
         """Get a connection from the app pool"""
-        return self.app_pool.getconn()
+        return self._checkout(self.app_pool, "app")
 
-    def create_user_pool(self, user_id: int, db_password: str):
-        """Create or replace a user-specific pool"""
+    def create_user_pool(self, user_id: int, db_password: str, replace: bool = False):
+        """
+        Create a user-specific pool (no-op in shared mode)
+
+        An open pool is kept as it is, so a racing bootstrap cannot close
+        connections another request has checked out.
+
+        Args:
+            user_id (int): User whose role the pool logs in as
+            db_password (str): The role's password
+            replace (bool, optional): Swap in a new pool even if one is open,
+                e.g. after a password reset. The old pool is retired: its
+                idle connections close now, checked-out ones when returned.
+        """
+        if self.tenant_pool:
+            return
         pool_key = f"user_{user_id}"
-        if pool_key in self.user_pools:
-            self.user_pools[pool_key].closeall()
-        self.user_pools[pool_key] = self._create_user_pool(user_id, db_password)
+        with self._user_pools_lock:
+            previous = self.user_pools.get(pool_key)
+            if previous is not None and not previous.closed and not replace:
+                self._touch_user_pool(pool_key)
+                return
+            # Lazy, so creating it under the lock opens no connection
+            user_pool = self._create_user_pool(user_id, db_password)
+            if self.user_pools.pop(pool_key, None) is not None:
+                previous.retire()
+            self._evict_user_pools(self.max_user_pools - 1)
+            self.user_pools[pool_key] = user_pool
+            self._pool_last_used[pool_key] = time.monotonic()
+        self._ensure_reaper()
+
+    @contextmanager
+    def bootstrap_lock(self, user_id: int):
+        """Hold the lock that serializes bootstrapping user_{id}'s pool"""
+        with self._bootstrap_guard:
+            lock = self._bootstrap_locks.setdefault(user_id, threading.Lock())
+        try:
+            with lock:
+                yield
+        finally:
+            with self._bootstrap_guard:
+                if self._bootstrap_locks.get(user_id) is lock:
+                    del self._bootstrap_locks[user_id]
+
+    def cached_db_password(self, user_id: int) -> Optional[str]:
+        """User's database role password if cached and fresh"""
+        with self._credentials_lock:
+            return self._credentials.get(user_id)
+
+    def cache_db_password(self, user_id: int, db_password: Optional[str]):
+        """Store or, with None, forget a user's database role password"""
+        with self._credentials_lock:
+            if db_password is None:
+                self._credentials.pop(user_id, None)
+            else:
+                self._credentials[user_id] = db_password
+
+    def drop_user_pool(self, user_id: int):
+        """Close a user pool that failed to connect, unless it is in use"""
+        pool_key = f"user_{user_id}"
+        with self._user_pools_lock:
+            if pool_key in self.user_pools:
+                self._close_user_pool(pool_key, reason="error")
+
+    def _close_user_pool(self, pool_key: str, reason: str) -> bool:
+        """
+        Close a user pool unless it has connections checked out.
+
+        The caller holds _user_pools_lock.
+
+        Returns:
+            bool: Whether the pool was closed
+        """
+        user_pool = self.user_pools[pool_key]
+        if any(self._pool_counts(user_pool)[1:]):
+            return False
+        del self.user_pools[pool_key]
+        self._pool_last_used.pop(pool_key, None)
+        user_pool.closeall()
+        self._pool_evictions.inc(reason=reason)
+        return True
+
+    def _evict_user_pools(self, limit: int):
+        """
+        Close least recently used idle pools until at most limit remain.
+
+        Pools with connections checked out are skipped, so the registry can
+        briefly exceed the limit under load. The caller holds
+        _user_pools_lock.
+        """
+        for pool_key in list(self.user_pools):
+            if len(self.user_pools) <= limit:
+                return
+            self._close_user_pool(pool_key, reason="lru")
+        if len(self.user_pools) > limit:
+            logger.warning(
+                f"{len(self.user_pools)} user pools busy, above the limit of "
+                f"{self.max_user_pools}"
+            )
+
+    def _ensure_reaper(self):
+        """Start the idle pool reaper in this process if it is missing."""
+        if self.user_pool_idle_timeout <= 0 or self._reaper_pid == os.getpid():
+            return
+        with self._user_pools_lock:
+            if self._reaper_pid == os.getpid():
+                return
+            threading.Thread(
+                target=self._reap_idle_user_pools, name="user-pool-reaper", daemon=True
+            ).start()
+            self._reaper_pid = os.getpid()
+
+    def _reap_idle_user_pools(self):
+        """Close user pools unused for longer than user_pool_idle_timeout."""
+        interval = min(self.user_pool_idle_timeout / 2, 60)
+        while True:
+            time.sleep(interval)
+            cutoff = time.monotonic() - self.user_pool_idle_timeout
+            with self._user_pools_lock:
+                for pool_key in list(self.user_pools):
+                    # Least recently used first: the rest are newer
+                    if self._pool_last_used.get(pool_key, 0) > cutoff:
+                        break
+                    self._close_user_pool(pool_key, reason="idle")
+
+    def _touch_user_pool(self, pool_key: str):
+        """Mark a pool as most recently used. The caller holds the lock."""
+        self.user_pools.move_to_end(pool_key)
+        self._pool_last_used[pool_key] = time.monotonic()
+
+    def has_user_pool(self, user_id: int) -> bool:
+        """Whether connections for user_{id} can be checked out"""
+        with self._user_pools_lock:
+            return bool(self.tenant_pool) or f"user_{user_id}" in self.user_pools
 
     def get_user_connection(self, user_id: int):
-        """Get a connection from user-specific pool"""
+        """
+        Get a connection from user-specific pool
+
+        Returns:
+            connection: A connection acting as user_{id}, or None if the
+                user's pool was evicted or closed since it was ensured, in
+                which case the caller bootstraps it again
+
+        Raises:
+            PoolTimeout: If no connection became available in time
+        """
+        if self.tenant_pool:
+            conn = self._checkout(self.tenant_pool, "tenant")
+            try:
+                self._assume_role(conn, user_id)
+            except Exception:
+                self.tenant_pool.putconn(conn, close=True)
+                raise
+            return conn
         pool_key = f"user_{user_id}"
-        if pool_key not in self.user_pools:
-            raise ValueError(f"No pool exists for user_{user_id}")
-        return self.user_pools[pool_key].getconn()
+        with self._user_pools_lock:
+            if pool_key not in self.user_pools:
+                return None
+            self._touch_user_pool(pool_key)
+            user_pool = self.user_pools[pool_key]
+        # Wait outside the registry lock. The pool was just marked most
+        # recently used, so neither eviction nor the reaper picks it, but an
+        # error drop can still close it meanwhile.
+        try:
+            return self._checkout(user_pool, "user")
+        except PoolError:
+            if user_pool.closed:
+                return None
+            raise
 
     def return_app_connection(self, conn):
         """Return a connection to the app pool"""
@@ -76,15 +413,41 @@ class DatabaseConfig:
 
     def return_user_connection(self, user_id: int, conn):
         """Return a connection to the user-specific pool"""
+        if self.tenant_pool:
+            try:
+                self._release_role(conn)
+            except Exception as e:
+                # Never hand a connection still holding a user's role to
+                # another tenant
+                logger.warning(f"Closing shared connection for user_{user_id}: {e}")
+                self.tenant_pool.putconn(conn, close=True)
+            else:
+                self.tenant_pool.putconn(conn)
+            return
         pool_key = f"user_{user_id}"
-        if pool_key in self.user_pools:
-            self.user_pools[pool_key].putconn(conn)
+        with self._user_pools_lock:
+            user_pool = self.user_pools.get(pool_key)
+            if user_pool is not None:
+                try:
+                    user_pool.putconn(conn)
+                    self._touch_user_pool(pool_key)
+                    return
+                except PoolError:
+                    # Checked out from a pool since replaced by a password reset
+                    pass
+        if not conn.closed:
+            conn.close()
 
     def close_all(self):
         """Close all connection pools"""
         self.app_pool.closeall()
-        for user_pool in self.user_pools.values():
-            user_pool.closeall()
+        if self.tenant_pool:
+            self.tenant_pool.closeall()
+        with self._user_pools_lock:
+            for user_pool in self.user_pools.values():
+                user_pool.closeall()
+            self.user_pools.clear()
+            self._pool_last_used.clear()
 
 
 # Initialize the database configuration
@@ -103,3 +466,42 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # Redis
 REDIS_URL = os.getenv("REDIS_URL")
+# Other workers' invalidations arrive over pub/sub, so entries can live long
+# in each worker's memory tier
+CACHE_MEMORY_TTL = int(os.getenv("CACHE_MEMORY_TTL", 900))
+CACHE_MEMORY_MAX_BYTES = int(os.getenv("CACHE_MEMORY_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_GENERATION_TTL = float(os.getenv("CACHE_GENERATION_TTL", 10))
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", 60))
+# Seconds notes data stays fresh when a Lambda may still change it without a
+# generation bump reaching this worker: notes still being processed, and
+# everything while Redis is unreachable
+CACHE_PENDING_TTL = int(os.getenv("CACHE_PENDING_TTL", 15))
+CACHE_CODEC = os.getenv("CACHE_CODEC", "json")  # json | orjson | msgpack | pickle
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "none")  # none | zlib | zstd | lz4
+CACHE_COMPRESSION_THRESHOLD = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", 1024))
+# Consecutive Redis failures before the cache goes memory-only, and the
+# first/longest wait between reconnect attempts
+CACHE_BREAKER_FAILURES = int(os.getenv("CACHE_BREAKER_FAILURES", 5))
+CACHE_BREAKER_COOLDOWN = float(os.getenv("CACHE_BREAKER_COOLDOWN", 1))
+CACHE_BREAKER_MAX_COOLDOWN = float(os.getenv("CACHE_BREAKER_MAX_COOLDOWN", 30))
+
+# Admin. The metrics endpoint is disabled unless a token is set.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Notes list
+NOTES_PAGE_SIZE = int(os.getenv("NOTES_PAGE_SIZE", 20))
+
+# Vector search
+VECTOR_CACHE_MAX_BYTES = int(os.getenv("VECTOR_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+VECTOR_SEARCH_MODE = os.getenv("VECTOR_SEARCH_MODE", "exact")  # exact | ivf
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", 8))
+IVF_MIN_VECTORS = int(os.getenv("IVF_MIN_VECTORS", 5000))
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")  # none | int8
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 50))
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")  # vector | hybrid
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 20))
+LEXICAL_CACHE_MAX_SCHEMAS = int(os.getenv("LEXICAL_CACHE_MAX_SCHEMAS", 256))
+EMBEDDING_CACHE_MAX_BYTES = int(
+    os.getenv("EMBEDDING_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+)
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", 86400))
@@ -7,10 +7,39 @@ from backend.config import logger
 from contextlib import contextmanager
 from typing import Optional, Tuple, Dict
 import psycopg2
+from psycopg2.pool import PoolError
 from psycopg2.extensions import connection
 import bcrypt
 import os
 
+# Times get_connection bootstraps a user pool that disappears before checkout
+POOL_BOOTSTRAP_ATTEMPTS = 3
+
+# Text search configurations for the languages notes are recorded in
+SEARCH_CONFIGS = ("english", "spanish")
+
+_SEARCH_TEXT = (
+    "coalesce(transcription->>'note_title', '') || ' ' || "
+    "coalesce(transcription->>'summary_text', '') || ' ' || "
+    "coalesce(transcription->>'transcript_text', '')"
+)
+
+# Expression behind the generated transcripts.search_vector column
+SEARCH_VECTOR_SQL = " || ".join(
+    f"to_tsvector('{config}', {_SEARCH_TEXT})" for config in SEARCH_CONFIGS
+)
+
+
+def search_query_sql() -> str:
+    """
+    tsquery matching search_vector in any configured language.
+
+    Takes the user's keywords as one %s parameter per entry of SEARCH_CONFIGS.
+    """
+    return " || ".join(
+        f"websearch_to_tsquery('{config}', %s)" for config in SEARCH_CONFIGS
+    )
+
 
 class DatabaseManager:
     def __init__(self, db_config):
@@ -22,18 +51,40 @@ class DatabaseManager:
             self.db_config.app_pool = self.db_config._create_app_pool()
 
     def ensure_user_pool(self, user_id: int):
-        """Ensure user pool exists, create if it doesn't"""
-        pool_key = f"user_{user_id}"
-        if pool_key not in self.db_config.user_pools:
-            # Get user's password from database
-            with self.get_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        "SELECT hashed_password FROM public.users WHERE user_id = %s",
-                        (user_id,),
-                    )
-                    hashed_password = cur.fetchone()[0]
-                    self.db_config.create_user_pool(user_id, hashed_password)
+        """
+        Ensure user pool exists, create if it doesn't.
+
+        Concurrent requests for the same user, through any manager sharing
+        the config, wait for a single bootstrap, and the pool opens its first
+        connection on checkout, so a cold worker pays at most one password
+        lookup per user.
+        """
+        if self.db_config.has_user_pool(user_id):
+            return
+        with self.db_config.bootstrap_lock(user_id):
+            if not self.db_config.has_user_pool(user_id):
+                self.db_config.create_user_pool(user_id, self.user_db_password(user_id))
+
+    def user_db_password(self, user_id: int) -> str:
+        """User's database role password, from the credential cache if fresh"""
+        hashed_password = self.db_config.cached_db_password(user_id)
+        if hashed_password is not None:
+            return hashed_password
+
+        # Get user's password from database
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT hashed_password FROM public.users WHERE user_id = %s",
+                    (user_id,),
+                )
+                hashed_password = cur.fetchone()[0]
+        self.cache_db_password(user_id, hashed_password)
+        return hashed_password
+
+    def cache_db_password(self, user_id: int, hashed_password: Optional[str]):
+        """Store or, with None, forget a user's database role password"""
+        self.db_config.cache_db_password(user_id, hashed_password)
 
     @staticmethod
     def validate_schema(schema: str) -> Optional[str]:
@@ -71,8 +122,22 @@ class DatabaseManager:
         conn = None
         try:
             if user_id:
-                self.ensure_user_pool(user_id)
-                conn = self.db_config.get_user_connection(user_id)
+                # The pool can be evicted or dropped between the bootstrap
+                # and the checkout: bootstrap it again
+                for _ in range(POOL_BOOTSTRAP_ATTEMPTS):
+                    self.ensure_user_pool(user_id)
+                    try:
+                        conn = self.db_config.get_user_connection(user_id)
+                    except psycopg2.OperationalError:
+                        # A password reset on another worker leaves this pool's
+                        # credentials stale: bootstrap again on the next request
+                        self.cache_db_password(user_id, None)
+                        self.db_config.drop_user_pool(user_id)
+                        raise
+                    if conn is not None:
+                        break
+                else:
+                    raise PoolError(f"No pool stayed open for user_{user_id}")
             else:
                 self.ensure_app_pool()
                 conn = self.db_config.get_app_connection()
@@ -148,8 +213,14 @@ class DatabaseManager:
                 transcription jsonb NULL,
                 created_at timestamp DEFAULT CURRENT_TIMESTAMP NOT NULL,
                 deleted_at timestamp NULL,
+                search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED,
                 CONSTRAINT transcripts_pkey PRIMARY KEY (transcript_id)
-            )
+            );
+
+            CREATE INDEX transcripts_search_vector_idx
+                ON {schema}.transcripts USING GIN (search_vector);
+            CREATE INDEX transcripts_audio_key_idx
+                ON {schema}.transcripts (audio_key);
         """
         )
 
@@ -160,6 +231,9 @@ class DatabaseManager:
                 title varchar(255) NOT NULL,
                 created_at timestamp DEFAULT CURRENT_TIMESTAMP NOT NULL,
                 deleted_at timestamp NULL,
+                preview text NULL,
+                message_count int4 DEFAULT 0 NOT NULL,
+                last_message_at timestamp NULL,
                 CONSTRAINT chats_pkey PRIMARY KEY (chat_id)
             )
         """
@@ -178,7 +252,10 @@ class DatabaseManager:
                 CONSTRAINT chat_messages_role_check CHECK (role IN ('user', 'assistant')),
                 CONSTRAINT chat_messages_chat_id_fkey FOREIGN KEY (chat_id) 
                     REFERENCES {schema}.chats(chat_id)
-            )
+            );
+
+            CREATE INDEX chat_messages_chat_id_created_at_idx
+                ON {schema}.chat_messages (chat_id, created_at);
         """
         )
 
@@ -188,9 +265,10 @@ class DatabaseManager:
                 vector_id SERIAL NOT NULL,
                 audio_key varchar(255) NOT NULL,
                 content_chunk text NOT NULL,
-                embedding jsonb NOT NULL,
+                embedding bytea NOT NULL,
                 created_at timestamp DEFAULT CURRENT_TIMESTAMP NOT NULL,
                 deleted_at timestamp NULL,
+                cluster_id int4 NULL,
                 CONSTRAINT note_vectors_pkey PRIMARY KEY (vector_id),
                 CONSTRAINT note_vectors_audio_key_fkey FOREIGN KEY (audio_key) 
                     REFERENCES {schema}.audios(audio_key)
@@ -198,6 +276,20 @@ class DatabaseManager:
         """
         )
 
+        cur.execute(
+            f"""
+            CREATE TABLE {schema}.note_vector_index (
+                index_id SERIAL NOT NULL,
+                nlist int4 NOT NULL,
+                dim int4 NOT NULL,
+                centroids bytea NOT NULL,
+                trained_vectors int4 NOT NULL,
+                created_at timestamp DEFAULT CURRENT_TIMESTAMP NOT NULL,
+                CONSTRAINT note_vector_index_pkey PRIMARY KEY (index_id)
+            )
+        """
+        )
+
     def create_user_schema(self, user_id: int) -> bool:
         """Create new schema, tables, and privileges for a user."""
         logger.info(f"Starting schema creation for user_id: {user_id}")
@@ -238,6 +330,12 @@ class DatabaseManager:
                     """
                     )
 
+                    # Let the shared pool's login role switch to this user
+                    if self.db_config.tenant_user:
+                        cur.execute(
+                            f"GRANT {schema_name} TO {self.db_config.tenant_user}"
+                        )
+
                     # Step 5: Create all required tables in the schema
                     self.create_schema_tables(cur, schema_name)
 
@@ -249,6 +347,7 @@ class DatabaseManager:
                         ALTER TABLE {schema_name}.chats REPLICA IDENTITY DEFAULT;
                         ALTER TABLE {schema_name}.chat_messages REPLICA IDENTITY DEFAULT;
                         ALTER TABLE {schema_name}.note_vectors REPLICA IDENTITY DEFAULT;
+                        ALTER TABLE {schema_name}.note_vector_index REPLICA IDENTITY DEFAULT;
                         """
                     )
 
@@ -322,7 +421,10 @@ class DatabaseManager:
                     )
 
                     # Update the connection pool
-                    self.db_config.create_user_pool(user_id, hashed_password)
+                    self.cache_db_password(user_id, hashed_password)
+                    self.db_config.create_user_pool(
+                        user_id, hashed_password, replace=True
+                    )
 
                     conn.commit()
                     logger.info(f"Successfully reset password for user_{user_id}")
@@ -0,0 +1,334 @@
+"""
+Lexical (BM25) search for Voice2Note.
+
+Keeps an in-memory inverted index per schema over note_vectors chunks,
+fused with vector results for chat retrieval so exact names and terms that
+embeddings miss still surface.
+
+Indexes are built on the first search for a schema and then refreshed the
+same way as the vector cache: only rows with an id above the last one seen
+are fetched, and notes soft-deleted since the previous refresh are dropped.
+
+Usage:
+    lexical_cache = LexicalCache()
+    index = lexical_cache.get(schema, cursor)
+    chunks = index.search_chunks("Maria", limit=20)
+"""
+
+import datetime
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from backend.config import logger
+
+_TOKEN = re.compile(r"\w+")
+
+# Function words of the languages notes are recorded in (EN/ES). They match
+# almost every chunk, so dropping them keeps chat questions from pulling in
+# unrelated context through words like "what" or "the".
+STOPWORDS = frozenset(
+    """
+    a an and are as at be but by did do does for from had has have how i if in
+    is it its me my not of on or so that the their them there they this to was
+    we were what when where which who why will with you your
+    al como con de del el en es esta este fue la las lo los me mi mis no o para
+    pero por que se si sin su sus un una y yo
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase, accent-folded terms without stopwords.
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        List[str]: Terms in order of appearance
+    """
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [term for term in _TOKEN.findall(folded) if term not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index with incremental add and remove.
+
+    Attributes:
+        k1 (float): Term frequency saturation
+        b (float): Document length normalization
+        postings (Dict[str, Dict[Hashable, int]]): term -> {doc_id: tf}
+        doc_lengths (Dict[Hashable, int]): Number of terms per document
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[Hashable, int]] = {}
+        self.doc_lengths: Dict[Hashable, int] = {}
+        self._doc_terms: Dict[Hashable, Tuple[str, ...]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: Hashable, text: str):
+        """Index a document, replacing any previous version with the same id."""
+        if doc_id in self.doc_lengths:
+            self.remove([doc_id])
+
+        counts = Counter(tokenize(text or ""))
+        for term, tf in counts.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+            posting[doc_id] = tf
+        length = sum(counts.values())
+        self.doc_lengths[doc_id] = length
+        self._doc_terms[doc_id] = tuple(counts)
+        self._total_length += length
+
+    def remove(self, doc_ids):
+        """Drop documents from the index, ignoring unknown ids."""
+        for doc_id in doc_ids:
+            terms = self._doc_terms.pop(doc_id, None)
+            if terms is None:
+                continue
+            self._total_length -= self.doc_lengths.pop(doc_id)
+            for term in terms:
+                posting = self.postings[term]
+                del posting[doc_id]
+                if not posting:
+                    del self.postings[term]
+
+    def search(
+        self, query: str, limit: Optional[int] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        Rank documents against a query.
+
+        Args:
+            query (str): Free-text query
+            limit (int, optional): Maximum number of results, all if None
+
+        Returns:
+            List[Tuple[Hashable, float]]: (doc_id, score) by descending score
+        """
+        query_terms = list(dict.fromkeys(tokenize(query or "")))
+        if not query_terms or not self.doc_lengths:
+            return []
+
+        count = len(self.doc_lengths)
+        average_length = self._total_length / count or 1
+        scores: Dict[Hashable, float] = {}
+
+        for term in query_terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for doc_id, tf in posting.items():
+                length = self.doc_lengths[doc_id] / average_length
+                saturation = tf + self.k1 * (1 - self.b + self.b * length)
+                score = idf * tf * (self.k1 + 1) / saturation
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        if limit is None:
+            return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+class LexicalIndex:
+    """
+    BM25 index over one schema's note chunks.
+
+    Refreshes mutate the index in place, so every access goes through a lock.
+    Searches are dictionary walks over a few posting lists and hold it only
+    briefly.
+
+    Attributes:
+        chunks (BM25Index): note_vectors chunks keyed by vector_id
+        last_vector_id (int): Highest note_vectors id indexed
+    """
+
+    def __init__(self):
+        self.chunks = BM25Index()
+        self.last_vector_id = 0
+        self._chunk_rows: Dict[int, Tuple[str, str]] = {}
+        self._chunks_by_note: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def add_chunks(self, rows):
+        """Index (vector_id, content_chunk, audio_key) rows."""
+        with self._lock:
+            for vector_id, content, audio_key in rows:
+                self.chunks.add(vector_id, content)
+                self._chunk_rows[vector_id] = (content, audio_key)
+                self._chunks_by_note.setdefault(audio_key, set()).add(vector_id)
+                self.last_vector_id = max(self.last_vector_id, vector_id)
+
+    def remove_notes(self, audio_keys):
+        """Drop all chunks of deleted notes."""
+        with self._lock:
+            for audio_key in audio_keys:
+                vector_ids = self._chunks_by_note.pop(audio_key, ())
+                self.chunks.remove(vector_ids)
+                for vector_id in vector_ids:
+                    self._chunk_rows.pop(vector_id, None)
+
+    def search_chunks(
+        self, query: str, limit: int = 20
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Chunks ranked by BM25.
+
+        Args:
+            query (str): Chat message or keywords
+            limit (int, optional): Maximum number of results. Defaults to 20
+
+        Returns:
+            List[Tuple[str, str, float]]: (content, audio_key, bm25_score)
+        """
+        with self._lock:
+            hits = self.chunks.search(query, limit)
+            return [(*self._chunk_rows[vector_id], score) for vector_id, score in hits]
+
+
+class LexicalCache:
+    """
+    Per-schema LexicalIndex cache with incremental refresh.
+
+    Attributes:
+        max_schemas (int): Schemas kept before evicting the least recently used
+        max_age (int): Seconds before an index is rebuilt from scratch, picking
+            up rows committed out of vector_id order
+        deletion_grace (int): Seconds of overlap when polling for deletions
+    """
+
+    def __init__(
+        self, max_schemas: int = 256, max_age: int = 900, deletion_grace: int = 300
+    ):
+        self.max_schemas = max_schemas
+        self.max_age = max_age
+        self.deletion_grace = datetime.timedelta(seconds=deletion_grace)
+        self._entries: "OrderedDict[str, _LexicalCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, schema: str, cursor) -> LexicalIndex:
+        """
+        Get an up-to-date lexical index for a schema.
+
+        Args:
+            schema (str): User's database schema
+            cursor: Database cursor for executing queries
+
+        Returns:
+            LexicalIndex: Index over the user's live notes
+        """
+        with self._lock:
+            entry = self._entries.get(schema)
+            if entry is not None:
+                self._entries.move_to_end(schema)
+
+        if entry is None or time.monotonic() - entry.loaded_at > self.max_age:
+            entry = self._load(schema, cursor)
+        else:
+            self._refresh(schema, cursor, entry)
+
+        with self._lock:
+            self._entries[schema] = entry
+            self._entries.move_to_end(schema)
+            while len(self._entries) > self.max_schemas:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug(f"Evicted lexical index for {evicted}")
+        return entry.index
+
+    def invalidate(self, schema: str):
+        """Drop the cached index for a schema."""
+        with self._lock:
+            self._entries.pop(schema, None)
+
+    def _load(self, schema: str, cursor) -> "_LexicalCacheEntry":
+        """Index every live chunk of a schema."""
+        cursor.execute("SELECT CURRENT_TIMESTAMP")
+        synced_at = cursor.fetchone()[0]
+
+        index = LexicalIndex()
+        cursor.execute(
+            f"""
+            SELECT vector_id, content_chunk, audio_key
+            FROM {schema}.note_vectors
+            WHERE deleted_at IS NULL
+            """
+        )
+        index.add_chunks(cursor.fetchall())
+        logger.debug(f"Indexed {len(index.chunks)} chunks for {schema}")
+        return _LexicalCacheEntry(index, synced_at, time.monotonic())
+
+    def _refresh(self, schema: str, cursor, entry: "_LexicalCacheEntry"):
+        """Apply rows inserted or deleted since the entry was synced."""
+        index = entry.index
+        cursor.execute(
+            f"""
+            SELECT CURRENT_TIMESTAMP, ARRAY(
+                SELECT audio_key
+                FROM {schema}.audios
+                WHERE deleted_at >= %s
+            )
+            """,
+            (entry.synced_at - self.deletion_grace,),
+        )
+        synced_at, deleted_keys = cursor.fetchone()
+
+        cursor.execute(
+            f"""
+            SELECT vector_id, content_chunk, audio_key
+            FROM {schema}.note_vectors
+            WHERE vector_id > %s
+            AND deleted_at IS NULL
+            """,
+            (index.last_vector_id,),
+        )
+        index.add_chunks(cursor.fetchall())
+        index.remove_notes(deleted_keys or [])
+        entry.synced_at = synced_at
+
+
+class _LexicalCacheEntry:
+    """Cached index plus the watermarks needed to refresh it."""
+
+    __slots__ = ("index", "synced_at", "loaded_at")
+
+    def __init__(
+        self, index: LexicalIndex, synced_at: datetime.datetime, loaded_at: float
+    ):
+        self.index = index
+        self.synced_at = synced_at
+        self.loaded_at = loaded_at
+
+
+def reciprocal_rank_fusion(*rankings, k: int = 60) -> List[Tuple[Hashable, float]]:
+    """
+    Fuse ranked lists with Reciprocal Rank Fusion.
+
+    Args:
+        *rankings: Lists of ids, best first
+        k (int, optional): Rank damping constant. Defaults to 60
+
+    Returns:
+        List[Tuple[Hashable, float]]: (id, fused score) by descending score
+    """
+    fused: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            fused[item] = fused.get(item, 0.0) + 1 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda entry: entry[1], reverse=True)
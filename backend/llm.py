@@ -11,13 +11,28 @@ The module uses OpenAI's API and includes rate limiting to prevent abuse.
 """
 
 import openai
-import numpy as np
-import json
 from typing import List, Tuple
-from backend.config import logger, OPENAI_API_KEY
+from backend.config import (
+    logger,
+    OPENAI_API_KEY,
+    VECTOR_CACHE_MAX_BYTES,
+    VECTOR_SEARCH_MODE,
+    IVF_NPROBE,
+    IVF_MIN_VECTORS,
+    VECTOR_QUANTIZATION,
+    RERANK_CANDIDATES,
+    RETRIEVAL_MODE,
+    HYBRID_CANDIDATES,
+    EMBEDDING_CACHE_MAX_BYTES,
+    EMBEDDING_CACHE_TTL,
+)
+from backend.lexical import reciprocal_rank_fusion
+from backend.vectors import QueryEmbeddingCache, VectorCache
 from collections import defaultdict
 from time import time
 
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
 
 class LLM:
     """
@@ -29,12 +44,33 @@ class LLM:
 
     Attributes:
         rate_limiter (RateLimiter): Rate limiting utility for API calls
+        vector_cache (VectorCache): Per-schema note embedding matrices
+        embedding_cache (QueryEmbeddingCache): Embeddings of recent queries
+        lexical_cache (LexicalCache): Per-schema BM25 indexes used by hybrid
+            retrieval, None for vector-only search
     """
 
-    def __init__(self):
-        """Initialize LLM with API key and rate limiter."""
+    def __init__(self, cache=None, lexical_cache=None):
+        """
+        Initialize LLM with API key, rate limiter and caches.
+
+        Args:
+            cache (QueryCache, optional): Shared cache backing the query
+                embedding cache's Redis tier. Memory-only if omitted
+            lexical_cache (LexicalCache, optional): BM25 indexes to fuse with
+                vector results when RETRIEVAL_MODE=hybrid
+        """
         openai.api_key = OPENAI_API_KEY
         self.rate_limiter = RateLimiter()
+        self.vector_cache = VectorCache(
+            max_bytes=VECTOR_CACHE_MAX_BYTES,
+            with_index=VECTOR_SEARCH_MODE == "ivf",
+            quantize=VECTOR_QUANTIZATION == "int8",
+        )
+        self.embedding_cache = QueryEmbeddingCache(
+            cache, max_bytes=EMBEDDING_CACHE_MAX_BYTES, ttl=EMBEDDING_CACHE_TTL
+        )
+        self.lexical_cache = lexical_cache if RETRIEVAL_MODE == "hybrid" else None
 
     def get_chat_completion(
         self, messages: List[dict], temperature: float = 0.7
@@ -64,66 +100,119 @@ class LLM:
             raise
 
     def find_relevant_context(
-        self, schema: str, cursor, query: str, limit: int = 3
+        self,
+        schema: str,
+        cursor,
+        query: str,
+        limit: int = 3,
+        min_similarity: float = 0.0,
     ) -> List[Tuple[str, str, float]]:
         """
         Find relevant context from user's notes using semantic search.
 
         Uses OpenAI's embedding model to find semantically similar content
-        from the user's notes database.
+        from the user's notes database. All chunk embeddings are scored at
+        once as a float32 matrix, cached per schema and refreshed with only
+        the rows added or deleted since the previous search. With
+        VECTOR_SEARCH_MODE=ivf, large libraries are searched approximately
+        through the schema's IVF index. With VECTOR_QUANTIZATION=int8 the
+        first pass scores int8 codes and the top RERANK_CANDIDATES chunks are
+        rescored against their stored float32 embeddings.
+
+        With RETRIEVAL_MODE=hybrid, the vector ranking is fused with a BM25
+        ranking of the same chunks using Reciprocal Rank Fusion, so exact
+        names and terms that embeddings miss still surface. Lexical matches
+        are kept regardless of ``min_similarity``.
 
         Args:
             schema (str): User's database schema
             cursor: Database cursor for executing queries
             query (str): Search query text
             limit (int, optional): Maximum number of results. Defaults to 3
+            min_similarity (float, optional): Drop vector matches scoring
+                below this cosine similarity. Defaults to 0.0
 
         Returns:
-            List[Tuple[str, str, float]]: List of (content, audio_key, similarity_score)
+            List[Tuple[str, str, float]]: List of (content, audio_key, score),
+            where score is the cosine similarity, or the fused RRF score in
+            hybrid mode
 
         Raises:
             Exception: If embedding generation or database query fails
         """
         try:
-            query_embedding = (
-                openai.embeddings.create(model="text-embedding-ada-002", input=query)
-                .data[0]
-                .embedding
+            query_embedding = self.get_embedding(query)
+
+            if self.lexical_cache is None:
+                results = self._vector_search(schema, cursor, query_embedding, limit)
+                return [r for r in results if r[2] >= min_similarity]
+
+            depth = max(limit, HYBRID_CANDIDATES)
+            vector_results = [
+                r
+                for r in self._vector_search(schema, cursor, query_embedding, depth)
+                if r[2] >= min_similarity
+            ]
+            lexical_results = self.lexical_cache.get(schema, cursor).search_chunks(
+                query, depth
             )
-
-            cursor.execute(
-                f"""
-                SELECT content_chunk, audio_key, embedding 
-                FROM {schema}.note_vectors 
-                WHERE deleted_at IS NULL
-                """
+            fused = reciprocal_rank_fusion(
+                [(content, audio_key) for content, audio_key, _ in vector_results],
+                [(content, audio_key) for content, audio_key, _ in lexical_results],
             )
-            chunks = cursor.fetchall()
-
-            similarities = []
-            for chunk in chunks:
-                try:
-                    embedding = (
-                        json.loads(chunk[2]) if isinstance(chunk[2], str) else chunk[2]
-                    )
-                    similarities.append(
-                        (
-                            chunk[0],  # content
-                            chunk[1],  # audio_key
-                            self._cosine_similarity(
-                                query_embedding, embedding
-                            ),  # similarity
-                        )
-                    )
-                except Exception as e:
-                    logger.error(f"Error processing chunk embedding: {str(e)}")
-
-            return sorted(similarities, key=lambda x: x[2], reverse=True)[:limit]
+            return [
+                (content, audio_key, score)
+                for (content, audio_key), score in fused[:limit]
+            ]
 
         except Exception as e:
             logger.error(f"Error finding relevant context: {str(e)}")
             raise
 
+    def _vector_search(
+        self, schema: str, cursor, query_embedding, limit: int
+    ) -> List[Tuple[str, str, float]]:
+        """Top chunks by cosine similarity, using the configured index and quantization."""
+        matrix = self.vector_cache.get(schema, cursor)
+
+        rows = None
+        if matrix.index is not None and len(matrix) >= IVF_MIN_VECTORS:
+            rows = matrix.index.candidates(
+                query_embedding, matrix.cluster_ids, IVF_NPROBE
+            )
+
+        if matrix.quantized:
+            return matrix.rerank(
+                cursor,
+                schema,
+                query_embedding,
+                limit,
+                rows=rows,
+                candidates=RERANK_CANDIDATES,
+            )
+        return matrix.search(query_embedding, limit, rows=rows)
+
+    def get_embedding(self, text: str):
+        """
+        Get the embedding of a text, served from cache when possible.
+
+        Args:
+            text (str): Text to embed
+
+        Returns:
+            np.ndarray: float32 embedding
+
+        Raises:
+            Exception: If the OpenAI API call fails
+        """
+        return self.embedding_cache.get_or_create(
+            EMBEDDING_MODEL,
+            text,
+            lambda value: openai.embeddings.create(model=EMBEDDING_MODEL, input=value)
+            .data[0]
+            .embedding,
+        )
+
     def generate_chat_title(self, messages: List[dict]) -> str:
         """
         Generate a descriptive title for a chat based on its messages.
@@ -176,28 +265,6 @@ class LLM:
         """
         return self.rate_limiter.is_allowed(user_id)
 
-    def _cosine_similarity(self, vector_a: list, vector_b: list) -> float:
-        """
-        Calculate cosine similarity between two vectors.
-
-        Args:
-            vector_a (list): First vector
-            vector_b (list): Second vector
-
-        Returns:
-            float: Similarity score between 0 and 1
-
-        Raises:
-            Exception: If vector calculation fails
-        """
-        try:
-            a = np.array(vector_a)
-            b = np.array(vector_b)
-            return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-        except Exception as e:
-            logger.error(f"Error calculating similarity: {str(e)}")
-            raise
-
 
 class RateLimiter:
     """
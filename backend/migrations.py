@@ -0,0 +1,233 @@
+"""
+Schema migrations for existing Voice2Note user schemas.
+
+New schemas get the latest table layout from
+DatabaseManager.create_schema_tables. Schemas created before a layout change
+are brought up to date here. Every migration checks the catalog before
+altering anything, so the runner is safe to execute on each deploy:
+
+    python -m backend.migrations
+"""
+
+from backend.config import db_config, logger
+from backend.database import SEARCH_VECTOR_SQL, DatabaseManager
+
+
+def _column_type(cur, schema: str, table: str, column: str):
+    """Return the data type of a column, or None if it does not exist."""
+    cur.execute(
+        """
+        SELECT data_type
+        FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s AND column_name = %s
+        """,
+        (schema, table, column),
+    )
+    result = cur.fetchone()
+    return result[0] if result else None
+
+
+def note_vectors_bytea_embedding(cur, schema: str) -> bool:
+    """
+    Convert note_vectors.embedding from jsonb to packed little-endian float32.
+
+    The conversion runs in SQL through a session-local helper so the column
+    keeps its position, which the dbt staging union relies on.
+    """
+    if _column_type(cur, schema, "note_vectors", "embedding") != "jsonb":
+        return False
+
+    cur.execute(
+        """
+        CREATE OR REPLACE FUNCTION pg_temp.jsonb_to_float4le(value jsonb)
+        RETURNS bytea
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT COALESCE(
+                string_agg(
+                    substring(b from 4 for 1) || substring(b from 3 for 1)
+                    || substring(b from 2 for 1) || substring(b from 1 for 1),
+                    ''::bytea ORDER BY ord
+                ),
+                ''::bytea
+            )
+            FROM (
+                SELECT float4send(element::float4) AS b, ord
+                FROM jsonb_array_elements_text(value) WITH ORDINALITY AS t(element, ord)
+            ) AS packed
+        $$
+        """
+    )
+    cur.execute(
+        f"""
+        ALTER TABLE {schema}.note_vectors
+        ALTER COLUMN embedding TYPE bytea
+        USING pg_temp.jsonb_to_float4le(embedding)
+        """
+    )
+    return True
+
+
+def note_vector_index(cur, schema: str) -> bool:
+    """Add the IVF index table and per-row cluster assignment."""
+    if _column_type(cur, schema, "note_vectors", "cluster_id"):
+        return False
+
+    cur.execute(
+        f"""
+        ALTER TABLE {schema}.note_vectors ADD COLUMN cluster_id int4 NULL;
+
+        CREATE TABLE IF NOT EXISTS {schema}.note_vector_index (
+            index_id SERIAL NOT NULL,
+            nlist int4 NOT NULL,
+            dim int4 NOT NULL,
+            centroids bytea NOT NULL,
+            trained_vectors int4 NOT NULL,
+            created_at timestamp DEFAULT CURRENT_TIMESTAMP NOT NULL,
+            CONSTRAINT note_vector_index_pkey PRIMARY KEY (index_id)
+        );
+
+        GRANT SELECT, INSERT, UPDATE ON {schema}.note_vector_index TO {schema}, aws_lambda;
+        GRANT USAGE, SELECT ON SEQUENCE {schema}.note_vector_index_index_id_seq TO {schema}, aws_lambda;
+        GRANT SELECT ON {schema}.note_vector_index TO dbt_analytics;
+        """
+    )
+    return True
+
+
+def transcripts_search_vector(cur, schema: str) -> bool:
+    """
+    Add the generated full-text search column and its GIN index.
+
+    Adding a stored generated column rewrites the table, which backfills
+    search_vector for every existing transcript.
+    """
+    if _column_type(cur, schema, "transcripts", "search_vector"):
+        return False
+
+    cur.execute(
+        f"""
+        ALTER TABLE {schema}.transcripts
+        ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED;
+
+        CREATE INDEX IF NOT EXISTS transcripts_search_vector_idx
+            ON {schema}.transcripts USING GIN (search_vector);
+        """
+    )
+    return True
+
+
+def chat_list_metadata(cur, schema: str) -> bool:
+    """
+    Denormalize the notes list chat metadata onto chats and add the indexes
+    behind the notes list and chat history queries.
+
+    Existing chats are backfilled from chat_messages once; afterwards
+    /api/chat maintains the columns as it stores messages.
+    """
+    if _column_type(cur, schema, "chats", "message_count"):
+        return False
+
+    cur.execute(
+        f"""
+        ALTER TABLE {schema}.chats
+            ADD COLUMN preview text NULL,
+            ADD COLUMN message_count int4 DEFAULT 0 NOT NULL,
+            ADD COLUMN last_message_at timestamp NULL;
+
+        UPDATE {schema}.chats
+        SET preview = stats.preview,
+            message_count = stats.message_count,
+            last_message_at = stats.last_message_at
+        FROM (
+            SELECT
+                chat_id,
+                (ARRAY_AGG(content ORDER BY created_at ASC))[1] AS preview,
+                COUNT(*) AS message_count,
+                MAX(created_at) AS last_message_at
+            FROM {schema}.chat_messages
+            GROUP BY chat_id
+        ) AS stats
+        WHERE chats.chat_id = stats.chat_id;
+
+        CREATE INDEX IF NOT EXISTS chat_messages_chat_id_created_at_idx
+            ON {schema}.chat_messages (chat_id, created_at);
+        CREATE INDEX IF NOT EXISTS transcripts_audio_key_idx
+            ON {schema}.transcripts (audio_key);
+        """
+    )
+    return True
+
+
+def tenant_role_grant(cur, schema: str) -> bool:
+    """
+    Grant the user's role to the shared pool's login role.
+
+    Needed before DB_POOL_MODE=shared can SET ROLE to users created earlier.
+    Skipped when DB_TENANT_USER is not configured.
+    """
+    tenant_user = db_config.tenant_user
+    if not tenant_user:
+        return False
+
+    cur.execute("SELECT pg_has_role(%s, %s, 'MEMBER')", (tenant_user, schema))
+    if cur.fetchone()[0]:
+        return False
+
+    cur.execute(f"GRANT {schema} TO {tenant_user}")
+    return True
+
+
+# Applied in order to every user schema
+MIGRATIONS = [
+    note_vectors_bytea_embedding,
+    note_vector_index,
+    transcripts_search_vector,
+    chat_list_metadata,
+    tenant_role_grant,
+]
+
+
+def migrate_schema(cur, schema: str):
+    """Apply all pending migrations to one user schema."""
+    for migration in MIGRATIONS:
+        if migration(cur, schema):
+            logger.info(f"Applied {migration.__name__} to {schema}")
+
+
+def user_schemas(cur) -> list:
+    """Return the schema name of every user whose schema exists, by user id."""
+    cur.execute(
+        """
+        SELECT 'user_' || user_id
+        FROM public.users
+        WHERE EXISTS (
+            SELECT 1 FROM information_schema.schemata
+            WHERE schema_name = 'user_' || user_id
+        )
+        ORDER BY user_id
+        """
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def migrate_all(db: DatabaseManager):
+    """Apply all pending migrations to every existing user schema."""
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            schemas = user_schemas(cur)
+
+        for schema in schemas:
+            try:
+                with conn.cursor() as cur:
+                    migrate_schema(cur, schema)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error migrating {schema}: {str(e)}")
+                raise
+
+    logger.info(f"Migrated {len(schemas)} user schemas")
+
+
+if __name__ == "__main__":
+    migrate_all(DatabaseManager(db_config))
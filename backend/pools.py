@@ -0,0 +1,237 @@
+"""
+Thread-safe Postgres connection pool for Voice2Note.
+
+psycopg2's SimpleConnectionPool is not safe across threads, and its
+ThreadedConnectionPool raises PoolError as soon as every connection is
+checked out. Sync routes run in Starlette's thread pool, so bursts used to
+turn into 500s. BlockingConnectionPool instead queues callers first come,
+first served until a connection is returned or the checkout timeout
+passes.
+
+Like psycopg2's pools it keeps at most minconn idle connections (or
+max_idle, for pools that open lazily with minconn=0), unless callers are
+queued: a returned connection then goes to the next one instead of being
+closed.
+
+Usage:
+    connections = BlockingConnectionPool(1, 10, timeout=5, dbname="voice2note")
+    conn = connections.getconn()
+    try:
+        ...
+    finally:
+        connections.putconn(conn)
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+class PoolTimeout(PoolError):
+    """No connection became available within the checkout timeout."""
+
+
+class BlockingConnectionPool:
+    """
+    Bounded connection pool whose checkouts wait in a FIFO queue.
+
+    Attributes:
+        minconn (int): Connections opened up front
+        maxconn (int): Most connections open at once
+        max_idle (int): Most idle connections kept for reuse
+        timeout (float): Default seconds getconn waits for a connection
+        closed (bool): Whether closeall was called
+    """
+
+    def __init__(
+        self,
+        minconn: int,
+        maxconn: int,
+        timeout: float = 30.0,
+        max_idle: Optional[int] = None,
+        on_wait: Optional[Callable[[float], None]] = None,
+        **connect_kwargs,
+    ):
+        """
+        Args:
+            minconn (int): Connections to open now
+            maxconn (int): Most connections open at once
+            timeout (float, optional): Seconds getconn waits by default.
+                Defaults to 30
+            max_idle (int, optional): Idle connections kept for reuse.
+                Defaults to minconn
+            on_wait (Callable, optional): Called with the seconds every
+                successful checkout waited, e.g. a histogram's observe
+            **connect_kwargs: Passed to psycopg2.connect
+        """
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = minconn if max_idle is None else max_idle
+        self.closed = False
+        self._on_wait = on_wait
+        self._connect_kwargs = connect_kwargs
+
+        self._idle: List[extensions.connection] = []
+        self._in_use: Dict[int, extensions.connection] = {}
+        # Slots reserved by checkouts that are opening a new connection
+        self._opening = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+        for _ in range(minconn):
+            self._idle.append(psycopg2.connect(**connect_kwargs))
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    @property
+    def in_use_count(self) -> int:
+        """Connections checked out or being opened for a checkout."""
+        return len(self._in_use) + self._opening
+
+    @property
+    def waiting_count(self) -> int:
+        return len(self._waiters)
+
+    def getconn(self, timeout: Optional[float] = None) -> extensions.connection:
+        """
+        Check out a connection, waiting in line if none is free.
+
+        Args:
+            timeout (float, optional): Seconds to wait. Defaults to self.timeout
+
+        Returns:
+            connection: An open connection, to be given back with putconn
+
+        Raises:
+            PoolTimeout: If no connection became available in time
+            PoolError: If the pool is closed
+        """
+        start = time.monotonic()
+        deadline = start + (self.timeout if timeout is None else timeout)
+        ticket = object()
+        with self._lock:
+            self._waiters.append(ticket)
+            try:
+                conn = self._wait_for_turn(ticket, deadline)
+            finally:
+                self._waiters.remove(ticket)
+                # The next caller in line may be able to proceed too
+                self._changed.notify_all()
+            if conn is not None:
+                self._in_use[id(conn)] = conn
+
+        if conn is None:
+            conn = self._open_reserved()
+        if self._on_wait:
+            self._on_wait(time.monotonic() - start)
+        return conn
+
+    def _wait_for_turn(self, ticket, deadline: float):
+        """
+        Block until ticket is first in line and a connection is free.
+
+        The caller holds the lock.
+
+        Returns:
+            connection: An idle connection, or None when a slot was reserved
+                for opening a new one
+        """
+        while True:
+            if self.closed:
+                raise PoolError("connection pool is closed")
+            if self._waiters[0] is ticket:
+                if self._idle:
+                    return self._idle.pop()
+                if self.in_use_count < self.maxconn:
+                    self._opening += 1
+                    return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolTimeout(
+                    f"No connection available within the pool timeout "
+                    f"({self.maxconn} in use, {len(self._waiters) - 1} waiting)"
+                )
+            self._changed.wait(remaining)
+
+    def _open_reserved(self) -> extensions.connection:
+        """Open a connection for a reserved slot, outside the lock."""
+        try:
+            conn = psycopg2.connect(**self._connect_kwargs)
+        except Exception:
+            with self._lock:
+                self._opening -= 1
+                self._changed.notify_all()
+            raise
+        with self._lock:
+            self._opening -= 1
+            if self.closed:
+                conn.close()
+                raise PoolError("connection pool is closed")
+            self._in_use[id(conn)] = conn
+        return conn
+
+    def putconn(self, conn: extensions.connection, close: bool = False):
+        """
+        Give a connection back, rolling back any open transaction.
+
+        Args:
+            conn (connection): A connection from getconn
+            close (bool, optional): Close it instead of reusing it
+
+        Raises:
+            PoolError: If the connection does not belong to this pool
+        """
+        with self._lock:
+            if self._in_use.pop(id(conn), None) is None:
+                raise PoolError("trying to put unkeyed connection")
+            try:
+                if not (close or self.closed or conn.closed):
+                    status = conn.info.transaction_status
+                    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                        close = True
+                    elif status != extensions.TRANSACTION_STATUS_IDLE:
+                        try:
+                            conn.rollback()
+                        except psycopg2.Error:
+                            close = True
+                keep = not (close or self.closed or conn.closed) and (
+                    self._waiters or len(self._idle) < self.max_idle
+                )
+                if keep:
+                    self._idle.append(conn)
+                elif not conn.closed:
+                    conn.close()
+            finally:
+                self._changed.notify_all()
+
+    def retire(self):
+        """
+        Stop handing out connections: idle ones close now, checked-out ones
+        when they are given back, and pending and future checkouts fail.
+        """
+        with self._lock:
+            self.closed = True
+            for conn in self._idle:
+                if not conn.closed:
+                    conn.close()
+            self._idle.clear()
+            self._changed.notify_all()
+
+    def closeall(self):
+        """Close every connection and fail pending and future checkouts."""
+        with self._lock:
+            self.closed = True
+            for conn in self._idle + list(self._in_use.values()):
+                if not conn.closed:
+                    conn.close()
+            self._idle.clear()
+            self._changed.notify_all()
@@ -11,18 +11,67 @@ The module uses PostgreSQL for data storage and follows a multi-schema
 architecture where each user gets their own schema for isolation.
 """
 
-from backend.cache import QueryCache
-from backend.config import REDIS_URL, logger, db_config
-from backend.database import DatabaseManager
+import base64
+import datetime
+import json
+from typing import Optional, Tuple
+
+from backend.cache import AsyncQueryCache, CircuitBreaker, QueryCache
+from backend.codecs import Codec
+from backend.config import (
+    REDIS_URL,
+    CACHE_MEMORY_TTL,
+    CACHE_MEMORY_MAX_BYTES,
+    CACHE_GENERATION_TTL,
+    CACHE_STALE_TTL,
+    CACHE_PENDING_TTL,
+    CACHE_CODEC,
+    CACHE_COMPRESSION,
+    CACHE_COMPRESSION_THRESHOLD,
+    CACHE_BREAKER_FAILURES,
+    CACHE_BREAKER_COOLDOWN,
+    CACHE_BREAKER_MAX_COOLDOWN,
+    LEXICAL_CACHE_MAX_SCHEMAS,
+    NOTES_PAGE_SIZE,
+    logger,
+    db_config,
+)
+from backend.database import SEARCH_CONFIGS, DatabaseManager, search_query_sql
+from backend.lexical import LexicalCache
 
 db = DatabaseManager(db_config)
 
 # Initialize cache with 5 minute default timeout
-cache = QueryCache(redis_url=REDIS_URL)
+cache = QueryCache(
+    redis_url=REDIS_URL,
+    memory_ttl=CACHE_MEMORY_TTL,
+    memory_max_bytes=CACHE_MEMORY_MAX_BYTES,
+    generation_ttl=CACHE_GENERATION_TTL,
+    codec=Codec(CACHE_CODEC, CACHE_COMPRESSION, CACHE_COMPRESSION_THRESHOLD),
+    breaker=CircuitBreaker(
+        CACHE_BREAKER_FAILURES, CACHE_BREAKER_COOLDOWN, CACHE_BREAKER_MAX_COOLDOWN
+    ),
+)
+# Same cache for async route handlers, over a redis.asyncio connection pool
+async_cache = AsyncQueryCache(cache)
+
+# In-memory BM25 indexes for hybrid chat retrieval
+lexical_cache = LexicalCache(max_schemas=LEXICAL_CACHE_MAX_SCHEMAS)
 
 
-def _get_notes(schema: str) -> str:
-    """Internal: Generate base SQL for notes list."""
+def _get_notes(schema: str, keyword_search: bool = False) -> str:
+    """
+    Internal: Generate base SQL for notes list.
+
+    With ``keyword_search``, audio notes are restricted to transcripts whose
+    search_vector matches the keyword, passed once per entry of
+    SEARCH_CONFIGS ahead of any other parameters.
+    """
+    keyword_condition = (
+        f"AND transcripts.search_vector @@ ({search_query_sql()})"
+        if keyword_search
+        else ""
+    )
     return f"""
         WITH unified_content AS (
         -- Audio notes
@@ -38,10 +87,12 @@ def _get_notes(schema: str) -> str:
                 ELSE COALESCE(concat(split_part(metadata->>'duration',':',2), 'm ', 
                              split_part(split_part(metadata->>'duration',':',3),'.',1) , 's') , '...') 
             END as duration,
-            audios.created_at as sort_date
+            audios.created_at as sort_date,
+            (transcription IS NULL OR metadata IS NULL) as pending
         FROM {schema}.audios
         LEFT JOIN {schema}.transcripts ON audios.audio_key = transcripts.audio_key
         WHERE audios.deleted_at IS NULL
+        {keyword_condition}
 
         UNION ALL
 
@@ -51,20 +102,12 @@ def _get_notes(schema: str) -> str:
             chats.chat_id as content_id,
             TO_CHAR(chats.created_at, 'MM/DD') as created_date,
             title,
-            COALESCE(
-                (SELECT content 
-                FROM {schema}.chat_messages 
-                WHERE chat_messages.chat_id = chats.chat_id 
-                ORDER BY created_at ASC 
-                LIMIT 1),
-                'Start of conversation'
-            ) as preview,
-            COUNT(chat_messages.message_id)::text || ' messages' as duration,
-            chats.created_at as sort_date
+            COALESCE(preview, 'Start of conversation') as preview,
+            message_count::text || ' messages' as duration,
+            chats.created_at as sort_date,
+            FALSE as pending
         FROM {schema}.chats
-        LEFT JOIN {schema}.chat_messages ON chats.chat_id = chat_messages.chat_id
         WHERE chats.deleted_at IS NULL
-        GROUP BY chats.chat_id, chats.title, chats.created_at
         )
         SELECT * FROM unified_content
     """
@@ -77,7 +120,8 @@ def _get_note_detail(schema: str) -> str:
             audios.audio_key,
             TO_CHAR(audios.created_at, 'MM/DD') as note_date,
             COALESCE(transcription->>'note_title','Transcribing note...') as note_title,
-            COALESCE(transcription->>'transcript_text','Your audio is being transcribed...') as note_transcription
+            COALESCE(transcription->>'transcript_text','Your audio is being transcribed...') as note_transcription,
+            transcription IS NULL as pending
         FROM {schema}.audios
         LEFT JOIN {schema}.transcripts ON audios.audio_key = transcripts.audio_key
         WHERE audios.audio_key = %s
@@ -85,79 +129,175 @@ def _get_note_detail(schema: str) -> str:
     """
 
 
-def get_notes_with_cache(schema: str, filters: dict = None) -> list:
-    """Get notes list with caching support."""
-    if not filters:  # Only cache when no filters are applied
-        cache_key = f"notes:{schema}"
-        cached_result = cache.get(cache_key)
-        if cached_result is not None:
-            logger.info(f"Cache hit for notes:{schema}")
-            return cached_result
+def _notes_timeout(rows) -> int:
+    """
+    Seconds cached notes data stays fresh.
+
+    Each schema is a QueryCache namespace whose generation is bumped by the
+    web tier and by the Lambdas that write audios.metadata and transcripts.
+    Rows still being processed are about to change through a Lambda, and
+    without Redis, or while its circuit is open, the Lambdas' bumps don't
+    reach this worker, so both are only cached for CACHE_PENDING_TTL.
+
+    Args:
+        rows: Rows of a notes list page or a note detail, with the pending
+            flag last
+    """
+    if not cache.redis_available or any(row[-1] for row in rows):
+        return CACHE_PENDING_TTL
+    return cache.default_timeout
+
+
+def encode_notes_cursor(sort_date, content_id: str) -> str:
+    """Opaque cursor pointing just past a notes list row."""
+    if isinstance(sort_date, datetime.datetime):
+        sort_date = sort_date.isoformat()
+    payload = json.dumps([sort_date, content_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_notes_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a cursor from encode_notes_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        sort_date, content_id = json.loads(base64.urlsafe_b64decode(cursor))
+        datetime.datetime.fromisoformat(sort_date)
+        return sort_date, str(content_id)
+    except Exception as e:
+        raise ValueError(f"Invalid notes cursor: {cursor}") from e
+
+
+def get_notes_with_cache(
+    schema: str,
+    filters: dict = None,
+    cursor: Optional[str] = None,
+    page_size: int = NOTES_PAGE_SIZE,
+) -> Tuple[list, Optional[str]]:
+    """
+    Get one page of the notes list with caching support.
+
+    Rows are ordered newest first by (sort_date, content_id) and paginated
+    by keyset, so deep pages cost the same as the first one. Pages are
+    cached individually, filtered or not, in the schema's cache namespace,
+    so invalidate_note_cache retires every cached page at once. Concurrent
+    misses for a page run the query once, and an expired page keeps being
+    served for CACHE_STALE_TTL seconds while it is refreshed. Pages with
+    notes still being processed are only cached briefly (see _notes_timeout).
+
+    The keyword filter matches notes through the GIN-indexed
+    transcripts.search_vector (title, summary and transcript, in every
+    language of SEARCH_CONFIGS), and chats by title or first message.
+
+    Args:
+        schema (str): User's database schema
+        filters (dict, optional): start_date, end_date and keyword
+        cursor (str, optional): next_cursor of the previous page
+        page_size (int, optional): Rows per page
+
+    Returns:
+        Tuple[list, Optional[str]]: Page rows and the cursor of the next
+        page, None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    after = decode_notes_cursor(cursor) if cursor else None
+    keyword = (filters or {}).get("keyword")
 
     # Execute query
-    query = _get_notes(schema)
+    query = _get_notes(schema, keyword_search=bool(keyword))
 
     # Add filters if present
     params = []
-    if filters:
-        conditions = []
-        if filters.get("start_date"):
-            conditions.append("DATE(sort_date) >= %s")
-            params.append(filters["start_date"])
-        if filters.get("end_date"):
-            conditions.append("DATE(sort_date) <= %s")
-            params.append(filters["end_date"])
-        if filters.get("keyword"):
-            conditions.append("(title ILIKE %s OR preview ILIKE %s)")
-            params.extend([f"%{filters['keyword']}%", f"%{filters['keyword']}%"])
+    conditions = []
+    if keyword:
+        # Notes are matched inside the CTE, where the index applies
+        params.extend([keyword] * len(SEARCH_CONFIGS))
+        conditions.append(
+            "(content_type = 'note' OR title ILIKE %s OR preview ILIKE %s)"
+        )
+        params.extend([f"%{keyword}%", f"%{keyword}%"])
+    if filters and filters.get("start_date"):
+        conditions.append("DATE(sort_date) >= %s")
+        params.append(filters["start_date"])
+    if filters and filters.get("end_date"):
+        conditions.append("DATE(sort_date) <= %s")
+        params.append(filters["end_date"])
+    if after:
+        conditions.append("(sort_date, content_id) < (%s::timestamp, %s)")
+        params.extend(after)
 
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
 
-    query += " ORDER BY sort_date DESC"
+    # One extra row tells whether another page follows
+    query += " ORDER BY sort_date DESC, content_id DESC LIMIT %s"
+    params.append(page_size + 1)
 
-    # Execute query and cache result if no filters
-    with db.get_schema_connection(schema) as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            result = cur.fetchall()
+    def load_page():
+        with db.get_schema_connection(schema) as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                result = cur.fetchall()
 
-            if not filters:  # Only cache when no filters
-                cache.set(cache_key, result)
-                logger.info(f"Cached notes for {schema}")
+        next_cursor = None
+        if len(result) > page_size:
+            result = result[:page_size]
+            last = result[-1]
+            next_cursor = encode_notes_cursor(last[6], last[1])
+        return [result, next_cursor]
 
-            return result
+    filters_key = cache.make_key(**filters) if filters else "all"
+    cache_key = cache.namespaced_key(
+        schema, "notes", filters_key, page_size, cursor or "first"
+    )
+    result, next_cursor = cache.get_or_compute(
+        cache_key,
+        load_page,
+        timeout=lambda page: _notes_timeout(page[0]),
+        stale_ttl=CACHE_STALE_TTL,
+    )
+    return result, next_cursor
 
 
 def get_note_detail_with_cache(schema: str, audio_key: str) -> dict:
-    """Get note detail with caching support."""
-    cache_key = f"note:{schema}:{audio_key}"
-    cached_result = cache.get(cache_key)
-    if cached_result is not None:
-        logger.info(f"Cache hit for note:{schema}:{audio_key}")
-        return cached_result
+    """Get note detail with caching support, in the schema's cache namespace."""
 
-    # Execute query
-    query = _get_note_detail(schema)
-    with db.get_schema_connection(schema) as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, (audio_key,))
-            result = cur.fetchone()
-            if result:
-                cache.set(cache_key, result)
-                logger.info(f"Cached note detail for {audio_key}")
-            return result
-
-
-def invalidate_note_cache(schema: str, audio_key: str = None):
+    def load_note():
+        query = _get_note_detail(schema)
+        with db.get_schema_connection(schema) as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, (audio_key,))
+                return cur.fetchone()
+
+    cache_key = cache.namespaced_key(schema, "note", audio_key)
+    return cache.get_or_compute(
+        cache_key,
+        load_note,
+        timeout=lambda note: _notes_timeout([note]),
+        stale_ttl=CACHE_STALE_TTL,
+    )
+
+
+async def invalidate_note_cache(schema: str, audio_key: str = None):
     """
-    Invalidate cache when notes are modified.
+    Invalidate cache when notes or chats are modified.
+
+    Bumps the generation of the schema's cache namespace, which retires
+    every cached list page and note detail with a single INCR; the old
+    entries expire through their TTL. Call it after the change is committed.
+    Scripts outside the event loop can call cache.bump_generation directly.
+
+    Args:
+        schema (str): User's database schema
+        audio_key (str, optional): Modified note, kept for logging
     """
-    # Always invalidate notes list
-    cache.delete(f"notes:{schema}")
-    logger.info(f"Invalidated notes cache for {schema}")
-
-    # Invalidate specific note if provided
-    if audio_key:
-        cache.delete(f"note:{schema}:{audio_key}")
-        logger.info(f"Invalidated note cache for {audio_key}")
+    await async_cache.bump_generation(schema)
+    logger.info(
+        f"Invalidated notes cache for {schema}"
+        + (f" after change to {audio_key}" if audio_key else "")
+    )
@@ -0,0 +1,844 @@
+"""
+Vector search utilities for Voice2Note.
+
+Holds note embeddings as a single contiguous float32 matrix so that a chat
+query can be scored against every chunk with one matrix-vector product
+instead of a Python loop. Matrices are cached per schema and refreshed
+incrementally, so repeated chats don't rescan note_vectors.
+
+Matrices can optionally be held as int8 codes with a per-row scale, which
+cuts memory by about 4x; searches over them rerank the best candidates
+against the stored float32 embeddings so results stay exact.
+
+Query embeddings are cached too, keyed by model and normalized text, so a
+repeated or retried chat message skips the embeddings API call.
+
+Usage:
+    vector_cache = VectorCache(max_bytes=256 * 1024 * 1024)
+    matrix = vector_cache.get(schema, cursor)
+    results = matrix.search(query_embedding, limit=3)
+"""
+
+import datetime
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from cachetools import TTLCache
+
+from backend.config import logger
+from backend.metrics import Registry
+
+
+EMBEDDING_DTYPE = np.float32
+# Largest float32 cosine rounding error expected at embedding dimensions;
+# rows this close to the k-th score are rescored in float64 before ranking
+SCORE_TOLERANCE = 1e-5
+# float64 scores are ranked at this many decimals, so rows that differ only
+# by summation-order rounding (e.g. duplicate chunks) tie on vector_id
+RANK_DECIMALS = 12
+
+
+# note_vectors.embedding stores packed little-endian float32
+STORAGE_DTYPE = np.dtype("<f4")
+
+
+def decode_embedding(value) -> np.ndarray:
+    """
+    Decode a stored embedding into a float32 vector.
+
+    Binary values are viewed in place with ``np.frombuffer``; JSON values
+    from schemas that have not been migrated yet are parsed.
+
+    Args:
+        value: Embedding as returned by the database driver (bytea buffer,
+            JSON string or list)
+
+    Returns:
+        np.ndarray: 1-D float32 vector
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return np.frombuffer(value, dtype=STORAGE_DTYPE)
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=EMBEDDING_DTYPE)
+
+
+def encode_embedding(embedding: Sequence[float]) -> bytes:
+    """
+    Pack an embedding into the note_vectors storage format.
+
+    Args:
+        embedding (Sequence[float]): Embedding values
+
+    Returns:
+        bytes: Packed little-endian float32
+    """
+    return np.asarray(embedding, dtype=STORAGE_DTYPE).tobytes()
+
+
+class EmbeddingMatrix:
+    """
+    Note chunk embeddings stacked into one float32 matrix.
+
+    Instances are treated as immutable: ``append`` and ``without`` return new
+    matrices, so a search can keep using a snapshot while the cache swaps in
+    a refreshed one.
+
+    Attributes:
+        vector_ids (np.ndarray): (n,) note_vectors primary keys
+        contents (List[str]): Chunk text, one entry per matrix row
+        audio_keys (List[str]): Source note of each row
+        matrix (np.ndarray): (n, dim) float32 embeddings
+        norms (np.ndarray): (n,) precomputed L2 norms of each row
+        cluster_ids (np.ndarray): (n,) IVF list of each row, -1 if unassigned
+        index: IVF index the cluster ids refer to, if one is loaded
+        nbytes (int): Approximate memory held by the arrays and chunk text
+    """
+
+    quantized = False
+
+    def __init__(
+        self,
+        vector_ids: Sequence[int],
+        contents: List[str],
+        audio_keys: List[str],
+        matrix: np.ndarray,
+        cluster_ids: Optional[Sequence[int]] = None,
+        index=None,
+        norms: Optional[np.ndarray] = None,
+    ):
+        self.vector_ids = np.asarray(vector_ids, dtype=np.int64)
+        self.cluster_ids = (
+            np.asarray(cluster_ids, dtype=np.int32)
+            if cluster_ids is not None
+            else np.full(len(contents), -1, dtype=np.int32)
+        )
+        self.index = index
+        self.contents = contents
+        self.audio_keys = audio_keys
+        self.matrix = self._store_matrix(matrix)
+        if norms is not None:
+            self.norms = np.asarray(norms, dtype=EMBEDDING_DTYPE)
+        elif len(self):
+            self.norms = np.linalg.norm(
+                np.asarray(matrix, dtype=EMBEDDING_DTYPE), axis=1
+            )
+        else:
+            self.norms = np.empty(0, EMBEDDING_DTYPE)
+        self.nbytes = (
+            self.matrix.nbytes
+            + self.norms.nbytes
+            + self.vector_ids.nbytes
+            + self.cluster_ids.nbytes
+            + sum(len(content) for content in contents)
+            + sum(len(key) for key in audio_keys)
+        )
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    @property
+    def last_vector_id(self) -> int:
+        """Highest vector_id held in the matrix, 0 when empty."""
+        return int(self.vector_ids.max()) if len(self) else 0
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> "EmbeddingMatrix":
+        """
+        Build a matrix from (vector_id, content_chunk, audio_key, embedding)
+        rows, optionally followed by a cluster_id column.
+
+        Rows whose embedding cannot be decoded, or whose dimension differs
+        from the first valid row, are logged and skipped.
+
+        Args:
+            rows (Sequence[tuple]): Rows fetched from note_vectors
+
+        Returns:
+            EmbeddingMatrix: Matrix over all valid rows
+        """
+        vector_ids, contents, audio_keys, vectors, cluster_ids = [], [], [], [], []
+        for row in rows:
+            vector_id, content, audio_key, embedding = row[:4]
+            try:
+                vector = decode_embedding(embedding)
+                if vectors and vector.shape != vectors[0].shape:
+                    raise ValueError(
+                        f"Embedding dimension {vector.shape} does not match {vectors[0].shape}"
+                    )
+            except Exception as e:
+                logger.error(f"Error processing chunk embedding: {str(e)}")
+                continue
+            vector_ids.append(vector_id)
+            contents.append(content)
+            audio_keys.append(audio_key)
+            vectors.append(vector)
+            cluster_ids.append(row[4] if len(row) > 4 and row[4] is not None else -1)
+
+        matrix = np.vstack(vectors) if vectors else np.empty((0, 0), EMBEDDING_DTYPE)
+        return cls(vector_ids, contents, audio_keys, matrix, cluster_ids)
+
+    def append(self, other: "EmbeddingMatrix") -> "EmbeddingMatrix":
+        """
+        Return a new matrix with the rows of ``other`` added at the end.
+
+        Args:
+            other (EmbeddingMatrix): Newly fetched rows
+
+        Returns:
+            EmbeddingMatrix: Combined matrix, in this matrix's representation
+        """
+        if not len(other):
+            return self
+        other = self._convert(other)
+        if not len(self):
+            return other
+        if other.dim != self.dim:
+            raise ValueError(
+                f"Embedding dimension {other.dim} does not match {self.dim}"
+            )
+        return self._build(
+            np.concatenate([self.vector_ids, other.vector_ids]),
+            self.contents + other.contents,
+            self.audio_keys + other.audio_keys,
+            np.vstack([self.matrix, other.matrix]),
+            np.concatenate([self.cluster_ids, other.cluster_ids]),
+            np.concatenate([self.norms, other.norms]),
+            self._concat_extra(other),
+        )
+
+    def without(self, audio_keys: Iterable[str]) -> "EmbeddingMatrix":
+        """
+        Return a new matrix without the rows belonging to the given notes.
+
+        Args:
+            audio_keys (Iterable[str]): Notes whose chunks should be dropped
+
+        Returns:
+            EmbeddingMatrix: Filtered matrix (``self`` if nothing matched)
+        """
+        removed = set(audio_keys)
+        keep = [i for i, key in enumerate(self.audio_keys) if key not in removed]
+        if len(keep) == len(self):
+            return self
+        return self._build(
+            self.vector_ids[keep],
+            [self.contents[i] for i in keep],
+            [self.audio_keys[i] for i in keep],
+            self.matrix[keep],
+            self.cluster_ids[keep],
+            self.norms[keep],
+            self._take_extra(keep),
+        )
+
+    def scores(
+        self, query_embedding: Sequence[float], rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Cosine similarity of the query against every row.
+
+        Args:
+            query_embedding (Sequence[float]): Query vector
+            rows (np.ndarray, optional): Only score these row indices
+
+        Returns:
+            np.ndarray: Similarity scores, one per scored row
+        """
+        query = np.asarray(query_embedding, dtype=EMBEDDING_DTYPE)
+        if rows is None:
+            dots, norms = self._dot(query, None), self.norms
+        else:
+            dots, norms = self._dot(query, rows), self.norms[rows]
+        denominator = norms * np.linalg.norm(query)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = dots / denominator
+        # Zero vectors have no direction; rank them last instead of as NaN
+        return np.nan_to_num(scores, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def top_rows(
+        self,
+        query_embedding: Sequence[float],
+        limit: int,
+        rows: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Row indices and scores of the best matches, best first.
+
+        Rows are preselected on the fast float32 scores. The finalists are
+        then scored again in float64 and ranked by score, ties by vector_id,
+        so the order is deterministic and matches a row-by-row float64
+        search.
+
+        Args:
+            query_embedding (Sequence[float]): Query vector
+            limit (int): Maximum number of rows
+            rows (np.ndarray, optional): Candidate row indices, all rows if None
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (row indices, similarity scores)
+        """
+        if not len(self) or limit <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, np.float64)
+        scores = self.scores(query_embedding, rows)
+        finalists = top_k(scores, limit, tolerance=SCORE_TOLERANCE)
+        if rows is not None:
+            finalists = np.asarray(rows)[finalists]
+        exact = self._exact_scores(query_embedding, finalists)
+        ranked = -np.round(exact, RANK_DECIMALS)
+        best = np.lexsort((self.vector_ids[finalists], ranked))[:limit]
+        return finalists[best], exact[best]
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        limit: int = 3,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Find the rows most similar to the query.
+
+        Args:
+            query_embedding (Sequence[float]): Query vector
+            limit (int, optional): Maximum number of results. Defaults to 3
+            rows (np.ndarray, optional): Candidate row indices, all rows if None
+
+        Returns:
+            List[Tuple[str, str, float]]: (content, audio_key, similarity_score)
+            ordered by descending score
+        """
+        best, scores = self.top_rows(query_embedding, limit, rows)
+        return [
+            (self.contents[i], self.audio_keys[i], float(score))
+            for i, score in zip(best, scores)
+        ]
+
+    # Representation hooks, overridden by QuantizedEmbeddingMatrix
+
+    def _store_matrix(self, matrix: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(matrix, dtype=EMBEDDING_DTYPE)
+
+    def _dot(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        return matrix @ query
+
+    def _exact_scores(
+        self, query_embedding: Sequence[float], rows: np.ndarray
+    ) -> np.ndarray:
+        """float64 cosine similarity of the given rows, for final ranking."""
+        query = np.asarray(query_embedding, dtype=np.float64)
+        matrix = self.matrix[rows].astype(np.float64)
+        denominator = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = (matrix @ query) / denominator
+        return np.nan_to_num(scores, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def _convert(self, other: "EmbeddingMatrix") -> "EmbeddingMatrix":
+        return other
+
+    def _build(
+        self, vector_ids, contents, audio_keys, matrix, cluster_ids, norms, extra
+    ):
+        return EmbeddingMatrix(
+            vector_ids, contents, audio_keys, matrix, cluster_ids, self.index, norms
+        )
+
+    def _take_extra(self, keep):
+        return None
+
+    def _concat_extra(self, other):
+        return None
+
+
+class QuantizedEmbeddingMatrix(EmbeddingMatrix):
+    """
+    Embeddings stored as int8 codes with one float32 scale per row.
+
+    Uses a quarter of the memory of the float32 matrix. Scores are
+    approximate, so searches should rerank the best candidates against the
+    stored float32 embeddings (see ``rerank``).
+
+    Attributes:
+        matrix (np.ndarray): (n, dim) int8 codes, ``round(v / scale)``
+        scales (np.ndarray): (n,) float32 scale of each row
+    """
+
+    quantized = True
+
+    # Rows are dequantized in small blocks so scoring never materializes the
+    # full float32 matrix and each block stays cache-resident for the product
+    block_rows = 128
+
+    def __init__(self, *args, scales: Optional[np.ndarray] = None, **kwargs):
+        self.scales = scales
+        super().__init__(*args, **kwargs)
+        self.nbytes += self.scales.nbytes
+
+    @classmethod
+    def from_matrix(cls, source: EmbeddingMatrix) -> "QuantizedEmbeddingMatrix":
+        """
+        Quantize a float32 matrix.
+
+        Args:
+            source (EmbeddingMatrix): Matrix to quantize
+
+        Returns:
+            QuantizedEmbeddingMatrix: int8 copy with the same rows and norms
+        """
+        if isinstance(source, QuantizedEmbeddingMatrix):
+            return source
+        codes, scales = quantize_int8(source.matrix)
+        return cls(
+            source.vector_ids,
+            source.contents,
+            source.audio_keys,
+            codes,
+            source.cluster_ids,
+            source.index,
+            source.norms,
+            scales=scales,
+        )
+
+    def rerank(
+        self,
+        cursor,
+        schema: str,
+        query_embedding: Sequence[float],
+        limit: int = 3,
+        rows: Optional[np.ndarray] = None,
+        candidates: int = 50,
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Search with int8 scores, then rescore the best candidates exactly.
+
+        The float32 embeddings of the candidates are read back from
+        note_vectors, so the final scores match an unquantized search.
+
+        Args:
+            cursor: Database cursor for executing queries
+            schema (str): User's database schema
+            query_embedding (Sequence[float]): Query vector
+            limit (int, optional): Maximum number of results. Defaults to 3
+            rows (np.ndarray, optional): Candidate row indices, all rows if None
+            candidates (int, optional): Rows rescored in float32. Defaults to 50
+
+        Returns:
+            List[Tuple[str, str, float]]: (content, audio_key, similarity_score)
+        """
+        best, _ = self.top_rows(query_embedding, max(candidates, limit), rows)
+        if not len(best):
+            return []
+
+        cursor.execute(
+            f"""
+            SELECT vector_id, embedding
+            FROM {schema}.note_vectors
+            WHERE vector_id = ANY(%s)
+            """,
+            (self.vector_ids[best].tolist(),),
+        )
+        stored = {row[0]: row[1] for row in cursor.fetchall()}
+        found = [i for i in best if int(self.vector_ids[i]) in stored]
+        if not found:
+            return []
+
+        exact = EmbeddingMatrix(
+            self.vector_ids[found],
+            [self.contents[i] for i in found],
+            [self.audio_keys[i] for i in found],
+            np.vstack(
+                [decode_embedding(stored[int(self.vector_ids[i])]) for i in found]
+            ),
+        )
+        return exact.search(query_embedding, limit)
+
+    def _store_matrix(self, matrix: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(matrix, dtype=np.int8)
+
+    def _exact_scores(
+        self, query_embedding: Sequence[float], rows: np.ndarray
+    ) -> np.ndarray:
+        # Codes only approximate the embeddings; rerank rescores exactly
+        return self.scores(query_embedding, rows).astype(np.float64)
+
+    def _dot(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        codes = self.matrix if rows is None else self.matrix[rows]
+        scales = self.scales if rows is None else self.scales[rows]
+        dots = np.empty(len(codes), dtype=EMBEDDING_DTYPE)
+        for start in range(0, len(codes), self.block_rows):
+            block = codes[start : start + self.block_rows].astype(EMBEDDING_DTYPE)
+            dots[start : start + self.block_rows] = block @ query
+        return dots * scales
+
+    def _convert(self, other: EmbeddingMatrix) -> "QuantizedEmbeddingMatrix":
+        return QuantizedEmbeddingMatrix.from_matrix(other)
+
+    def _build(
+        self, vector_ids, contents, audio_keys, matrix, cluster_ids, norms, extra
+    ):
+        return QuantizedEmbeddingMatrix(
+            vector_ids,
+            contents,
+            audio_keys,
+            matrix,
+            cluster_ids,
+            self.index,
+            norms,
+            scales=extra,
+        )
+
+    def _take_extra(self, keep):
+        return self.scales[keep]
+
+    def _concat_extra(self, other):
+        return np.concatenate([self.scales, other.scales])
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-row int8 quantization.
+
+    Args:
+        matrix (np.ndarray): (n, dim) float embeddings
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (int8 codes, float32 per-row scales)
+    """
+    matrix = np.asarray(matrix, dtype=EMBEDDING_DTYPE)
+    if matrix.ndim != 2 or not len(matrix):
+        return np.empty(matrix.shape, dtype=np.int8), np.empty(0, EMBEDDING_DTYPE)
+    scales = np.abs(matrix).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(EMBEDDING_DTYPE)
+
+
+def top_k(scores: np.ndarray, k: int, tolerance: float = 0.0) -> np.ndarray:
+    """
+    Indices of the k highest scores, plus any within tolerance of the k-th.
+
+    Uses partitioning, so the full list is never sorted. The indices are
+    returned in row order; callers rank them.
+
+    Args:
+        scores (np.ndarray): (n,) scores
+        k (int): Number of top indices to keep
+        tolerance (float, optional): Also keep scores this close to the k-th
+            best, so rounding cannot drop a row that belongs in the top k
+
+    Returns:
+        np.ndarray: At least min(k, n) row indices
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k == len(scores):
+        return np.arange(len(scores))
+    kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+    return np.flatnonzero(scores >= kth - tolerance)
+
+
+class VectorCache:
+    """
+    Per-schema cache of embedding matrices with incremental refresh.
+
+    The first search for a schema loads every live note_vectors row. Later
+    searches only fetch rows with a vector_id above the last one seen and
+    drop the chunks of notes soft-deleted since the previous refresh.
+    Entries are evicted least-recently-used once the total size exceeds
+    ``max_bytes``, and fully reloaded after ``max_age`` seconds to pick up
+    rows committed out of vector_id order. When ``with_index`` is set, the
+    schema's latest IVF index is attached to the matrix and a newly trained
+    index triggers a full reload, since it reassigns every row. When
+    ``quantize`` is set, matrices are held as int8 codes
+    (QuantizedEmbeddingMatrix) to fit roughly four times as many vectors in
+    the same budget.
+
+    Attributes:
+        max_bytes (int): Memory budget across all cached schemas
+        max_age (int): Seconds before an entry is rebuilt from scratch
+        deletion_grace (int): Seconds of overlap when polling for deletions,
+            covering transactions that commit after they stamp deleted_at
+        with_index (bool): Load persisted IVF indexes alongside matrices
+        quantize (bool): Store matrices as int8 codes
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age: int = 900,
+        deletion_grace: int = 300,
+        with_index: bool = False,
+        quantize: bool = False,
+    ):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.deletion_grace = datetime.timedelta(seconds=deletion_grace)
+        self.with_index = with_index
+        self.quantize = quantize
+        self._entries: "OrderedDict[str, _VectorCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of all cached matrices."""
+        with self._lock:
+            return sum(entry.matrix.nbytes for entry in self._entries.values())
+
+    def get(self, schema: str, cursor) -> EmbeddingMatrix:
+        """
+        Get an up-to-date embedding matrix for a schema.
+
+        Args:
+            schema (str): User's database schema
+            cursor: Database cursor for executing queries
+
+        Returns:
+            EmbeddingMatrix: Live chunks of the user's notes
+        """
+        with self._lock:
+            entry = self._entries.get(schema)
+            if entry is not None:
+                self._entries.move_to_end(schema)
+
+        if entry is None or time.monotonic() - entry.loaded_at > self.max_age:
+            entry = self._load(schema, cursor)
+        else:
+            entry = self._refresh(schema, cursor, entry)
+
+        self._store(schema, entry)
+        return entry.matrix
+
+    def invalidate(self, schema: str):
+        """Drop the cached matrix for a schema."""
+        with self._lock:
+            self._entries.pop(schema, None)
+
+    def _load(self, schema: str, cursor) -> "_VectorCacheEntry":
+        """Load every live chunk of a schema."""
+        synced_at = self._database_time(cursor)
+        index = None
+        if self.with_index:
+            # Imported here because backend.ann builds on this module
+            from backend.ann import load_index
+
+            index = load_index(cursor, schema)
+
+        cursor.execute(
+            f"""
+            SELECT vector_id, content_chunk, audio_key, embedding, cluster_id
+            FROM {schema}.note_vectors
+            WHERE deleted_at IS NULL
+            ORDER BY vector_id
+            """
+        )
+        matrix = EmbeddingMatrix.from_rows(cursor.fetchall())
+        matrix.index = index
+        if self.quantize:
+            matrix = QuantizedEmbeddingMatrix.from_matrix(matrix)
+        logger.debug(f"Loaded {len(matrix)} vectors for {schema}")
+        return _VectorCacheEntry(matrix, synced_at, time.monotonic())
+
+    def _refresh(
+        self, schema: str, cursor, entry: "_VectorCacheEntry"
+    ) -> "_VectorCacheEntry":
+        """Apply rows inserted or deleted since the entry was synced."""
+        index_query = (
+            f"(SELECT MAX(index_id) FROM {schema}.note_vector_index)"
+            if self.with_index
+            else "NULL"
+        )
+        cursor.execute(
+            f"""
+            SELECT CURRENT_TIMESTAMP, ARRAY(
+                SELECT audio_key
+                FROM {schema}.audios
+                WHERE deleted_at >= %s
+            ), {index_query}
+            """,
+            (entry.synced_at - self.deletion_grace,),
+        )
+        synced_at, deleted_keys, index_id = cursor.fetchone()
+
+        current_index = entry.matrix.index
+        if index_id != (current_index.index_id if current_index else None):
+            return self._load(schema, cursor)
+
+        cursor.execute(
+            f"""
+            SELECT vector_id, content_chunk, audio_key, embedding, cluster_id
+            FROM {schema}.note_vectors
+            WHERE vector_id > %s
+            AND deleted_at IS NULL
+            ORDER BY vector_id
+            """,
+            (entry.matrix.last_vector_id,),
+        )
+        new_rows = EmbeddingMatrix.from_rows(cursor.fetchall())
+        new_rows.index = current_index
+
+        matrix = entry.matrix.without(deleted_keys or []).append(
+            new_rows.without(deleted_keys or [])
+        )
+        if matrix is not entry.matrix:
+            logger.debug(f"Refreshed vectors for {schema}: {len(matrix)} rows")
+        return _VectorCacheEntry(matrix, synced_at, entry.loaded_at)
+
+    def _store(self, schema: str, entry: "_VectorCacheEntry"):
+        """Insert an entry and evict least-recently-used schemas over budget."""
+        with self._lock:
+            self._entries[schema] = entry
+            self._entries.move_to_end(schema)
+            total = sum(e.matrix.nbytes for e in self._entries.values())
+            while total > self.max_bytes and len(self._entries) > 1:
+                evicted, old = self._entries.popitem(last=False)
+                total -= old.matrix.nbytes
+                logger.debug(f"Evicted vectors for {evicted}")
+
+    @staticmethod
+    def _database_time(cursor) -> datetime.datetime:
+        """Current database timestamp, used as the deletion watermark."""
+        cursor.execute("SELECT CURRENT_TIMESTAMP")
+        return cursor.fetchone()[0]
+
+
+class _VectorCacheEntry:
+    """Cached matrix plus the watermarks needed to refresh it."""
+
+    __slots__ = ("matrix", "synced_at", "loaded_at")
+
+    def __init__(
+        self,
+        matrix: EmbeddingMatrix,
+        synced_at: datetime.datetime,
+        loaded_at: float,
+    ):
+        self.matrix = matrix
+        self.synced_at = synced_at
+        self.loaded_at = loaded_at
+
+
+class QueryEmbeddingCache:
+    """
+    Content-addressed cache of query embeddings.
+
+    Keys are a hash of the model name and the normalized message text, and
+    values are packed float32 (about 6 KB for 1536 dims instead of ~30 KB of
+    JSON). The in-process tier is bounded by ``max_bytes``; the shared tier
+    is the Redis side of a QueryCache.
+
+    Attributes:
+        query_cache (QueryCache): Shared cache providing the Redis tier
+        ttl (int): Seconds an embedding stays cached in either tier
+        hits_memory (int): Lookups served from the process
+        hits_redis (int): Lookups served from Redis
+        misses (int): Lookups that had to call the embeddings API
+        metrics (Registry): The counters above in Prometheus form
+    """
+
+    def __init__(
+        self, query_cache=None, max_bytes: int = 16 * 1024 * 1024, ttl: int = 86400
+    ):
+        self.query_cache = query_cache
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=len)
+        self.hits_memory = 0
+        self.hits_redis = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.metrics = Registry()
+        self.metrics.callback(
+            "embedding_cache_lookups_total",
+            "Query embedding lookups by where they were served from",
+            lambda: {
+                ("memory",): self.hits_memory,
+                ("redis",): self.hits_redis,
+                ("api",): self.misses,
+            },
+            ("source",),
+            kind="counter",
+        )
+        self.metrics.callback(
+            "embedding_cache_memory_entries",
+            "Embeddings held in the process",
+            lambda: {(): len(self.memory)},
+        )
+        self.metrics.callback(
+            "embedding_cache_memory_bytes",
+            "Bytes of embeddings held in the process",
+            lambda: {(): int(self.memory.currsize)},
+        )
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Unicode-normalize and collapse whitespace so trivial variants share a key."""
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+    def make_key(self, model: str, text: str) -> str:
+        """Cache key for a model and message text."""
+        digest = hashlib.sha256(f"{model}\n{self.normalize(text)}".encode()).hexdigest()
+        return f"emb:{digest}"
+
+    def get_or_create(
+        self, model: str, text: str, create: Callable[[str], Sequence[float]]
+    ) -> np.ndarray:
+        """
+        Return the cached embedding for a text, computing it on a miss.
+
+        Args:
+            model (str): Embedding model name
+            text (str): Message text
+            create (Callable[[str], Sequence[float]]): Computes the embedding
+
+        Returns:
+            np.ndarray: 1-D float32 embedding
+        """
+        key = self.make_key(model, text)
+
+        with self._lock:
+            payload = self.memory.get(key)
+            if payload is not None:
+                self.hits_memory += 1
+        if payload is not None:
+            return decode_embedding(payload)
+
+        if self.query_cache is not None:
+            payload = self.query_cache.get_bytes(key)
+            if payload is not None:
+                self._remember(key, payload, counter="hits_redis")
+                return decode_embedding(payload)
+
+        payload = encode_embedding(create(text))
+        self._remember(key, payload, counter="misses")
+        if self.query_cache is not None:
+            self.query_cache.set_bytes(key, payload, self.ttl)
+        return decode_embedding(payload)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and in-process usage."""
+        with self._lock:
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_redis": self.hits_redis,
+                "misses": self.misses,
+                "entries": len(self.memory),
+                "bytes": int(self.memory.currsize),
+            }
+
+    def _remember(self, key: str, payload: bytes, counter: str):
+        """Count the lookup and keep the payload in the process if it fits."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            if len(payload) <= self.memory.maxsize:
+                self.memory[key] = payload
@@ -0,0 +1,94 @@
+"""
+Recall/latency benchmark: exact search vs the IVF index.
+
+Generates clustered synthetic embeddings (notes tend to group by topic),
+trains an IVF index and compares top-k recall and per-query latency against
+the exact matrix scan for a range of nprobe values.
+
+Usage:
+    python -m benchmarks.ann_benchmark --vectors 20000 --dim 1536
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from backend.ann import IVFIndex
+from backend.vectors import EmbeddingMatrix
+
+
+def synthetic_matrix(
+    count: int, dim: int, topics: int, spread: float, seed: int
+) -> EmbeddingMatrix:
+    """Embeddings drawn around random topic centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(topics, dim)).astype(np.float32)
+    labels = rng.integers(topics, size=count)
+    vectors = centres[labels] + spread * rng.normal(size=(count, dim)).astype(
+        np.float32
+    )
+    ids = np.arange(1, count + 1)
+    return EmbeddingMatrix(
+        ids, [f"chunk {i}" for i in ids], [f"note_{i // 4}" for i in ids], vectors
+    )
+
+
+def timed(fn, queries):
+    """Run fn over every query, returning results and mean milliseconds."""
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return results, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=1.0)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    matrix = synthetic_matrix(
+        args.vectors, args.dim, args.topics, args.spread, args.seed
+    )
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.choice(len(matrix), args.queries, replace=False)
+    queries = matrix.matrix[picks] + args.spread * rng.normal(
+        size=(args.queries, args.dim)
+    )
+
+    start = time.perf_counter()
+    index = IVFIndex.train(matrix.matrix)
+    train_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    matrix.cluster_ids = index.assign(matrix.matrix)
+    assign_seconds = time.perf_counter() - start
+
+    exact, exact_ms = timed(lambda q: matrix.search(q, args.limit), queries)
+    truth = [{r[0] for r in result} for result in exact]
+
+    print(
+        f"{len(matrix)} vectors x {args.dim} dims, {index.nlist} lists "
+        f"(train {train_seconds:.1f}s, assign {assign_seconds:.2f}s)"
+    )
+    print(f"{'mode':<14}{'recall@' + str(args.limit):>10}{'ms/query':>10}")
+    print(f"{'exact':<14}{1.0:>10.3f}{exact_ms:>10.2f}")
+    for nprobe in (1, 4, 8, 16, 32):
+        approx, approx_ms = timed(
+            lambda q: index.search(matrix, q, args.limit, nprobe=nprobe), queries
+        )
+        recall = np.mean(
+            [
+                len(expected & {r[0] for r in result}) / len(expected)
+                for expected, result in zip(truth, approx)
+            ]
+        )
+        print(f"{'ivf nprobe=' + str(nprobe):<14}{recall:>10.3f}{approx_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Encode/decode/size benchmark for the query cache codecs.
+
+Builds notes-list pages shaped like the rows get_notes_with_cache stores
+(content type, id, date, title, summary preview, duration, sort date,
+wrapped in the get_or_compute freshness envelope) and compares, for every
+codec and compressor installed here:
+
+- bytes stored in Redis per page
+- encode and decode time per page
+
+It also times a memory-tier hit, which returns the decoded object as is.
+
+Usage:
+    python -m benchmarks.cache_codec_benchmark --rows 20 --pages 200
+"""
+
+import argparse
+import datetime
+import random
+import time
+
+from backend.cache import QueryCache
+from backend.codecs import COMPRESSORS, FORMATS, Codec
+
+WORDS = (
+    "meeting project budget review idea follow up call client design launch "
+    "reunion proyecto presupuesto idea llamada cliente lanzamiento semana"
+).split()
+
+
+def synthetic_page(rows: int, rng: random.Random) -> dict:
+    """One cached notes-list page of mixed notes and chats."""
+    start = datetime.datetime(2024, 1, 1)
+    page = []
+    for i in range(rows):
+        created = start + datetime.timedelta(minutes=rng.randrange(500000))
+        summary = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+        if rng.random() < 0.8:
+            row = (
+                "note",
+                f"{rng.getrandbits(64):016x}.webm",
+                created.strftime("%m/%d"),
+                " ".join(rng.choice(WORDS) for _ in range(4)).title(),
+                summary,
+                f"{rng.randint(0, 59)}m {rng.randint(0, 59)}s",
+                created,
+                False,
+            )
+        else:
+            row = (
+                "chat",
+                str(rng.randrange(10**6)),
+                created.strftime("%m/%d"),
+                "New Chat",
+                summary[:200],
+                f"{rng.randint(2, 40)} messages",
+                created,
+                False,
+            )
+        page.append(row)
+    return {"value": [page, "eyJjdXJzb3IiOiAi"], "fresh_until": time.time()}
+
+
+def timed(fn, items):
+    """Run fn over every item, returning results and mean microseconds."""
+    start = time.perf_counter()
+    results = [fn(item) for item in items]
+    return results, (time.perf_counter() - start) * 1e6 / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--threshold", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [synthetic_page(args.rows, rng) for _ in range(args.pages)]
+
+    print(f"{args.pages} pages x {args.rows} rows")
+    print(f"{'codec':<18}{'bytes':>8}{'encode us':>11}{'decode us':>11}")
+    for name, (_, _, module) in FORMATS.items():
+        if module is None:
+            print(f"{name:<18}{'not installed':>30}")
+            continue
+        for compression in ("none", *COMPRESSORS):
+            if compression != "none" and COMPRESSORS[compression][3] is None:
+                continue
+            codec = Codec(name, compression, args.threshold)
+            payloads, encode_us = timed(codec.dumps, pages)
+            _, decode_us = timed(codec.loads, payloads)
+            size = sum(map(len, payloads)) / len(payloads)
+            label = name if compression == "none" else f"{name}+{compression}"
+            print(f"{label:<18}{size:>8.0f}{encode_us:>11.1f}{decode_us:>11.1f}")
+
+    cache = QueryCache(redis_url=None)
+    for i, page in enumerate(pages):
+        cache.set(f"page:{i}", page)
+    _, hit_us = timed(cache.get, [f"page:{i}" for i in range(len(pages))])
+    print(f"{'memory tier hit':<18}{'':>8}{'':>11}{hit_us:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Memory/recall benchmark: float32 matrix vs int8 scalar quantization.
+
+Uses the same clustered synthetic embeddings as the ANN benchmark and
+compares the resident size of the cached matrix, top-k recall against the
+exact float32 scan, and per-query latency for:
+
+- int8 scores alone
+- int8 first pass followed by a float32 rerank of the best candidates
+
+The rerank reads candidate embeddings from an in-memory stand-in for
+note_vectors, so the timings exclude the database round trip.
+
+Usage:
+    python -m benchmarks.quantization_benchmark --vectors 20000 --dim 1536
+"""
+
+import argparse
+
+import numpy as np
+
+from backend.vectors import QuantizedEmbeddingMatrix, encode_embedding
+from benchmarks.ann_benchmark import synthetic_matrix, timed
+
+
+class StoredEmbeddings:
+    """Cursor stand-in answering the rerank query from packed embeddings."""
+
+    def __init__(self, matrix):
+        self.rows = {
+            int(vector_id): encode_embedding(vector)
+            for vector_id, vector in zip(matrix.vector_ids, matrix.matrix)
+        }
+
+    def execute(self, query, params):
+        self.result = [(vector_id, self.rows[vector_id]) for vector_id in params[0]]
+
+    def fetchall(self):
+        return self.result
+
+
+def recall(truth, results):
+    """Mean fraction of the exact top-k found in each result list."""
+    return np.mean(
+        [
+            len(expected & {r[0] for r in result}) / len(expected)
+            for expected, result in zip(truth, results)
+        ]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=1.0)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    matrix = synthetic_matrix(
+        args.vectors, args.dim, args.topics, args.spread, args.seed
+    )
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.choice(len(matrix), args.queries, replace=False)
+    queries = matrix.matrix[picks] + args.spread * rng.normal(
+        size=(args.queries, args.dim)
+    )
+    quantized = QuantizedEmbeddingMatrix.from_matrix(matrix)
+    cursor = StoredEmbeddings(matrix)
+
+    exact, exact_ms = timed(lambda q: matrix.search(q, args.limit), queries)
+    truth = [{r[0] for r in result} for result in exact]
+
+    print(f"{len(matrix)} vectors x {args.dim} dims")
+    print(f"{'mode':<18}{'MiB':>8}{'recall@' + str(args.limit):>10}{'ms/query':>10}")
+    print(f"{'float32':<18}{matrix.nbytes / 2**20:>8.1f}{1.0:>10.3f}{exact_ms:>10.2f}")
+    approx, approx_ms = timed(lambda q: quantized.search(q, args.limit), queries)
+    print(
+        f"{'int8':<18}{quantized.nbytes / 2**20:>8.1f}"
+        f"{recall(truth, approx):>10.3f}{approx_ms:>10.2f}"
+    )
+    for candidates in (10, 25, 50, 100):
+        reranked, reranked_ms = timed(
+            lambda q: quantized.rerank(
+                cursor, "bench", q, args.limit, candidates=candidates
+            ),
+            queries,
+        )
+        print(
+            f"{'int8 rerank=' + str(candidates):<18}{quantized.nbytes / 2**20:>8.1f}"
+            f"{recall(truth, reranked):>10.3f}{reranked_ms:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -185,11 +185,57 @@ class Scripts:
         - Search form submission
         - Clear search functionality
         - Date range and keyword filtering
+        - Infinite scroll loading of further pages
 
         Returns:
             str: JavaScript code for notes page
         """
         return """
+                document.addEventListener('DOMContentLoaded', () => {
+                    const sentinel = document.getElementById('notes-sentinel');
+                    const list = document.getElementById('notes-list');
+                    if (!sentinel || !list) return;
+
+                    let loading = false;
+                    const observer = new IntersectionObserver(async (entries) => {
+                        if (!entries[0].isIntersecting || loading) return;
+                        loading = true;
+
+                        // Keep the active filters for every page
+                        const params = new URLSearchParams(window.location.search);
+                        params.set('cursor', sentinel.dataset.nextCursor);
+
+                        try {
+                            const response = await fetch(`/notes/page?${params}`);
+                            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                            const page = await response.json();
+
+                            list.insertAdjacentHTML('beforeend', page.html);
+                            if (page.next_cursor) {
+                                sentinel.dataset.nextCursor = page.next_cursor;
+                                // The observer only fires on changes: if a short
+                                // page left the sentinel in view, observing again
+                                // reports it as intersecting and loads the next one
+                                setTimeout(() => {
+                                    observer.unobserve(sentinel);
+                                    observer.observe(sentinel);
+                                });
+                            } else {
+                                observer.disconnect();
+                                sentinel.remove();
+                            }
+                        } catch (error) {
+                            console.error('Error loading notes:', error);
+                            observer.disconnect();
+                            sentinel.textContent = 'Could not load more notes.';
+                        } finally {
+                            loading = false;
+                        }
+                    }, { rootMargin: '200px' });
+
+                    observer.observe(sentinel);
+                });
+
                 function clearSearch() {
                     document.querySelector('input[name="start_date"]').value = '';
                     document.querySelector('input[name="end_date"]').value = '';
@@ -714,6 +714,12 @@ class Styles:
                 font-size: 1.2em;
                 margin-right: 8px;
             }
+            .notes-sentinel {
+                color: #666;
+                font-size: 0.9em;
+                text-align: center;
+                padding: 15px 0;
+            }
 
             @media (max-width: 768px) {
                 .search-container {
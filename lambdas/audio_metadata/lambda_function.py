@@ -9,6 +9,7 @@ from utils import (
     save_to_postgresql,
     reencode_webm,
     save_metadata_to_s3,
+    bump_cache_generation,
 )
 
 # Setup logging
@@ -24,6 +25,7 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_PORT = os.getenv("DB_PORT")
+REDIS_URL = os.getenv("REDIS_URL")
 
 # Path to ffmpeg binary from the layer
 FFMPEG_PATH = "/opt/bin/ffmpeg"
@@ -113,6 +115,9 @@ def lambda_handler(event, context):
             DB_PORT,
         )
 
+        # Refresh the note durations shown in the notes list
+        bump_cache_generation(f"user_{user_id}", REDIS_URL)
+
         # Save metadata JSON to S3
         metadata_s3_key = f"user_{user_id}/audios/metadata/{audio_key}.json"
         save_metadata_to_s3(
@@ -4,6 +4,12 @@ import psycopg2
 import json
 import os
 
+try:
+    import redis
+    from cache_generations import bump_command
+except ImportError:  # Shipped in lambdas/layers/cache
+    redis = None
+
 # Setup logging
 logger = Logger(service="v2n_audio_processing")
 
@@ -153,3 +159,30 @@ def save_to_postgresql(user_id, audio_key, metadata, user, password, db, host, p
     except Exception as e:
         logger.error(f"Error saving to PostgreSQL: {e}")
         raise
+
+
+def bump_cache_generation(schema: str, redis_url: str):
+    """
+    Bump the generation of the schema's cache namespace so the web tier
+    stops serving cached notes data read before this change, and broadcast
+    it so every web worker picks it up at once. Best effort: the web tier
+    only caches notes still being processed for CACHE_PENDING_TTL seconds,
+    so a skipped bump delays the change by at most that long.
+    """
+    if redis is None:
+        logger.warning(
+            "Cache layer not attached (redis, cache_generations), "
+            f"skipping cache generation bump for {schema}"
+        )
+        return
+    if not redis_url:
+        logger.warning(
+            f"REDIS_URL not set, skipping cache generation bump for {schema}"
+        )
+        return
+    try:
+        client = redis.from_url(redis_url, socket_connect_timeout=2, socket_timeout=2)
+        client.eval(*bump_command(schema))
+        logger.info(f"Bumped cache generation for {schema}")
+    except Exception as e:
+        logger.warning(f"Error bumping cache generation for {schema}: {e}")
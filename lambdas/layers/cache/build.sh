@@ -0,0 +1,17 @@
+#!/bin/bash
+# Builds cache-layer.zip, the Lambda layer that lets the summarize and
+# audio_metadata Lambdas bump the web tier's cache generations in Redis:
+# the redis package plus backend/cache_generations.py, which holds the bump
+# script shared with the web tier.
+#
+# Attach the layer to both functions and set REDIS_URL on them to the same
+# Redis the web tier uses. It must be reachable from the Lambdas' VPC.
+set -euo pipefail
+
+cd "$(dirname "$0")"
+rm -rf build cache-layer.zip
+pip install --quiet --requirement requirements.txt --target build/python
+cp ../../../backend/cache_generations.py build/python/
+(cd build && zip --quiet --recurse-paths ../cache-layer.zip python)
+rm -rf build
+echo "Built $(pwd)/cache-layer.zip"
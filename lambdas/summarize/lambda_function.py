@@ -7,6 +7,7 @@ from utils import (
     export_summary,
     save_to_postgresql,
     process_and_save_vectors,
+    bump_cache_generation,
 )
 from aws_lambda_powertools import Logger
 
@@ -27,6 +28,9 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_PORT = os.getenv("DB_PORT")
 
+# ENVs Cache
+REDIS_URL = os.getenv("REDIS_URL")
+
 # PROMPTS
 gpt_rol = "You are a voice note summarizing assistant."
 gpt_prompt_summary = """
@@ -88,6 +92,9 @@ def lambda_handler(event, context):
             DB_PORT,
         )
 
+        # Refresh the notes list and note detail served by the web tier
+        bump_cache_generation(user_path, REDIS_URL)
+
         # Save Vectors for LLM
         process_and_save_vectors(
             user_path,
@@ -1,8 +1,16 @@
 from datetime import datetime
 import json
+import operator
+import struct
 import psycopg2
 from aws_lambda_powertools import Logger
 
+try:
+    import redis
+    from cache_generations import bump_command
+except ImportError:  # Shipped in lambdas/layers/cache
+    redis = None
+
 # Setup logging
 logger = Logger(service="v2n_summarize")
 
@@ -103,6 +111,43 @@ def save_to_postgresql(
         raise
 
 
+def pack_embedding(embedding: list) -> bytes:
+    """Pack an embedding as little-endian float32 for note_vectors.embedding"""
+    return struct.pack(f"<{len(embedding)}f", *embedding)
+
+
+def load_centroids(cur) -> list:
+    """
+    Load the latest ANN index centroids for the current schema.
+
+    Locks the index table until commit so a retrain can't swap centroids
+    between reading them and inserting rows assigned to them.
+    """
+    cur.execute("LOCK TABLE note_vector_index IN SHARE MODE")
+    cur.execute(
+        """
+        SELECT nlist, dim, centroids
+        FROM note_vector_index
+        ORDER BY index_id DESC
+        LIMIT 1
+        """
+    )
+    result = cur.fetchone()
+    if not result:
+        return []
+    nlist, dim, blob = result
+    values = struct.unpack(f"<{nlist * dim}f", bytes(blob))
+    return [values[i * dim : (i + 1) * dim] for i in range(nlist)]
+
+
+def nearest_centroid(embedding: list, centroids: list):
+    """Index of the centroid with the highest dot product, None without index"""
+    if not centroids or len(centroids[0]) != len(embedding):
+        return None
+    scores = [sum(map(operator.mul, embedding, c)) for c in centroids]
+    return max(range(len(scores)), key=scores.__getitem__)
+
+
 def process_vectors(
     transcription: dict, client, user_path: str, audio_key: str, conn, cur
 ):
@@ -132,24 +177,31 @@ def process_vectors(
         if current_chunk:
             chunks.append(" ".join(current_chunk))
 
-        # Get embeddings and store them
-        cur.execute(f"SET search_path TO {user_path}")
-
+        # Get embeddings from OpenAI
+        embeddings = []
         for chunk in chunks:
-            # Get embedding from OpenAI
             response = client.embeddings.create(
                 model="text-embedding-ada-002", input=chunk
             )
-            embedding = response.data[0].embedding
+            embeddings.append(response.data[0].embedding)
 
-            # Store in PostgreSQL
+        # Store them, assigned to the current ANN index lists
+        cur.execute(f"SET search_path TO {user_path}")
+        centroids = load_centroids(cur)
+
+        for chunk, embedding in zip(chunks, embeddings):
             cur.execute(
                 """
                 INSERT INTO note_vectors 
-                    (audio_key, content_chunk, embedding)
-                VALUES (%s, %s, %s)
+                    (audio_key, content_chunk, embedding, cluster_id)
+                VALUES (%s, %s, %s, %s)
                 """,
-                (audio_key, chunk, json.dumps(embedding)),
+                (
+                    audio_key,
+                    chunk,
+                    psycopg2.Binary(pack_embedding(embedding)),
+                    nearest_centroid(embedding, centroids),
+                ),
             )
 
         conn.commit()
@@ -182,3 +234,30 @@ def process_and_save_vectors(
     except Exception as e:
         logger.error(f"Error saving vectors: {e}")
         raise
+
+
+def bump_cache_generation(schema: str, redis_url: str):
+    """
+    Bump the generation of the schema's cache namespace so the web tier
+    stops serving cached notes data read before this change, and broadcast
+    it so every web worker picks it up at once. Best effort: the web tier
+    only caches notes still being processed for CACHE_PENDING_TTL seconds,
+    so a skipped bump delays the change by at most that long.
+    """
+    if redis is None:
+        logger.warning(
+            "Cache layer not attached (redis, cache_generations), "
+            f"skipping cache generation bump for {schema}"
+        )
+        return
+    if not redis_url:
+        logger.warning(
+            f"REDIS_URL not set, skipping cache generation bump for {schema}"
+        )
+        return
+    try:
+        client = redis.from_url(redis_url, socket_connect_timeout=2, socket_timeout=2)
+        client.eval(*bump_command(schema))
+        logger.info(f"Bumped cache generation for {schema}")
+    except Exception as e:
+        logger.warning(f"Error bumping cache generation for {schema}: {e}")
@@ -22,7 +22,6 @@ from backend.database import DatabaseManager
 from backend.queries import (
     get_notes_with_cache,
     get_note_detail_with_cache,
-    invalidate_note_cache,
 )
 from backend.api_routes import setup_api_routes
 from frontend.styles import Styles
@@ -413,6 +412,64 @@ def home(request):
 ## Notes
 
 
+def notes_filters(start_date: str = None, end_date: str = None, keyword: str = None):
+    """Collect the notes list filters present in the query string."""
+    filters = {}
+    if start_date:
+        filters["start_date"] = start_date
+    if end_date:
+        filters["end_date"] = end_date
+    if keyword:
+        filters["keyword"] = keyword
+    return filters
+
+
+def note_card(item):
+    """
+    Render one notes list row as a card.
+
+    Args:
+        item (tuple): Row from get_notes_with_cache
+
+    Returns:
+        Div: Note or chat card
+    """
+    return Div(
+        Div(
+            Div(
+                P(item[2], cls="note-date"),  # created_date
+                P(item[3], cls="note-title"),  # title
+                cls="note-info",
+            ),
+            Div(
+                # For chats, show robot icon
+                (
+                    I(cls="fas fa-robot", style="color: #2196F3; font-size: 1.2em;")
+                    if item[0] == "chat"
+                    else None
+                ),
+                P(
+                    item[5],  # duration or message count if chat
+                    cls=(
+                        "note-duration" if item[0] == "note" else "chat-message-count"
+                    ),
+                ),
+                cls="note-actions",
+            ),
+            cls="note-header",
+        ),
+        P(item[4], cls="note-preview"),  # summary
+        Div(
+            A(
+                Button("View", cls="view-btn"),
+                href=f"/{'note' if item[0] == 'note' else 'chat'}_{item[1]}",
+            ),
+            style="text-align: right; margin-top: 10px;",
+        ),
+        cls=f"{'note' if item[0] == 'note' else 'chat'}",
+    )
+
+
 @rt("/notes")
 def notes(request, start_date: str = None, end_date: str = None, keyword: str = None):
     """
@@ -423,6 +480,8 @@ def notes(request, start_date: str = None, end_date: str = None, keyword: str =
     - Date range filtering
     - Keyword search
     - Note previews and metadata
+    - Infinite scroll: the first page is rendered here and later pages are
+      fetched from /notes/page as the end of the list scrolls into view
 
     Args:
         request (Request): The incoming request
@@ -438,19 +497,9 @@ def notes(request, start_date: str = None, end_date: str = None, keyword: str =
     if not schema:
         return RedirectResponse(url="/login", status_code=303)
 
-    # Invalidate cache on page load
-    invalidate_note_cache(schema)
-
     # Use cached query with filters
-    filters = {}
-    if start_date:
-        filters["start_date"] = start_date
-    if end_date:
-        filters["end_date"] = end_date
-    if keyword:
-        filters["keyword"] = keyword
-
-    items = get_notes_with_cache(schema, filters)
+    filters = notes_filters(start_date, end_date, keyword)
+    items, next_cursor = get_notes_with_cache(schema, filters)
 
     # Create search form with original styling
     search_form = Div(
@@ -504,45 +553,7 @@ def notes(request, start_date: str = None, end_date: str = None, keyword: str =
         cls="search-wrapper",
     )
 
-    content_cards = [
-        Div(
-            Div(
-                Div(
-                    P(item[2], cls="note-date"),  # created_date
-                    P(item[3], cls="note-title"),  # title
-                    cls="note-info",
-                ),
-                Div(
-                    # For chats, show robot icon
-                    (
-                        I(cls="fas fa-robot", style="color: #2196F3; font-size: 1.2em;")
-                        if item[0] == "chat"
-                        else None
-                    ),
-                    P(
-                        item[5],  # duration or message count if chat
-                        cls=(
-                            "note-duration"
-                            if item[0] == "note"
-                            else "chat-message-count"
-                        ),
-                    ),
-                    cls="note-actions",
-                ),
-                cls="note-header",
-            ),
-            P(item[4], cls="note-preview"),  # summary
-            Div(
-                A(
-                    Button("View", cls="view-btn"),
-                    href=f"/{'note' if item[0] == 'note' else 'chat'}_{item[1]}",
-                ),
-                style="text-align: right; margin-top: 10px;",
-            ),
-            cls=f"{'note' if item[0] == 'note' else 'chat'}",
-        )
-        for item in items
-    ]
+    content_cards = [note_card(item) for item in items]
 
     return Html(
         Head(
@@ -573,10 +584,23 @@ def notes(request, start_date: str = None, end_date: str = None, keyword: str =
                 Div(H1("Your Last Notes", cls="title")),
                 Div(
                     search_form,
-                    *(
-                        content_cards
-                        if content_cards
-                        else "Your notes and chats will show up here when you record or upload them."
+                    Div(
+                        *(
+                            content_cards
+                            if content_cards
+                            else "Your notes and chats will show up here when you record or upload them."
+                        ),
+                        id="notes-list",
+                    ),
+                    (
+                        Div(
+                            "Loading more...",
+                            id="notes-sentinel",
+                            cls="notes-sentinel",
+                            data_next_cursor=next_cursor,
+                        )
+                        if next_cursor
+                        else None
                     ),
                     cls="container",
                 ),
@@ -585,6 +609,48 @@ def notes(request, start_date: str = None, end_date: str = None, keyword: str =
     )
 
 
+@rt("/notes/page")
+def notes_page(
+    request,
+    cursor: str,
+    start_date: str = None,
+    end_date: str = None,
+    keyword: str = None,
+):
+    """
+    Next page of the notes list, for infinite scroll.
+
+    Args:
+        request (Request): The incoming request
+        cursor (str): next_cursor of the page already shown
+        start_date (str, optional): Filter notes from this date
+        end_date (str, optional): Filter notes until this date
+        keyword (str, optional): Search in titles and content
+
+    Returns:
+        JSONResponse: Rendered cards as "html" and the following "next_cursor"
+
+    Raises:
+        HTTPException: 401 if not authenticated, 400 for a malformed cursor
+    """
+    schema = db.validate_schema(request.cookies.get("schema"))
+    if not schema:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    filters = notes_filters(start_date, end_date, keyword)
+    try:
+        items, next_cursor = get_notes_with_cache(schema, filters, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return JSONResponse(
+        {
+            "html": "".join(to_xml(note_card(item)) for item in items),
+            "next_cursor": next_cursor,
+        }
+    )
+
+
 @rt("/note_{audio_key}")
 def note_detail(request: Request, audio_key: str):
     """
@@ -610,9 +676,6 @@ def note_detail(request: Request, audio_key: str):
     if not schema:
         return RedirectResponse(url="/login", status_code=303)
 
-    # Invalidate cache on page load
-    invalidate_note_cache(schema, audio_key)
-
     # Use cached query
     note = get_note_detail_with_cache(schema, audio_key)
     if not note:
@@ -0,0 +1,144 @@
+import datetime
+
+import numpy as np
+import pytest
+from psycopg2 import extensions
+
+from backend import pools
+from backend.vectors import encode_embedding
+
+
+class NoteVectorsTable:
+    """
+    One schema's note_vectors and audios, answering the queries the vector
+    modules run through a cursor.
+    """
+
+    def __init__(self, dim: int = 16, seed: int = 0):
+        self.dim = dim
+        self.rng = np.random.default_rng(seed)
+        self.now = datetime.datetime(2024, 5, 1, 12, 0)
+        # vector_id -> [content, audio_key, embedding, cluster_id, deleted_at]
+        self.rows = {}
+        # audio_key -> deleted_at
+        self.deleted_audios = {}
+        self.executed = []
+
+    def add(self, audio_key: str, count: int = 1, vectors=None) -> list:
+        """Insert chunks for a note, returning their vector_ids."""
+        if vectors is None:
+            vectors = self.rng.standard_normal((count, self.dim)).astype(np.float32)
+        ids = []
+        for vector in vectors:
+            vector_id = max(self.rows, default=0) + 1
+            self.rows[vector_id] = [
+                f"chunk {vector_id}",
+                audio_key,
+                encode_embedding(vector),
+                None,
+                None,
+            ]
+            ids.append(vector_id)
+        return ids
+
+    def delete(self, audio_key: str, at: datetime.datetime = None):
+        """Soft-delete a note and its chunks, stamped at ``at`` (default now)."""
+        at = at or self.now
+        self.deleted_audios[audio_key] = at
+        for row in self.rows.values():
+            if row[1] == audio_key:
+                row[4] = at
+
+    def live_rows(self, after: int = 0) -> list:
+        return [
+            (vector_id, content, audio_key, embedding, cluster_id)
+            for vector_id, (
+                content,
+                audio_key,
+                embedding,
+                cluster_id,
+                deleted_at,
+            ) in sorted(self.rows.items())
+            if vector_id > after and deleted_at is None
+        ]
+
+    def cursor(self) -> "NoteVectorsCursor":
+        return NoteVectorsCursor(self)
+
+
+class NoteVectorsCursor:
+    def __init__(self, table: NoteVectorsTable):
+        self.table = table
+        self.result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        table = self.table
+        query = " ".join(query.split())
+        table.executed.append(query)
+        if query.startswith("SELECT CURRENT_TIMESTAMP, ARRAY("):
+            since = params[0]
+            deleted = [k for k, at in table.deleted_audios.items() if at >= since]
+            self.result = [(table.now, deleted, None)]
+        elif query.startswith("SELECT CURRENT_TIMESTAMP"):
+            self.result = [(table.now,)]
+        elif "WHERE vector_id = ANY(%s)" in query:
+            wanted = set(params[0])
+            self.result = [
+                (vector_id, row[2])
+                for vector_id, row in table.rows.items()
+                if vector_id in wanted
+            ]
+        elif "WHERE vector_id > %s" in query:
+            self.result = table.live_rows(after=params[0])
+        elif "note_vectors WHERE deleted_at IS NULL" in query:
+            self.result = table.live_rows()
+        else:
+            raise AssertionError(f"Unexpected query: {query}")
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return list(self.result)
+
+
+@pytest.fixture
+def note_vectors():
+    return NoteVectorsTable()
+
+
+class FakeConnection:
+    """Idle psycopg2 connection that only tracks whether it was closed."""
+
+    def __init__(self, **connect_kwargs):
+        self.connect_kwargs = connect_kwargs
+        self.closed = 0
+        self.info = type(
+            "Info", (), {"transaction_status": extensions.TRANSACTION_STATUS_IDLE}
+        )()
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    """Make BlockingConnectionPool open FakeConnections, returning them all."""
+    opened = []
+
+    def connect(**kwargs):
+        conn = FakeConnection(**kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(pools.psycopg2, "connect", connect)
+    return opened
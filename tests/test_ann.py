@@ -0,0 +1,82 @@
+import numpy as np
+
+from backend.ann import UNASSIGNED, IVFIndex, train_schema_index
+from backend.vectors import EmbeddingMatrix, encode_embedding
+
+
+class IndexCursor:
+    """Fakes one schema's note_vectors and note_vector_index for training."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.indexes = [1, 2]
+        self.assignments = {}
+        self.result = None
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        if query.startswith("LOCK TABLE"):
+            return
+        if query.startswith("SELECT vector_id"):
+            self.result = list(self.rows)
+        elif query.startswith("DELETE FROM user_1.note_vector_index"):
+            self.indexes.clear()
+        elif query.startswith("INSERT INTO user_1.note_vector_index"):
+            self.indexes.append(3)
+            self.result = [(3,)]
+        elif query.startswith("UPDATE user_1.note_vectors"):
+            self.assignments = dict(zip(*params))
+        else:
+            raise AssertionError(f"Unexpected query: {query}")
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def make_rows(rng, count, dim=16):
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return [
+        (vector_id, f"chunk {vector_id}", "a.wav", encode_embedding(vector))
+        for vector_id, vector in enumerate(vectors, 1)
+    ]
+
+
+def test_training_replaces_earlier_indexes():
+    rows = make_rows(np.random.default_rng(0), 40)
+    cur = IndexCursor(rows)
+
+    index = train_schema_index(cur, "user_1", nlist=4)
+
+    assert cur.indexes == [3]
+    assert index.index_id == 3
+    assert sorted(cur.assignments) == list(range(1, 41))
+    assert set(cur.assignments.values()) <= set(range(4))
+
+
+def test_probing_every_list_matches_exact_search():
+    rng = np.random.default_rng(1)
+    matrix = EmbeddingMatrix.from_rows(make_rows(rng, 200))
+    index = IVFIndex.train(matrix.matrix, nlist=8)
+    matrix.cluster_ids = index.assign(matrix.matrix)
+    query = rng.standard_normal(16)
+
+    assert index.search(matrix, query, 5, nprobe=8) == matrix.search(query, 5)
+
+
+def test_unassigned_rows_are_always_candidates():
+    index = IVFIndex(np.eye(2, dtype=np.float32))
+    cluster_ids = np.array([0, 1, UNASSIGNED])
+
+    assert index.candidates([1.0, 0.0], cluster_ids, 1).tolist() == [0, 2]
+
+
+def test_centroids_round_trip_through_bytes():
+    index = IVFIndex.train(np.random.default_rng(2).standard_normal((30, 8)), 3)
+
+    loaded = IVFIndex.from_bytes(index.to_bytes(), index.nlist, index.dim, 7)
+
+    np.testing.assert_array_equal(loaded.centroids, index.centroids)
+    assert loaded.index_id == 7
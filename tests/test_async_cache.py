@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+import redis
+
+from backend.cache import AsyncQueryCache, QueryCache
+
+
+class AsyncRedis:
+    """Stands in for the redis.asyncio client of the running loop."""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = []
+
+    async def eval(self, *args):
+        self.calls.append(args)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def cache():
+    return QueryCache(redis_url="redis://127.0.0.1:1/0", invalidation_channel=None)
+
+
+def with_redis(cache, client) -> AsyncQueryCache:
+    """An AsyncQueryCache whose wrapped cache looks connected."""
+    cache.redis = object()
+    cache.breaker.reset()
+    async_cache = AsyncQueryCache(cache)
+    async_cache._redis = lambda: client
+    return async_cache
+
+
+def test_bump_without_redis_is_applied_locally(cache):
+    async_cache = AsyncQueryCache(cache)
+    old_key = cache.namespaced_key("user_1", "notes")
+
+    assert asyncio.run(async_cache.bump_generation("user_1")) == 1
+    assert cache.namespaced_key("user_1", "notes") != old_key
+    assert asyncio.run(async_cache.bump_generation("user_1")) == 2
+
+
+def test_bump_runs_the_shared_script_and_mirrors_its_result(cache):
+    client = AsyncRedis(result=7)
+    async_cache = with_redis(cache, client)
+
+    assert asyncio.run(async_cache.bump_generation("user_1")) == 7
+
+    assert client.calls == [cache.bump_command("user_1")]
+    assert cache.namespaced_key("user_1", "notes") == "user_1:g7:notes"
+
+
+def test_failed_bump_is_applied_locally_and_replayed_later(cache):
+    client = AsyncRedis(error=redis.ConnectionError("down"))
+    async_cache = with_redis(cache, client)
+
+    assert asyncio.run(async_cache.bump_generation("user_1")) == 1
+
+    assert "user_1" in cache._pending_bumps
+    assert cache.breaker.failures == 1
+    assert 'cache_errors_total{op="redis_eval",prefix=""} 1' in (cache.metrics.render())
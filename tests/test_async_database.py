@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+from psycopg import AsyncConnection, OperationalError
+from psycopg_pool import PoolTimeout
+
+from backend.async_database import AsyncDatabase, authentication_failed
+from backend.config import DatabaseConfig
+from backend.database import DatabaseManager
+
+REJECTED = 'connection failed: FATAL:  password authentication failed for user "user_1"'
+REFUSED = "connection failed: Connection refused"
+
+
+@pytest.fixture
+def db(fake_connect):
+    config = DatabaseConfig()
+    config.pool_timeout = 5
+    db = DatabaseManager(config)
+    db.lookups = []
+
+    def user_db_password(user_id):
+        db.lookups.append(user_id)
+        return "pw"
+
+    db.user_db_password = user_db_password
+    yield db
+    config.close_all()
+
+
+def refuse_connections(monkeypatch, message):
+    async def connect(cls, *args, **kwargs):
+        raise OperationalError(message)
+
+    monkeypatch.setattr(AsyncConnection, "connect", classmethod(connect))
+
+
+def run(db, scenario):
+    """Run ``scenario(adb)`` on a new loop, closing the pools after."""
+
+    async def main():
+        adb = AsyncDatabase(db)
+        try:
+            return adb, await scenario(adb)
+        finally:
+            await adb.close()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize(
+    "message, rejected",
+    [(REJECTED, True), (REFUSED, False), ("role does not exist", False)],
+)
+def test_authentication_failures_are_recognised(message, rejected):
+    assert authentication_failed(OperationalError(message)) is rejected
+
+
+def test_forget_user_closes_the_pool_and_keeps_the_password(db):
+    db.cache_db_password(1, "new")
+
+    async def scenario(adb):
+        connection_pool = await adb._get_user_pool(1)
+        await adb.forget_user(1)
+        await adb.forget_user(1)
+        return connection_pool
+
+    _, connection_pool = run(db, scenario)
+
+    assert connection_pool.closed
+    assert db.db_config.cached_db_password(1) == "new"
+
+
+def test_forgotten_user_is_bootstrapped_again(db):
+    async def scenario(adb):
+        first = await adb._get_user_pool(1)
+        await adb.forget_user(1)
+        return first, await adb._get_user_pool(1)
+
+    _, (first, second) = run(db, scenario)
+
+    assert first is not second
+    assert db.lookups == [1, 1]
+
+
+def test_rejected_credentials_drop_the_pool_at_once(db, monkeypatch):
+    refuse_connections(monkeypatch, REJECTED)
+    db.cache_db_password(1, "stale")
+
+    async def scenario(adb):
+        start = time.monotonic()
+        with pytest.raises(OperationalError) as error:
+            async with adb.schema_connection("user_1"):
+                pass
+        return error.value, time.monotonic() - start
+
+    adb, (error, elapsed) = run(db, scenario)
+
+    assert elapsed < 1
+    assert authentication_failed(error.__cause__)
+    assert not adb._user_pools
+    assert db.db_config.cached_db_password(1) is None
+    assert db.lookups == [1]
+
+
+def test_unreachable_server_keeps_the_pool(db, monkeypatch):
+    refuse_connections(monkeypatch, REFUSED)
+    db.db_config.pool_timeout = 0.2
+
+    async def scenario(adb):
+        with pytest.raises(PoolTimeout):
+            async with adb.schema_connection("user_1"):
+                pass
+        return list(adb._user_pools)
+
+    assert run(db, scenario)[1] == [1]
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+
+from backend import pools
+from backend.config import DatabaseConfig
+from backend.database import DatabaseManager
+
+
+@pytest.fixture
+def db(fake_connect):
+    config = DatabaseConfig()
+    config.user_pool_idle_timeout = 0
+    yield DatabaseManager(config)
+    config.close_all()
+
+
+def test_concurrent_requests_bootstrap_a_user_pool_once(db, monkeypatch):
+    lookups = []
+
+    def user_db_password(user_id):
+        lookups.append(user_id)
+        time.sleep(0.05)
+        return "pw"
+
+    monkeypatch.setattr(db, "user_db_password", user_db_password)
+    start = threading.Barrier(8)
+
+    def request():
+        start.wait()
+        with db.get_connection(1):
+            pass
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert lookups == [1]
+    assert list(db.db_config.user_pools) == ["user_1"]
+    assert not db.db_config._bootstrap_locks
+
+
+def test_cached_password_skips_the_lookup(db):
+    db.cache_db_password(1, "pw")
+
+    # A lookup would need a real app connection
+    assert db.user_db_password(1) == "pw"
+    db.ensure_user_pool(1)
+    assert db.db_config.has_user_pool(1)
+
+
+def test_rejected_credentials_drop_the_pool_and_password(db, monkeypatch):
+    db.cache_db_password(1, "stale")
+
+    def connect(**kwargs):
+        raise psycopg2.OperationalError("password authentication failed")
+
+    monkeypatch.setattr(pools.psycopg2, "connect", connect)
+    with pytest.raises(psycopg2.OperationalError):
+        with db.get_connection(1):
+            pass
+
+    assert not db.db_config.has_user_pool(1)
+    assert db.db_config.cached_db_password(1) is None
+
+
+def test_evicted_pool_is_bootstrapped_again(db):
+    db.cache_db_password(1, "pw")
+    db.ensure_user_pool(1)
+    db.db_config.drop_user_pool(1)
+
+    with db.get_connection(1) as conn:
+        assert conn.connect_kwargs["user"] == "user_1"
+    assert db.db_config.has_user_pool(1)
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+
+import pytest
+
+from backend.cache import QueryCache
+
+
+@pytest.fixture
+def cache():
+    # Nothing listens on port 1: the cache runs memory-only
+    return QueryCache(redis_url="redis://127.0.0.1:1/0", invalidation_channel=None)
+
+
+def test_bumping_a_generation_retires_its_keys(cache):
+    old_key = cache.namespaced_key("user_1", "notes", "first")
+    cache.set(old_key, ["note"])
+    other_key = cache.namespaced_key("user_2", "notes", "first")
+    cache.set(other_key, ["other"])
+
+    cache.bump_generation("user_1")
+
+    new_key = cache.namespaced_key("user_1", "notes", "first")
+    assert new_key != old_key
+    assert cache.get(new_key) is None
+    assert cache.get(other_key) == ["other"]
+
+
+def test_namespaced_keys_carry_the_generation(cache):
+    assert cache.namespaced_key("user_1", "note", "a.wav") == "user_1:g0:note:a.wav"
+    assert cache.bump_generation("user_1") == 1
+    assert cache.namespaced_key("user_1", "note", "a.wav") == "user_1:g1:note:a.wav"
+    assert cache.generation_key("user_1") == "gen:user_1"
+
+
+def test_broadcast_generation_is_mirrored(cache):
+    cache.namespaced_key("user_1", "notes")
+    message = {"origin": "another-worker", "namespace": "user_1", "generation": 7}
+
+    cache._apply_invalidation(json.dumps(message))
+
+    assert cache.namespaced_key("user_1", "notes") == "user_1:g7:notes"
+
+
+def test_broadcast_generation_never_goes_back(cache):
+    for _ in range(3):
+        cache.bump_generation("user_1")
+    message = {"origin": "another-worker", "namespace": "user_1", "generation": 1}
+
+    cache._apply_invalidation(json.dumps(message))
+
+    assert cache.generation("user_1") == 3
+
+
+def test_broadcast_keys_are_dropped_locally(cache):
+    cache.set("note:1", {"title": "a"})
+
+    cache._apply_invalidation(json.dumps({"origin": "x", "keys": ["note:1"]}))
+
+    assert cache.get("note:1") is None
+
+
+def test_own_and_malformed_broadcasts_are_ignored(cache):
+    cache.set("note:1", {"title": "a"})
+
+    cache._apply_invalidation(cache._invalidation_message(keys=["note:1"]))
+    cache._apply_invalidation("not json")
+
+    assert cache.get("note:1") == {"title": "a"}
+
+
+def test_get_or_compute_runs_once_for_concurrent_misses(cache):
+    calls = []
+    start = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"rows": 3}
+
+    results = []
+
+    def request():
+        start.wait()
+        results.append(cache.get_or_compute("notes:page", compute, timeout=60))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"rows": 3}] * 8
+    assert cache.get_or_compute("notes:page", compute, timeout=60) == {"rows": 3}
+    assert len(calls) == 1
+
+
+def test_get_or_compute_shares_errors_and_does_not_cache_them(cache):
+    def fail():
+        raise RuntimeError("query failed")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("notes:page", fail)
+
+    assert cache.get_or_compute("notes:page", lambda: [1]) == [1]
+
+
+def test_stale_value_is_served_while_refreshing(cache):
+    cache.get_or_compute("notes:page", lambda: "old", timeout=1, stale_ttl=60)
+    entry = cache.get("notes:page")
+    entry["fresh_until"] = time.time() - 1
+    cache.set("notes:page", entry)
+    refreshed = threading.Event()
+
+    def recompute():
+        refreshed.set()
+        return "new"
+
+    assert cache.get_or_compute("notes:page", recompute, stale_ttl=60) == "old"
+    assert refreshed.wait(2)
+    deadline = time.monotonic() + 2
+    while cache.get("notes:page")["value"] != "new":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_freshness_can_depend_on_the_value(cache):
+    cache.get_or_compute("notes:page", lambda: ["pending"], timeout=lambda rows: 5)
+
+    fresh_for = cache.get("notes:page")["fresh_until"] - time.time()
+
+    assert 0 < fresh_for <= 5
+
+
+def memory_only(**kwargs) -> QueryCache:
+    return QueryCache(
+        redis_url="redis://127.0.0.1:1/0", invalidation_channel=None, **kwargs
+    )
+
+
+def test_memory_tier_evicts_least_recently_used_entries_over_budget():
+    cache = memory_only(memory_max_bytes=300, sizeof=lambda key, payload: 100)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+
+    cache.get("a")
+    cache.set("d", "d")
+
+    assert [cache.get(key) for key in "abcd"] == ["a", None, "c", "d"]
+    assert cache.memory_stats()["bytes"] == 300
+    assert cache.memory_stats()["evictions"] == 1
+
+
+def test_entries_are_charged_by_encoded_size():
+    cache = memory_only()
+
+    cache.set("notes", ["x" * 1000])
+
+    payload = cache.codec.dumps(["x" * 1000])
+    assert cache.memory_stats()["bytes"] == len("notes") + len(payload)
+
+
+def test_oversized_entries_are_skipped_not_evicting_the_tier():
+    cache = memory_only(memory_max_bytes=200)
+    cache.set("small", "a")
+
+    cache.set("large", "x" * 1000)
+
+    assert cache.get("large") is None
+    assert cache.get("small") == "a"
+    assert cache.memory_stats()["oversized"] == 1
+    assert cache.memory_stats()["evictions"] == 0
+
+
+def test_expired_entries_are_counted_separately():
+    cache = memory_only(memory_ttl=0.05)
+    cache.set("a", "a")
+    time.sleep(0.1)
+
+    cache.set("b", "b")
+
+    assert cache.memory_stats()["expirations"] == 1
+    assert cache.memory_stats()["entries"] == 1
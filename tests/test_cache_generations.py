@@ -0,0 +1,33 @@
+import json
+
+from backend.cache import QueryCache
+from backend.cache_generations import BUMP_GENERATION, bump_command
+
+
+def test_lambda_bumps_use_the_shared_key_and_channel():
+    script, numkeys, key, channel, message = bump_command("user_1")
+
+    assert script == BUMP_GENERATION
+    assert (numkeys, key, channel) == (1, "gen:user_1", "cache:invalidate")
+    assert json.loads(message) == {"namespace": "user_1"}
+
+
+def test_web_tier_bumps_carry_their_origin():
+    cache = QueryCache(redis_url="redis://127.0.0.1:1/0", invalidation_channel=None)
+
+    *_, channel, message = cache.bump_command("user_1")
+
+    assert channel == ""
+    assert json.loads(message)["namespace"] == "user_1"
+    assert "origin" in json.loads(message)
+
+
+def test_lambda_broadcasts_are_applied_by_the_web_tier():
+    cache = QueryCache(redis_url="redis://127.0.0.1:1/0", invalidation_channel=None)
+    message = json.loads(bump_command("user_1")[-1])
+    # The script adds the new generation before publishing
+    message["generation"] = 4
+
+    cache._apply_invalidation(json.dumps(message))
+
+    assert cache.namespaced_key("user_1", "notes") == "user_1:g4:notes"
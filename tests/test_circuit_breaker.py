@@ -0,0 +1,109 @@
+import time
+
+import redis
+
+from backend.cache import CircuitBreaker, QueryCache
+
+
+class FlakyRedis:
+    """Sync Redis client that refuses connections until ``up`` is set."""
+
+    def __init__(self):
+        self.up = False
+        self.calls = []
+
+    def _call(self, op, *args):
+        self.calls.append(op)
+        if not self.up:
+            raise redis.ConnectionError("Connection refused")
+
+    def get(self, key):
+        self._call("get", key)
+        return None
+
+    def ping(self):
+        self._call("ping")
+        return True
+
+    def eval(self, *args):
+        self._call("eval", *args)
+        return 1
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def flaky_cache(failure_threshold: int):
+    """A cache whose Redis client is a FlakyRedis, starting with a closed circuit."""
+    breaker = CircuitBreaker(failure_threshold, cooldown=0.01)
+    # Nothing listens on port 1, so the circuit opens at boot
+    cache = QueryCache(
+        redis_url="redis://127.0.0.1:1/0", invalidation_channel=None, breaker=breaker
+    )
+    client = cache.redis = FlakyRedis()
+    breaker.reset()
+    wait_until(lambda: cache._reconnector_pid is None)
+    client.calls.clear()
+    return cache, client
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    opened = [breaker.record_failure() for _ in range(3)]
+
+    assert opened == [False, False, True]
+    assert breaker.is_open
+    # Only the failure that opened it reports it
+    assert breaker.record_failure() is False
+
+
+def test_reset_closes_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.trip()
+
+    breaker.reset()
+
+    assert not breaker.is_open
+    assert breaker.failures == 0
+
+
+def test_open_circuit_skips_redis_until_a_probe_succeeds():
+    cache, client = flaky_cache(failure_threshold=2)
+
+    cache.get("notes")
+    cache.get("notes")
+    assert cache.breaker.is_open
+    assert not cache.redis_available
+
+    # Open: Redis is not called at all, the reconnect thread probes it
+    wait_until(lambda: "ping" in client.calls)
+    gets = client.calls.count("get")
+    cache.get("notes")
+    assert client.calls.count("get") == gets
+
+    # Half-open probe succeeds: the circuit closes and Redis is used again
+    client.up = True
+    wait_until(lambda: not cache.breaker.is_open)
+    cache.get("notes")
+    assert client.calls.count("get") == gets + 1
+
+
+def test_bumps_made_while_open_are_replayed_on_reconnect():
+    cache, client = flaky_cache(failure_threshold=1)
+    cache.get("notes")
+    assert cache.breaker.is_open
+
+    cache.bump_generation("user_1")
+    assert "eval" not in client.calls
+
+    client.up = True
+    wait_until(lambda: "eval" in client.calls)
+    assert not cache._pending_bumps
@@ -0,0 +1,71 @@
+import datetime
+import zlib
+
+import pytest
+
+from backend.codecs import COMPRESSORS, FORMATS, Codec
+
+VALUE = {
+    "rows": [[1, "note", None, True, 2.5]] * 50,
+    "title": "Grocery list",
+    "nested": {"ids": list(range(20))},
+}
+
+AVAILABLE_FORMATS = [name for name, (_, _, module) in FORMATS.items() if module]
+AVAILABLE_COMPRESSORS = [
+    name for name, (_, _, _, module) in COMPRESSORS.items() if module
+]
+
+
+@pytest.mark.parametrize("name", AVAILABLE_FORMATS)
+@pytest.mark.parametrize("compression", ["none", *AVAILABLE_COMPRESSORS])
+def test_round_trip(name, compression):
+    codec = Codec(name, compression=compression, threshold=64)
+
+    assert codec.loads(codec.dumps(VALUE)) == VALUE
+
+
+@pytest.mark.parametrize("name", [n for n in AVAILABLE_FORMATS if n != "pickle"])
+def test_datetimes_come_back_as_iso_strings(name):
+    created = datetime.datetime(2024, 5, 1, 12, 30)
+
+    assert Codec(name).loads(Codec(name).dumps({"created": created})) == {
+        "created": created.isoformat()
+    }
+
+
+def test_small_payloads_are_not_compressed():
+    codec = Codec(compression="zlib", threshold=1024)
+
+    payload = codec.dumps({"a": 1})
+
+    assert payload[:1] == b"\x00"
+    assert payload[1:] == b'{"a":1}'
+
+
+def test_large_payloads_carry_the_compressor_header():
+    codec = Codec(compression="zlib", threshold=64)
+
+    payload = codec.dumps(VALUE)
+
+    assert payload[:1] == COMPRESSORS["zlib"][0]
+    assert len(payload) < len(Codec().dumps(VALUE))
+    assert zlib.decompress(payload[1:]) == Codec().dumps(VALUE)[1:]
+
+
+def test_payloads_stay_readable_after_compression_changes():
+    compressed = Codec(compression="zlib", threshold=64).dumps(VALUE)
+
+    assert Codec(compression="none").loads(compressed) == VALUE
+
+
+def test_unknown_header_is_rejected():
+    with pytest.raises(ValueError):
+        Codec().loads(b"?{}")
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        Codec("yaml")
+    with pytest.raises(ValueError):
+        Codec(compression="brotli")
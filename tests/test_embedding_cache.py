@@ -0,0 +1,83 @@
+import numpy as np
+
+from backend.vectors import QueryEmbeddingCache
+
+
+class SharedTier:
+    """Stands in for the Redis side of a QueryCache."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get_bytes(self, key):
+        return self.values.get(key)
+
+    def set_bytes(self, key, value, timeout=None):
+        self.values[key] = value
+        return True
+
+
+class Embedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 0.5, -1.0]
+
+
+def test_repeated_messages_are_embedded_once():
+    cache, embed = QueryEmbeddingCache(), Embedder()
+
+    first = cache.get_or_create("model", "hello", embed)
+    second = cache.get_or_create("model", "hello", embed)
+
+    assert embed.calls == ["hello"]
+    assert second.dtype == np.float32
+    np.testing.assert_array_equal(first, second)
+    assert cache.stats()["hits_memory"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_trivial_variants_share_a_key_but_models_do_not():
+    cache = QueryEmbeddingCache()
+
+    assert cache.make_key("m", " hello \n world") == cache.make_key("m", "hello world")
+    assert cache.make_key("m", "ｈｅｌｌｏ") == cache.make_key("m", "hello")
+    assert cache.make_key("a", "hello") != cache.make_key("b", "hello")
+    assert cache.make_key("m", "hello").startswith("emb:")
+
+
+def test_other_processes_are_served_from_the_shared_tier():
+    shared, embed = SharedTier(), Embedder()
+    QueryEmbeddingCache(shared).get_or_create("model", "hello", embed)
+
+    other = QueryEmbeddingCache(shared)
+    embedding = other.get_or_create("model", "hello", embed)
+
+    assert embed.calls == ["hello"]
+    assert embedding.tolist() == [5.0, 0.5, -1.0]
+    assert other.stats()["hits_redis"] == 1
+    assert other.stats()["entries"] == 1
+
+
+def test_memory_tier_is_bounded_by_bytes():
+    # Each 3-dim embedding packs to 12 bytes
+    cache, embed = QueryEmbeddingCache(max_bytes=30), Embedder()
+
+    for text in ("a", "b", "c"):
+        cache.get_or_create("model", text, embed)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] == 24
+
+
+def test_lookups_are_exported_as_metrics():
+    cache, embed = QueryEmbeddingCache(), Embedder()
+    cache.get_or_create("model", "hello", embed)
+    cache.get_or_create("model", "hello", embed)
+
+    exposition = cache.metrics.render()
+
+    assert 'embedding_cache_lookups_total{source="memory"} 1' in exposition
+    assert 'embedding_cache_lookups_total{source="api"} 1' in exposition
@@ -0,0 +1,72 @@
+import math
+
+import pytest
+
+from backend.lexical import BM25Index, LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def test_tokens_are_folded_and_stopwords_dropped():
+    assert tokenize("What did María say about the Café?") == [
+        "maria",
+        "say",
+        "about",
+        "cafe",
+    ]
+
+
+def test_bm25_matches_the_okapi_formula():
+    index = BM25Index(k1=1.2, b=0.75)
+    index.add(1, "budget budget review")
+    index.add(2, "review meeting notes today")
+    index.add(3, "grocery list")
+
+    scores = dict(index.search("budget"))
+
+    # One of three documents has the term, twice, in a shorter than average doc
+    idf = math.log(1 + (3 - 1 + 0.5) / (1 + 0.5))
+    length = 3 / (9 / 3)
+    expected = idf * 2 * 2.2 / (2 + 1.2 * (1 - 0.75 + 0.75 * length))
+    assert scores == {1: pytest.approx(expected)}
+
+
+def test_rarer_terms_and_shorter_documents_rank_higher():
+    index = BM25Index()
+    index.add("short", "maria called")
+    index.add("long", "maria called about the quarterly planning offsite agenda")
+    index.add("other", "called the bank")
+
+    ranking = [doc_id for doc_id, _ in index.search("maria called")]
+
+    assert ranking == ["short", "long", "other"]
+    assert index.search("maria called", limit=1)[0][0] == "short"
+
+
+def test_removed_and_replaced_documents_leave_no_postings():
+    index = BM25Index()
+    index.add(1, "alpha beta")
+    index.add(1, "gamma")
+    index.add(2, "beta")
+    index.remove([2, 99])
+
+    assert index.search("beta") == []
+    assert [doc_id for doc_id, _ in index.search("gamma")] == [1]
+    assert set(index.postings) == {"gamma"}
+    assert len(index) == 1
+
+
+def test_deleted_notes_drop_out_of_chunk_search():
+    index = LexicalIndex()
+    index.add_chunks([(1, "call Maria", "a.wav"), (2, "Maria's birthday", "b.wav")])
+    index.remove_notes(["a.wav"])
+
+    assert [audio_key for _, audio_key, _ in index.search_chunks("maria")] == ["b.wav"]
+    assert index.last_vector_id == 2
+
+
+def test_rrf_rewards_items_ranked_by_both_lists():
+    fused = reciprocal_rank_fusion(["a", "b", "c"], ["c", "d"], k=60)
+
+    assert [item for item, _ in fused][0] == "c"
+    assert dict(fused)["c"] == pytest.approx(1 / 63 + 1 / 61)
+    assert dict(fused)["a"] == pytest.approx(1 / 61)
+    assert reciprocal_rank_fusion() == []
@@ -0,0 +1,97 @@
+import pytest
+
+from backend.metrics import Registry, bearer_authorized
+
+
+def test_counters_render_one_sample_per_label_set():
+    registry = Registry()
+    hits = registry.counter("cache_hits_total", "Cache hits", ("tier",))
+    hits.inc(tier="redis")
+    hits.inc(2, tier="memory")
+
+    assert registry.render().splitlines() == [
+        "# HELP cache_hits_total Cache hits",
+        "# TYPE cache_hits_total counter",
+        'cache_hits_total{tier="memory"} 2',
+        'cache_hits_total{tier="redis"} 1',
+    ]
+
+
+def test_histograms_render_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    samples = registry.render().splitlines()[2:]
+
+    assert samples == [
+        'op_seconds_bucket{le="0.1"} 1',
+        'op_seconds_bucket{le="1.0"} 2',
+        'op_seconds_bucket{le="+Inf"} 3',
+        "op_seconds_sum 5.55",
+        "op_seconds_count 3",
+    ]
+
+
+def test_callbacks_are_read_at_render_time_and_labels_escaped():
+    entries = {(): 1}
+    registry = Registry()
+    registry.callback("entries", "Entries held", lambda: entries)
+    registry.callback(
+        "keys", "Keys", lambda: {('a"b\n',): 1}, ("prefix",), kind="counter"
+    )
+
+    entries[()] = 4
+
+    assert "entries 4" in registry.render().splitlines()
+    assert 'keys{prefix="a\\"b\\n"} 1' in registry.render().splitlines()
+
+
+def test_duplicate_metric_names_are_rejected():
+    registry = Registry()
+    registry.counter("hits_total", "Hits")
+
+    with pytest.raises(ValueError):
+        registry.counter("hits_total", "Hits")
+
+
+@pytest.mark.parametrize(
+    "authorization, expected",
+    [
+        ("Bearer s3cret", True),
+        ("Bearer wrong", False),
+        ("s3cret", False),
+        ("", False),
+        (None, False),
+        ("Bearer s3crét", False),
+    ],
+)
+def test_bearer_authorization(authorization, expected):
+    assert bearer_authorized(authorization, "s3cret") is expected
+
+
+def test_non_ascii_tokens_are_compared_without_error():
+    assert bearer_authorized("Bearer contraseña", "contraseña")
+    assert not bearer_authorized("Bearer contrasena", "contraseña")
+
+
+def test_admin_metrics_endpoint_requires_the_token(monkeypatch):
+    pytest.importorskip("fasthtml")
+    from fasthtml.common import FastHTML
+    from starlette.testclient import TestClient
+
+    from backend import api_routes
+    from backend.queries import db
+
+    monkeypatch.setattr(api_routes, "METRICS_TOKEN", "s3cret")
+    client = TestClient(api_routes.setup_api_routes(FastHTML(), db))
+
+    assert client.get("/api/admin/metrics").status_code == 401
+    wrong = {"Authorization": "Bearer wrong"}
+    assert client.get("/api/admin/metrics", headers=wrong).status_code == 401
+    response = client.get(
+        "/api/admin/metrics", headers={"Authorization": "Bearer s3cret"}
+    )
+    assert response.status_code == 200
+    assert "# TYPE" in response.text
@@ -0,0 +1,122 @@
+import pytest
+
+from backend import migrations
+
+CURRENT = {
+    ("note_vectors", "embedding"): "bytea",
+    ("note_vectors", "cluster_id"): "integer",
+    ("transcripts", "search_vector"): "tsvector",
+    ("chats", "message_count"): "integer",
+}
+
+# Catalog changes made by each migration's DDL
+EFFECTS = {
+    "ALTER COLUMN embedding TYPE bytea": ("note_vectors", "embedding", "bytea"),
+    "ADD COLUMN cluster_id": ("note_vectors", "cluster_id", "integer"),
+    "ADD COLUMN search_vector": ("transcripts", "search_vector", "tsvector"),
+    "ADD COLUMN preview": ("chats", "message_count", "integer"),
+}
+
+
+class CatalogCursor:
+    """Fakes the catalog lookups migrations make, and the DDL they run."""
+
+    def __init__(self, columns, member=True):
+        self.columns = dict(columns)
+        self.member = member
+        self.changes = []
+
+    def execute(self, query, params=None):
+        if "information_schema.columns" in query:
+            _, table, column = params
+            self.result = (
+                (self.columns[(table, column)],)
+                if (table, column) in self.columns
+                else None
+            )
+        elif "pg_has_role" in query:
+            self.result = (self.member,)
+        else:
+            self.changes.append(query)
+            for statement, (table, column, data_type) in EFFECTS.items():
+                if statement in query:
+                    self.columns[(table, column)] = data_type
+            if query.startswith("GRANT"):
+                self.member = True
+
+    def fetchone(self):
+        return self.result
+
+
+@pytest.fixture(autouse=True)
+def tenant_user(monkeypatch):
+    monkeypatch.setattr(migrations.db_config, "tenant_user", None)
+
+
+def test_up_to_date_schema_is_left_alone():
+    cur = CatalogCursor(CURRENT)
+
+    migrations.migrate_schema(cur, "user_1")
+
+    assert cur.changes == []
+
+
+def test_old_schema_is_migrated_once():
+    old = {("note_vectors", "embedding"): "jsonb"}
+    cur = CatalogCursor(old)
+
+    migrations.migrate_schema(cur, "user_1")
+    applied = len(cur.changes)
+    migrations.migrate_schema(cur, "user_1")
+
+    assert applied > 0
+    assert len(cur.changes) == applied
+    assert cur.columns == CURRENT
+
+
+def test_jsonb_embeddings_are_converted_in_place():
+    cur = CatalogCursor({("note_vectors", "embedding"): "jsonb"})
+
+    assert migrations.note_vectors_bytea_embedding(cur, "user_1") is True
+    assert "USING pg_temp.jsonb_to_float4le(embedding)" in cur.changes[-1]
+    assert migrations.note_vectors_bytea_embedding(cur, "user_1") is False
+
+
+def test_user_schemas_lists_existing_schemas_in_user_order():
+    class SchemaCursor:
+        def execute(self, query, params=None):
+            self.query = query
+
+        def fetchall(self):
+            return [("user_1",), ("user_4",)]
+
+    cur = SchemaCursor()
+
+    assert migrations.user_schemas(cur) == ["user_1", "user_4"]
+    assert "information_schema.schemata" in cur.query
+
+
+def test_chat_metadata_is_backfilled_from_chat_messages_once():
+    cur = CatalogCursor({})
+
+    assert migrations.chat_list_metadata(cur, "user_1") is True
+    assert "FROM user_1.chat_messages" in cur.changes[-1]
+    assert "GROUP BY chat_id" in cur.changes[-1]
+    assert migrations.chat_list_metadata(cur, "user_1") is False
+    assert len(cur.changes) == 1
+
+
+def test_tenant_user_is_granted_the_user_role_once(monkeypatch):
+    monkeypatch.setattr(migrations.db_config, "tenant_user", "voice2note_tenant")
+    cur = CatalogCursor(CURRENT, member=False)
+
+    assert migrations.tenant_role_grant(cur, "user_1") is True
+    assert migrations.tenant_role_grant(cur, "user_1") is False
+    assert cur.changes == ["GRANT user_1 TO voice2note_tenant"]
+
+
+def test_tenant_grant_skipped_without_tenant_user():
+    cur = CatalogCursor(CURRENT, member=False)
+
+    assert migrations.tenant_role_grant(cur, "user_1") is False
+    assert cur.changes == []
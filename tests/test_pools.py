@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from backend.pools import BlockingConnectionPool, PoolError, PoolTimeout
+
+
+@pytest.fixture(autouse=True)
+def connections(fake_connect):
+    return fake_connect
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_waiters_are_served_first_come_first_served():
+    connection_pool = BlockingConnectionPool(0, 1, timeout=5)
+    held = connection_pool.getconn()
+    served = []
+
+    def checkout(name):
+        conn = connection_pool.getconn()
+        served.append(name)
+        connection_pool.putconn(conn)
+
+    threads = []
+    for name in ("a", "b", "c"):
+        thread = threading.Thread(target=checkout, args=(name,))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: connection_pool.waiting_count == len(threads))
+
+    connection_pool.putconn(held)
+    for thread in threads:
+        thread.join(2)
+
+    assert served == ["a", "b", "c"]
+    assert connection_pool.waiting_count == 0
+    assert connection_pool.in_use_count == 0
+
+
+def test_checkout_times_out_when_exhausted():
+    connection_pool = BlockingConnectionPool(0, 1, timeout=5, max_idle=1)
+    held = connection_pool.getconn()
+
+    start = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        connection_pool.getconn(timeout=0.05)
+
+    assert time.monotonic() - start >= 0.05
+    assert connection_pool.waiting_count == 0
+    connection_pool.putconn(held)
+    assert connection_pool.getconn(timeout=0.05) is held
+
+
+def test_connections_are_opened_lazily_up_to_maxconn(connections):
+    connection_pool = BlockingConnectionPool(0, 2, timeout=5, max_idle=2)
+
+    first, second = connection_pool.getconn(), connection_pool.getconn()
+    connection_pool.putconn(first)
+
+    assert len(connections) == 2
+    assert connection_pool.getconn() is first
+    assert connection_pool.in_use_count == 2
+    connection_pool.putconn(second)
+
+
+def test_returned_connections_beyond_max_idle_are_closed():
+    connection_pool = BlockingConnectionPool(0, 3, max_idle=1)
+    connections = [connection_pool.getconn() for _ in range(3)]
+    for conn in connections:
+        connection_pool.putconn(conn)
+
+    assert connection_pool.idle_count == 1
+    assert [conn.closed for conn in connections] == [0, 1, 1]
+
+
+def test_retire_closes_checked_out_connections_on_return():
+    connection_pool = BlockingConnectionPool(0, 2, max_idle=1)
+    in_use, idle = connection_pool.getconn(), connection_pool.getconn()
+    connection_pool.putconn(idle)
+
+    connection_pool.retire()
+
+    assert idle.closed and not in_use.closed
+    with pytest.raises(PoolError):
+        connection_pool.getconn(timeout=0.05)
+    connection_pool.putconn(in_use)
+    assert in_use.closed
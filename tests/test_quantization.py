@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from backend.vectors import (
+    EmbeddingMatrix,
+    QuantizedEmbeddingMatrix,
+    VectorCache,
+    quantize_int8,
+)
+
+
+def test_codes_reconstruct_rows_within_half_a_step():
+    matrix = np.random.default_rng(0).standard_normal((20, 32)).astype(np.float32)
+
+    codes, scales = quantize_int8(matrix)
+
+    assert codes.dtype == np.int8
+    assert np.abs(codes).max() <= 127
+    error = np.abs(codes * scales[:, None] - matrix)
+    assert (error <= scales[:, None] / 2 + 1e-6).all()
+
+
+def test_zero_rows_quantize_without_dividing_by_zero():
+    codes, scales = quantize_int8(np.zeros((2, 4), dtype=np.float32))
+
+    assert not codes.any()
+    assert scales.tolist() == [1.0, 1.0]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_rerank_matches_exact_search(note_vectors, seed):
+    rng = np.random.default_rng(seed)
+    for note in range(30):
+        note_vectors.add(f"{note}.wav", int(rng.integers(1, 6)))
+    exact = EmbeddingMatrix.from_rows(note_vectors.live_rows())
+    quantized = QuantizedEmbeddingMatrix.from_matrix(exact)
+    query = rng.standard_normal(note_vectors.dim)
+
+    results = quantized.rerank(note_vectors.cursor(), "user_1", query, limit=5)
+
+    expected = exact.search(query, 5)
+    assert [result[:2] for result in results] == [item[:2] for item in expected]
+    np.testing.assert_allclose(
+        [result[2] for result in results], [item[2] for item in expected]
+    )
+
+
+def test_rerank_skips_rows_deleted_since_the_matrix_was_built(note_vectors):
+    note_vectors.add("keep.wav", vectors=[np.ones(16, dtype=np.float32)])
+    gone = note_vectors.add("gone.wav", vectors=[np.ones(16, dtype=np.float32)])
+    quantized = QuantizedEmbeddingMatrix.from_matrix(
+        EmbeddingMatrix.from_rows(note_vectors.live_rows())
+    )
+    del note_vectors.rows[gone[0]]
+
+    results = quantized.rerank(note_vectors.cursor(), "user_1", np.ones(16), 2)
+
+    assert [audio_key for _, audio_key, _ in results] == ["keep.wav"]
+
+
+def test_vector_cache_holds_int8_matrices(note_vectors):
+    note_vectors.add("a.wav", 8)
+    exact = VectorCache().get("user_1", note_vectors.cursor())
+
+    matrix = VectorCache(quantize=True).get("user_1", note_vectors.cursor())
+
+    assert matrix.quantized
+    assert matrix.matrix.dtype == np.int8
+    assert matrix.nbytes < exact.nbytes
+
+
+def test_quantized_entries_stay_quantized_after_appends(note_vectors):
+    cache = VectorCache(quantize=True)
+    note_vectors.add("a.wav", 2)
+    cache.get("user_1", note_vectors.cursor())
+
+    note_vectors.add("b.wav", 2)
+    matrix = cache.get("user_1", note_vectors.cursor())
+
+    assert matrix.matrix.dtype == np.int8
+    assert len(matrix.scales) == 4
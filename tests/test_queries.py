@@ -0,0 +1,157 @@
+import base64
+import datetime
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from backend import queries
+from backend.cache import QueryCache
+from backend.queries import decode_notes_cursor, encode_notes_cursor
+
+
+def test_cursor_round_trip():
+    sort_date = datetime.datetime(2024, 5, 1, 12, 30, 15, 250000)
+
+    cursor = encode_notes_cursor(sort_date, "note_42")
+
+    assert decode_notes_cursor(cursor) == (sort_date.isoformat(), "note_42")
+    # Safe to pass as a query parameter
+    assert not set(cursor) & set("+/")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        encode_notes_cursor("yesterday", "note_1"),
+        base64.urlsafe_b64encode(b'["2024-05-01T00:00:00"]').decode(),
+    ],
+)
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_notes_cursor(cursor)
+
+
+class KeysetCursor:
+    """Answers the notes list query from rows, applying its keyset boundary."""
+
+    def __init__(self, rows, executed):
+        self.rows = rows
+        self.executed = executed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        self.executed.append((query, params))
+        *_, limit = params
+        rows = sorted(self.rows, key=lambda row: (row[6], row[1]), reverse=True)
+        if "(sort_date, content_id) < (%s::timestamp, %s)" in query:
+            sort_date, content_id = params[-3], params[-2]
+            after = (datetime.datetime.fromisoformat(sort_date), content_id)
+            rows = [row for row in rows if (row[6], row[1]) < after]
+        self.result = rows[:limit]
+
+    def fetchall(self):
+        return self.result
+
+
+@pytest.fixture
+def notes(monkeypatch):
+    # Several notes share a timestamp, so page boundaries fall inside ties
+    base = datetime.datetime(2024, 5, 1)
+    rows = [
+        (
+            "note",
+            f"note_{i:02d}",
+            "title",
+            None,
+            None,
+            None,
+            base.replace(hour=i // 3),
+            False,
+        )
+        for i in range(14)
+    ]
+    executed = []
+
+    @contextmanager
+    def get_schema_connection(schema):
+        yield type("Conn", (), {"cursor": lambda self: KeysetCursor(rows, executed)})()
+
+    monkeypatch.setattr(queries.db, "get_schema_connection", get_schema_connection)
+    # Memory-only, as when Redis is unreachable
+    memory_only = QueryCache(
+        redis_url="redis://127.0.0.1:1/0", invalidation_channel=None
+    )
+    monkeypatch.setattr(queries, "cache", memory_only)
+    return rows, executed
+
+
+def test_pages_cover_every_row_once_across_timestamp_ties(notes):
+    rows, executed = notes
+    seen, cursor = [], None
+    while True:
+        page, cursor = queries.get_notes_with_cache(
+            "user_1", cursor=cursor, page_size=4
+        )
+        seen.extend(row[1] for row in page)
+        if cursor is None:
+            break
+
+    expected = sorted(rows, key=lambda row: (row[6], row[1]), reverse=True)
+    assert seen == [row[1] for row in expected]
+    assert len(executed) == 4
+
+
+def test_next_cursor_points_at_last_row_of_page(notes):
+    _, executed = notes
+
+    page, cursor = queries.get_notes_with_cache("user_1", page_size=5)
+
+    assert decode_notes_cursor(cursor) == (page[-1][6].isoformat(), page[-1][1])
+    query, params = executed[-1]
+    assert query.endswith("ORDER BY sort_date DESC, content_id DESC LIMIT %s")
+    assert params[-1] == 6
+
+
+def test_pages_are_cached_in_memory_without_redis(notes, monkeypatch):
+    _, executed = notes
+    monkeypatch.setattr(queries, "CACHE_PENDING_TTL", 60)
+
+    first = queries.get_notes_with_cache("user_1", page_size=5)
+    again = queries.get_notes_with_cache("user_1", page_size=5)
+
+    assert len(executed) == 1
+    assert again[1] == first[1]
+    # Without Redis the Lambdas' bumps can't arrive, so pages expire quickly
+    (key,) = list(queries.cache.memory_cache)
+    assert queries.cache.get(key)["fresh_until"] <= time.time() + 60
+
+
+def test_pages_with_notes_being_processed_are_cached_briefly(monkeypatch):
+    monkeypatch.setattr(type(queries.cache), "redis_available", True)
+
+    done, processing = ("note",) * 7 + (False,), ("note",) * 7 + (True,)
+
+    assert queries._notes_timeout([done]) == queries.cache.default_timeout
+    assert queries._notes_timeout([done, processing]) == queries.CACHE_PENDING_TTL
+
+
+def test_last_page_has_no_cursor(notes):
+    page, cursor = queries.get_notes_with_cache("user_1", page_size=14)
+
+    assert len(page) == 14
+    assert cursor is None
+
+
+def test_notes_list_reads_chat_metadata_from_the_chats_row():
+    sql = " ".join(queries._get_notes("user_1").split())
+
+    assert "chat_messages" not in sql
+    assert "COALESCE(preview, 'Start of conversation') as preview" in sql
+    assert "message_count::text || ' messages' as duration" in sql
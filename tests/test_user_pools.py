@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from backend.config import DatabaseConfig
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def config(fake_connect):
+    config = DatabaseConfig()
+    config.max_user_pools = 2
+    config.user_pool_idle_timeout = 0
+    yield config
+    config.close_all()
+
+
+def use(config, user_id):
+    conn = config.get_user_connection(user_id)
+    config.return_user_connection(user_id, conn)
+    return conn
+
+
+def evictions(config, reason):
+    line = f'db_user_pool_evictions_total{{reason="{reason}"}}'
+    for sample in config.metrics.render().splitlines():
+        if sample.startswith(line):
+            return int(float(sample.split()[-1]))
+    return 0
+
+
+def test_least_recently_used_pool_is_evicted_at_the_limit(config):
+    config.create_user_pool(1, "pw1")
+    config.create_user_pool(2, "pw2")
+    use(config, 1)
+
+    config.create_user_pool(3, "pw3")
+
+    assert list(config.user_pools) == ["user_1", "user_3"]
+    assert config.get_user_connection(2) is None
+    assert evictions(config, "lru") == 1
+
+
+def test_pools_with_checked_out_connections_are_not_evicted(config):
+    config.create_user_pool(1, "pw1")
+    held = config.get_user_connection(1)
+    config.create_user_pool(2, "pw2")
+
+    config.create_user_pool(3, "pw3")
+
+    assert list(config.user_pools) == ["user_1", "user_3"]
+    assert not held.closed
+    config.return_user_connection(1, held)
+
+
+def test_ensuring_an_open_pool_keeps_it(config):
+    config.create_user_pool(1, "pw1")
+    user_pool = config.user_pools["user_1"]
+
+    config.create_user_pool(1, "pw1")
+
+    assert config.user_pools["user_1"] is user_pool
+
+
+def test_idle_pools_are_reaped(config):
+    config.user_pool_idle_timeout = 0.05
+    config.create_user_pool(1, "pw1")
+    conn = use(config, 1)
+
+    wait_until(lambda: not config.has_user_pool(1))
+
+    assert conn.closed
+    assert evictions(config, "idle") == 1
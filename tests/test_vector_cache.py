@@ -0,0 +1,88 @@
+import datetime
+
+from backend.vectors import VectorCache
+
+
+def full_loads(table) -> int:
+    return sum(
+        "WHERE deleted_at IS NULL ORDER BY vector_id" in query
+        and "vector_id >" not in query
+        for query in table.executed
+    )
+
+
+def test_first_search_loads_every_live_row(note_vectors):
+    note_vectors.add("a.wav", 3)
+    note_vectors.add("b.wav", 2)
+    note_vectors.delete("b.wav")
+
+    matrix = VectorCache().get("user_1", note_vectors.cursor())
+
+    assert matrix.vector_ids.tolist() == [1, 2, 3]
+    assert full_loads(note_vectors) == 1
+
+
+def test_new_rows_are_appended_without_a_full_reload(note_vectors):
+    cache = VectorCache()
+    note_vectors.add("a.wav", 2)
+    cache.get("user_1", note_vectors.cursor())
+
+    note_vectors.add("b.wav", 2)
+    matrix = cache.get("user_1", note_vectors.cursor())
+
+    assert matrix.vector_ids.tolist() == [1, 2, 3, 4]
+    assert matrix.audio_keys == ["a.wav", "a.wav", "b.wav", "b.wav"]
+    assert full_loads(note_vectors) == 1
+    assert any("WHERE vector_id > %s" in query for query in note_vectors.executed)
+
+
+def test_deleted_notes_are_dropped_on_refresh(note_vectors):
+    cache = VectorCache()
+    note_vectors.add("a.wav", 2)
+    note_vectors.add("b.wav", 1)
+    cache.get("user_1", note_vectors.cursor())
+
+    note_vectors.now += datetime.timedelta(seconds=5)
+    note_vectors.delete("a.wav")
+    matrix = cache.get("user_1", note_vectors.cursor())
+
+    assert matrix.audio_keys == ["b.wav"]
+    assert full_loads(note_vectors) == 1
+
+
+def test_deletions_committed_late_are_caught_within_the_grace_period(note_vectors):
+    cache = VectorCache(deletion_grace=300)
+    note_vectors.add("a.wav", 1)
+    note_vectors.add("b.wav", 1)
+    synced_at = note_vectors.now
+    cache.get("user_1", note_vectors.cursor())
+
+    # Stamped before the last sync, but committed after it
+    note_vectors.now += datetime.timedelta(seconds=60)
+    note_vectors.delete("a.wav", at=synced_at - datetime.timedelta(seconds=120))
+    note_vectors.delete("b.wav", at=synced_at - datetime.timedelta(seconds=600))
+    matrix = cache.get("user_1", note_vectors.cursor())
+
+    # Only the deletion inside the grace window is seen incrementally
+    assert matrix.audio_keys == ["b.wav"]
+
+
+def test_entries_are_rebuilt_after_max_age(note_vectors):
+    cache = VectorCache(max_age=0)
+    note_vectors.add("a.wav", 1)
+    cache.get("user_1", note_vectors.cursor())
+    cache.get("user_1", note_vectors.cursor())
+
+    assert full_loads(note_vectors) == 2
+
+
+def test_least_recently_used_schemas_are_evicted_over_budget(note_vectors):
+    note_vectors.add("a.wav", 4)
+    one_schema = VectorCache().get("user_1", note_vectors.cursor()).nbytes
+    cache = VectorCache(max_bytes=2 * one_schema)
+
+    for schema in ("user_1", "user_2", "user_1", "user_3"):
+        cache.get(schema, note_vectors.cursor())
+
+    assert list(cache._entries) == ["user_1", "user_3"]
+    assert cache.nbytes <= cache.max_bytes
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from backend.vectors import EmbeddingMatrix, decode_embedding, encode_embedding, top_k
+
+
+def brute_force(rows, query, limit):
+    """Row-by-row float64 cosine ranking, ties by vector_id."""
+    query = np.asarray(query, dtype=np.float64)
+    scored = []
+    for vector_id, content, audio_key, embedding in rows:
+        vector = np.frombuffer(embedding, dtype="<f4").astype(np.float64)
+        score = float(vector @ query / (np.linalg.norm(vector) * np.linalg.norm(query)))
+        scored.append((-round(score, 12), vector_id, content, audio_key, score))
+    return [
+        (content, audio_key, score) for *_, content, audio_key, score in sorted(scored)
+    ][:limit]
+
+
+def make_rows(rng, count, dim=32, duplicates=0):
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    if duplicates:
+        copies = rng.integers(0, count, size=duplicates)
+        vectors[copies] = vectors[rng.integers(0, count, size=duplicates)]
+    vector_ids = rng.permutation(count) + 1
+    return [
+        (
+            int(vector_id),
+            f"chunk {vector_id}",
+            f"audio/{vector_id}.wav",
+            encode_embedding(v),
+        )
+        for vector_id, v in zip(vector_ids, vectors)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("limit", [1, 3, 10])
+def test_search_matches_brute_force(seed, limit):
+    rng = np.random.default_rng(seed)
+    rows = make_rows(rng, int(rng.integers(1, 200)), duplicates=20)
+    query = rng.standard_normal(32)
+
+    results = EmbeddingMatrix.from_rows(rows).search(query, limit)
+
+    expected = brute_force(rows, query, limit)
+    assert [result[:2] for result in results] == [item[:2] for item in expected]
+    np.testing.assert_allclose(
+        [result[2] for result in results], [item[2] for item in expected], atol=1e-12
+    )
+
+
+def test_ties_are_ordered_by_vector_id():
+    embedding = encode_embedding(np.ones(8, dtype=np.float32))
+    rows = [
+        (vector_id, f"chunk {vector_id}", "a", embedding) for vector_id in (9, 2, 5)
+    ]
+
+    results = EmbeddingMatrix.from_rows(rows).search(np.ones(8), 3)
+
+    assert [content for content, _, _ in results] == ["chunk 2", "chunk 5", "chunk 9"]
+
+
+def test_search_within_candidate_rows():
+    rng = np.random.default_rng(0)
+    rows = make_rows(rng, 50)
+    query = rng.standard_normal(32)
+    candidates = np.array([3, 7, 11, 20])
+
+    results = EmbeddingMatrix.from_rows(rows).search(query, 2, candidates)
+
+    expected = brute_force([rows[i] for i in candidates], query, 2)
+    assert [result[:2] for result in results] == [item[:2] for item in expected]
+
+
+def test_top_k_keeps_near_ties_of_the_kth_score():
+    scores = np.array([0.1, 0.9, 0.5, 0.5 - 1e-7, 0.3], dtype=np.float32)
+
+    assert sorted(top_k(scores, 2)) == [1, 2]
+    assert sorted(top_k(scores, 2, tolerance=1e-5)) == [1, 2, 3]
+    assert sorted(top_k(scores, 10)) == [0, 1, 2, 3, 4]
+    assert len(top_k(scores, 0)) == 0
+
+
+def test_embeddings_are_stored_as_packed_little_endian_float32():
+    embedding = [0.25, -1.5, 3.0]
+
+    payload = encode_embedding(embedding)
+
+    assert payload == np.array(embedding, dtype="<f4").tobytes()
+    assert decode_embedding(payload).tolist() == embedding
+    assert decode_embedding(memoryview(payload)).tolist() == embedding
+
+
+def test_unmigrated_json_embeddings_still_decode():
+    assert decode_embedding("[0.25, -1.5]").tolist() == [0.25, -1.5]
+    assert decode_embedding([0.25, -1.5]).dtype == np.float32